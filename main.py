@@ -2,6 +2,15 @@ import streamlit as st
 import pandas as pd
 import os
 from test_code.pipeline import run_gasp_pipeline
+from test_code.batch_reports import REPORT_OUTPUT_DIR, generate_portfolio_reports
+from test_code.debt_reports import DEBT_REPORTS_PATH
+from test_code.feature_store import FEATURE_STORE_PATH
+from test_code.job_control import CancellationToken
+from test_code.resource_budget import DEFAULT_BUDGET, MAX_FILE_BYTES
+from test_code.results_db import RESULTS_DB_PATH, ResultsDB
+from test_code.similar_applicants import summarize_neighbors
+from test_code.streamlit_cache import cached_stages, end_rerun, load_similar_index, render_cache_debug_panel
+from test_code.transaction_query import LOOKBACK_OPTIONS
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -195,6 +204,10 @@ if 'assessment_initiated' not in st.session_state:
     st.session_state.assessment_initiated = False
 if 'pipeline_output' not in st.session_state:
     st.session_state.pipeline_output = None # Store the result dictionary here
+if 'pending_files' not in st.session_state:
+    st.session_state.pending_files = None # Files queued for the run shown on the results page
+if 'pipeline_checkpoint' not in st.session_state:
+    st.session_state.pipeline_checkpoint = {} # Per-file extraction results, reused if a run is restarted
 
 
 # --- Functions for navigation and logic ---
@@ -227,22 +240,59 @@ def start_assessment():
     # Save uploaded files to the temporary directory and collect their paths
     all_file_paths = []
     for uploaded_file in all_uploaded_files:
+        if uploaded_file.size > MAX_FILE_BYTES:
+            st.warning(f"{uploaded_file.name} is larger than {MAX_FILE_BYTES // (1024 * 1024)} MB and was skipped.")
+            continue
         file_path = os.path.join(temp_dir, uploaded_file.name)
         with open(file_path, "wb") as f:
             f.write(uploaded_file.getbuffer())
         all_file_paths.append(file_path)
+    if not all_file_paths:
+        st.session_state.assessment_initiated = False
+        return
+
+    # Queue the run; the results page executes it with a progress bar and a cancel button
+    st.session_state.pending_files = all_file_paths
+    st.session_state.cancel_token = CancellationToken()
+    st.session_state.pipeline_output = None
+    go_to_section("Assessment Results")
+
+def cancel_assessment():
+    # Clicking the button reruns the script, which interrupts the run at its next progress update;
+    # the token also stops it if it is running outside this script thread.
+    st.session_state.cancel_token.cancel()
+    st.session_state.pending_files = None
+    st.session_state.assessment_initiated = False
+    st.session_state.pipeline_output = {"error": "Assessment cancelled. Files extracted so far are kept and will be reused if you restart.", "cancelled": True}
+
+def run_pending_assessment():
+    """Runs the queued pipeline, streaming its progress events into a progress bar."""
+    all_file_paths = st.session_state.pending_files
+    progress_bar = st.progress(0.0, text="Starting assessment...")
+    st.button("Cancel Assessment", key="btn_cancel", on_click=cancel_assessment)
+
+    def show_progress(event):
+        progress_bar.progress(event['fraction'], text=event['message'])
 
-    # Run the backend pipeline with the file paths
     try:
-        with st.spinner('Running AI-powered assessment... This may take a moment.'):
-            st.session_state.pipeline_output = run_gasp_pipeline(all_file_paths)
+        st.session_state.pipeline_output = run_gasp_pipeline(
+            all_file_paths, interest_rate=float(st.session_state.get('interest_rate') or 0.0),
+            feature_store_path=FEATURE_STORE_PATH, results_db_path=RESULTS_DB_PATH,
+            stages=cached_stages(all_file_paths),
+            lookback_months=st.session_state.get('lookback_months'),
+            chart_lookback_months=st.session_state.get('chart_lookback_months'),
+            progress_callback=show_progress, cancel_token=st.session_state.cancel_token,
+            checkpoint=st.session_state.pipeline_checkpoint, budget=DEFAULT_BUDGET,
+            debt_reports_path=DEBT_REPORTS_PATH if os.path.exists(DEBT_REPORTS_PATH) else None
+        )
     except Exception as e:
         st.error(f"An error occurred during assessment: {e}")
         st.session_state.pipeline_output = None
         st.session_state.assessment_initiated = False
-        return
-    
-    go_to_section("Assessment Results")
+    st.session_state.pending_files = None
+    if st.session_state.pipeline_output and not st.session_state.pipeline_output.get('cancelled'):
+        st.session_state.pipeline_checkpoint = {}
+    st.rerun()
 
 
 # --- Sidebar and Navigation ---
@@ -267,11 +317,16 @@ with st.sidebar:
         go_to_section("AI Model Details")
     if st.button("Assessment Results", key="btn_results"):
         go_to_section("Assessment Results")
+    if st.button("Portfolio Overview", key="btn_portfolio"):
+        go_to_section("Portfolio Overview")
 
     st.markdown("---")
     st.markdown("_Ready to assess? Click the button below!_")
     st.button("Start Comprehensive Assessment 🚀", key="btn_assess", on_click=start_assessment, use_container_width=True)
 
+    st.markdown("---")
+    render_cache_debug_panel()
+
 # --- Main Content ---
 st.markdown(
     "<div class='main-header-container'><h1>GA$P: AI-Powered Portfolio Assessment</h1></div>",
@@ -314,8 +369,8 @@ if st.session_state.selected_section == "Client Documents":
     with col2:
         st.subheader("💼 Asset & Debt Documentation")
         st.file_uploader(
-            "Upload proof of assets, collateral, and debt history",
-            type=["pdf", "jpg", "jpeg", "png"],
+            "Upload proof of assets, collateral, and debt history (e.g., Debt_Report.pdf or debt_report.csv)",
+            type=["pdf", "csv", "jpg", "jpeg", "png"],
             accept_multiple_files=True,
             key="asset_docs"
         )
@@ -345,6 +400,15 @@ elif st.session_state.selected_section == "Manual Data Entry":
         st.number_input("Investment/Loan Price ($)", min_value=0, step=1000, key="investment_price")
         st.number_input("Interest Rate (%)", min_value=0.0, max_value=100.0, step=0.1, format="%.2f", key="interest_rate")
 
+    st.subheader("🗓️ Transaction Lookback")
+    col6, col7 = st.columns(2, gap="large")
+    with col6:
+        st.selectbox("Scoring window", LOOKBACK_OPTIONS, format_func=lambda m: "All history" if m is None else f"Last {m} months",
+                     key="lookback_months", help="Transactions older than this are ignored by the fraud, stress-test and model scores.")
+    with col7:
+        st.selectbox("Chart window", LOOKBACK_OPTIONS, format_func=lambda m: "All history" if m is None else f"Last {m} months",
+                     key="chart_lookback_months")
+
 elif st.session_state.selected_section == "AI Model Details":
     st.header("3. Key Data Points for AI Model")
     st.markdown("_Our AI model is a proprietary, multi-faceted engine trained on a variety of crucial data points to provide its comprehensive assessment. The model considers the following factors:_")
@@ -367,7 +431,12 @@ elif st.session_state.selected_section == "Assessment Results":
     st.markdown("_A comprehensive, AI-driven report of the client's financial profile. This includes risk scores, key insights, and actionable recommendations._")
     st.markdown("---")
 
-    if st.session_state.assessment_initiated and st.session_state.pipeline_output:
+    if st.session_state.pending_files:
+        run_pending_assessment()
+
+    if st.session_state.pipeline_output and st.session_state.pipeline_output.get('cancelled'):
+        st.warning(st.session_state.pipeline_output['error'])
+    elif st.session_state.assessment_initiated and st.session_state.pipeline_output:
         results = st.session_state.pipeline_output
         
         if "error" in results:
@@ -381,12 +450,20 @@ elif st.session_state.selected_section == "Assessment Results":
             else:
                 st.code("Pipeline execution successful, but no status summary was returned.")
                 
+            for rejection in (results.get('resource_usage') or {}).get('rejections', []):
+                st.warning(f"Document skipped: {rejection}")
+
+            extraction_quality = results.get('extraction_quality')
+            if isinstance(extraction_quality, dict) and extraction_quality.get('status') in ('DEGRADED', 'FAILED'):
+                st.warning(f"Extraction quality {extraction_quality['status']}: {extraction_quality['breaks']} of {extraction_quality['checked_rows']} transaction balances do not reconcile. Scores below may be based on incomplete data.")
+
             st.markdown("---") 
 
             st.subheader("Overall Risk Score")
             cols = st.columns(3)
-            cols[0].metric(label="Credit Risk Score", value=str(results.get('credit_score', 'N/A')))
-            cols[1].metric(label="Fraud Risk", value=results.get('fraud', 'N/A'))
+            model_score = results.get('model_score')
+            cols[0].metric(label="Credit Risk Score", value=str(results.get('credit_score', 'N/A')), help=f"Model client score: {model_score:.3f}" if isinstance(model_score, float) else "Model client score unavailable.")
+            cols[1].metric(label="Fraud Risk", value=results.get('fraud', 'N/A'), help=f"Fraud signal score: {results.get('fraud_score', 0):.2f} (0 = clean, 1 = every signal saturated)")
             cols[2].metric(label="Investment Viability", value=results.get('viability', 'N/A'))
 
             st.markdown("---")
@@ -397,10 +474,57 @@ elif st.session_state.selected_section == "Assessment Results":
                 st.metric(label="Debt-to-Income Ratio", value=results.get('dti', 'N/A'), delta="-2%", delta_color="inverse", help="Lower is better.")
                 salary_value = results.get('annual_salary', 0)
                 st.metric(label="Annual Salary (Extracted)", value=f"${salary_value:,.0f}" if isinstance(salary_value, (int, float)) else str(salary_value), help="Extracted from uploaded documents.") 
+                st.metric(label="Existing Debt Payments (monthly)", value=f"${results.get('existing_debt_monthly', 0):,.2f}", help=f"From uploaded debt reports; outstanding balance ${results.get('existing_debt_balance', 0):,.2f}. Included in the DTI.")
             with col_metrics2:
                 debit_value = results.get('total_debit', 0)
                 st.metric(label="Total Debit (from Statement)", value=f"${debit_value:,.2f}" if isinstance(debit_value, (int, float)) else str(debit_value), help="Total debits calculated from transaction data.") 
                 st.metric(label="Projected Loan Approval", value=results.get('approval', 'N/A'), delta="Adjusted based on Credit Score") 
+                payment_value = results.get('monthly_payment', 0)
+                st.metric(label="Estimated Monthly Payment", value=f"${payment_value:,.2f}" if isinstance(payment_value, (int, float)) else str(payment_value), help=f"Total interest over the term: ${results.get('total_interest', 0):,.2f}")
+
+            prob_negative = results.get('prob_negative_balance')
+            if isinstance(prob_negative, float) and prob_negative == prob_negative:
+                col_stress1, col_stress2 = st.columns(2, gap="large")
+                col_stress1.metric(label="Probability of Negative Balance (12 mo.)", value=f"{prob_negative:.1%}", help="Share of simulated cash-flow paths that overdraw the account.")
+                col_stress2.metric(label="Expected Shortfall (worst 5%)", value=f"${results.get('expected_shortfall', 0):,.2f}", help="Average overdraft across the worst 5% of simulated paths.")
+
+            flagged_transactions = results.get('flagged_transactions')
+            if isinstance(flagged_transactions, pd.DataFrame) and not flagged_transactions.empty:
+                with st.expander(f"Flagged Transactions ({len(flagged_transactions)})"):
+                    st.dataframe(flagged_transactions, use_container_width=True)
+
+            category_spend = results.get('category_spend')
+            if isinstance(category_spend, pd.DataFrame) and not category_spend.empty:
+                client_spend = category_spend[category_spend['client_id'].astype(str) == results.get('client_id')]
+                if not client_spend.empty:
+                    with st.expander("Spending by Category"):
+                        spend_row = client_spend.iloc[0].drop(['client_id', 'total_debit'])
+                        spend_row = spend_row[[column for column in spend_row.index if not column.startswith('share_')]].astype(float)
+                        st.bar_chart(spend_row[spend_row > 0].sort_values(ascending=False))
+
+            loan_scenarios = results.get('loan_scenarios')
+            if isinstance(loan_scenarios, pd.DataFrame) and not loan_scenarios.empty:
+                with st.expander("Loan Scenario Sweep (amount x rate x term)"):
+                    st.dataframe(loan_scenarios.sort_values('initial_dti'), use_container_width=True)
+
+            with st.expander("Comparable Applicants (historical loan outcomes)"):
+                similar_index = load_similar_index()
+                if similar_index is None:
+                    st.info("No similar-applicant index has been built. Run `python -m test_code.similar_applicants --build` to create it.")
+                else:
+                    neighbors = similar_index.query(
+                        annual_income=float(results.get('annual_salary', 0) or 0),
+                        dti_ratio=float(results.get('dti_ratio', 0) or 0),
+                        credit_score=float(results.get('credit_score', 0) or 0),
+                        loan_amount=float(results.get('loan_amount_requested', 0) or 0),
+                    )
+                    summary = summarize_neighbors(neighbors)
+                    col_similar1, col_similar2 = st.columns(2, gap="large")
+                    col_similar1.metric(label=f"Default Rate of {summary['k']} Nearest Applicants",
+                                        value=f"{summary['default_rate']:.0%}" if summary['default_rate'] == summary['default_rate'] else "N/A")
+                    col_similar2.metric(label="Lookup Latency", value=f"{similar_index.last_query_ms:.1f} ms",
+                                        help=f"k-NN search over {len(similar_index):,} historical applicants.")
+                    st.dataframe(neighbors, use_container_width=True)
 
             st.markdown("---")
             st.subheader("Visual Analysis")
@@ -415,3 +539,55 @@ elif st.session_state.selected_section == "Assessment Results":
 
     else:
         st.info("Please upload your documents and click the 'Start Comprehensive Assessment' button in the sidebar to begin.")
+
+elif st.session_state.selected_section == "Portfolio Overview":
+    st.header("5. Portfolio Overview")
+    st.markdown("_Distributions across every assessed client, using each client's most recent assessment. Figures come from summary tables the results database keeps up to date as new assessments land._")
+    st.markdown("---")
+
+    results_db = ResultsDB(RESULTS_DB_PATH)
+    try:
+        portfolio = results_db.portfolio_summary()
+    finally:
+        results_db.close()
+    totals = portfolio['totals']
+
+    if totals['clients'] == 0:
+        st.info("No assessments have been recorded yet. Run an assessment to populate the portfolio view.")
+    else:
+        cols = st.columns(4)
+        cols[0].metric(label="Clients Assessed", value=f"{totals['clients']:,}")
+        cols[1].metric(label="Approval Rate", value=f"{totals['approval_rate']:.1%}", help=f"{totals['approved']:,} clients fully approved.")
+        cols[2].metric(label="Mean Debt-to-Income", value=f"{totals['mean_dti']:.1%}" if totals['mean_dti'] == totals['mean_dti'] else "N/A")
+        cols[3].metric(label="Mean Sentiment Score", value=f"{totals['mean_sentiment']:.2f}" if totals['mean_sentiment'] == totals['mean_sentiment'] else "N/A")
+
+        st.markdown("---")
+        col_chart1, col_chart2 = st.columns(2, gap="large")
+        with col_chart1:
+            st.subheader("Approval Outcomes")
+            st.bar_chart(portfolio['approval']['clients'])
+            st.subheader("Debt-to-Income Distribution")
+            st.bar_chart(portfolio['dti']['clients'])
+        with col_chart2:
+            st.subheader("Credit Risk Buckets")
+            st.bar_chart(portfolio['risk']['clients'])
+            st.subheader("Sentiment vs. Approval")
+            st.bar_chart(portfolio['sentiment']['approval_rate'])
+
+        with st.expander("Bucket Details"):
+            for dimension in ('approval', 'dti', 'risk', 'fraud', 'sentiment'):
+                st.markdown(f"**{dimension.title()}**")
+                st.dataframe(portfolio[dimension], use_container_width=True)
+
+        st.markdown("---")
+        st.subheader("Client Reports")
+        st.markdown("_Writes a PDF report (summary, charts and recent transactions) for every assessed client, using their most recent assessment._")
+        if st.button("Generate Client Reports", key="btn_batch_reports"):
+            with st.spinner("Generating client reports..."):
+                report_timings = generate_portfolio_reports(RESULTS_DB_PATH)
+            st.success(f"{len(report_timings)} reports written to {REPORT_OUTPUT_DIR}.")
+            st.dataframe(report_timings[['client_id', 'path', 'pages', 'render_ms', 'compose_ms', 'total_ms']].round(1),
+                         use_container_width=True)
+
+# --- Per-rerun cache counters (reset after everything above has rendered) ---
+end_rerun()
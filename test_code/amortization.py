@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Sequence, Union
+
+ArrayLike = Union[float, Sequence[float], np.ndarray]
+
+# --- Configuration ---
+
+DEFAULT_TERM_MONTHS = 60
+DEFAULT_INTEREST_RATE = 0.0  # Annual %, matches the legacy `loan / 60` estimate
+
+# --- Core Amortization Math ---
+
+def monthly_payment(principal: ArrayLike, annual_rate_pct: ArrayLike, term_months: ArrayLike) -> np.ndarray:
+    """
+    Fixed monthly payment for fully amortizing loans. Inputs broadcast against
+    each other, so passing arrays prices a whole batch of scenarios in one call.
+    """
+    principal = np.asarray(principal, dtype=float)
+    rate = np.asarray(annual_rate_pct, dtype=float) / 1200.0
+    term = np.asarray(term_months, dtype=float)
+
+    growth = np.power(1.0 + rate, term)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        amortizing = principal * rate * growth / (growth - 1.0)
+    return np.where(rate > 0, amortizing, principal / term)
+
+def build_scenario_grid(amounts: ArrayLike, annual_rates_pct: ArrayLike, terms_months: ArrayLike) -> pd.DataFrame:
+    """Cartesian product of loan amounts, annual rates (%) and terms (months)."""
+    amount_grid, rate_grid, term_grid = np.meshgrid(
+        np.atleast_1d(np.asarray(amounts, dtype=float)),
+        np.atleast_1d(np.asarray(annual_rates_pct, dtype=float)),
+        np.atleast_1d(np.asarray(terms_months, dtype=int)),
+        indexing='ij'
+    )
+    return pd.DataFrame({
+        'loan_amount': amount_grid.ravel(),
+        'annual_rate_pct': rate_grid.ravel(),
+        'term_months': term_grid.ravel(),
+    })
+
+def amortization_schedules(principal: ArrayLike, annual_rate_pct: ArrayLike, term_months: ArrayLike) -> Dict[str, np.ndarray]:
+    """
+    Builds full payment schedules for N scenarios at once.
+
+    Every returned schedule is an (N, max_term) array; months past a scenario's
+    own term are zero. Balances use the closed form
+    B_k = P(1+r)^k - M((1+r)^k - 1)/r, so no Python loop runs over months.
+    """
+    principal, rate_pct, term = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(principal, dtype=float)),
+        np.atleast_1d(np.asarray(annual_rate_pct, dtype=float)),
+        np.atleast_1d(np.asarray(term_months, dtype=int)),
+    )
+    payment = monthly_payment(principal, rate_pct, term)
+    rate = rate_pct[:, None] / 1200.0
+
+    months = np.arange(1, int(term.max()) + 1)
+    active = months[None, :] <= term[:, None]
+    growth = np.power(1.0 + rate, months[None, :])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        paid_down = np.where(rate > 0, payment[:, None] * (growth - 1.0) / rate, payment[:, None] * months[None, :])
+    balance = np.clip(principal[:, None] * growth - paid_down, 0.0, None)
+
+    opening_balance = np.concatenate([principal[:, None], balance[:, :-1]], axis=1)
+    interest = np.where(active, opening_balance * rate, 0.0)
+    payments = np.where(active, payment[:, None], 0.0)
+
+    return {
+        'payment': payments,
+        'interest': interest,
+        'principal': payments - interest,
+        'balance': np.where(active, balance, 0.0),
+    }
+
+def project_dti(monthly_income: float, existing_monthly_debt: float, payments: np.ndarray,
+                annual_income_growth: float = 0.0) -> np.ndarray:
+    """
+    Projects the monthly DTI ratio over each scenario's term. `payments` is the
+    (N, months) schedule from `amortization_schedules`; income can optionally
+    grow at a constant annual rate (e.g. 0.03 for 3%).
+    """
+    months = np.arange(payments.shape[1])
+    income_path = monthly_income * np.power(1.0 + annual_income_growth, months / 12.0)
+    income_path = np.where(income_path > 0, income_path, np.nan)
+    return (payments + existing_monthly_debt) / income_path[None, :]
+
+# --- Scenario Sweeps ---
+
+def sweep_loan_scenarios(monthly_income: float, existing_monthly_debt: float,
+                         amounts: ArrayLike, annual_rates_pct: ArrayLike, terms_months: ArrayLike,
+                         annual_income_growth: float = 0.0) -> pd.DataFrame:
+    """
+    Prices every amount x rate x term combination for one client and returns one
+    summary row per scenario (payment, total interest, starting and peak DTI).
+    """
+    grid = build_scenario_grid(amounts, annual_rates_pct, terms_months)
+    schedules = amortization_schedules(grid['loan_amount'].values, grid['annual_rate_pct'].values, grid['term_months'].values)
+    dti_path = project_dti(monthly_income, existing_monthly_debt, schedules['payment'], annual_income_growth)
+
+    grid['monthly_payment'] = schedules['payment'][:, 0]
+    grid['total_interest'] = schedules['interest'].sum(axis=1)
+    grid['total_cost'] = schedules['payment'].sum(axis=1)
+    grid['initial_dti'] = dti_path[:, 0]
+    # Peak over the months with a payment; scenarios without one (a zero amount) get NaN
+    peak_dti = np.max(np.where(schedules['payment'] > 0, dti_path, -np.inf), axis=1, initial=-np.inf)
+    grid['peak_dti'] = np.where(peak_dti == -np.inf, np.nan, peak_dti)
+    return grid
+
+def default_scenario_axes(loan_amount: float, annual_rate_pct: float, term_months: int) -> Dict[str, np.ndarray]:
+    """Sensible sweep around a requested loan: +/-50% amount, +/-3pt rate, common terms."""
+    terms = np.union1d([12, 24, 36, 48, 60, 72, 84, 120], [term_months])
+    return {
+        'amounts': np.linspace(0.5, 1.5, 11) * loan_amount,
+        'annual_rates_pct': np.unique(np.clip(np.linspace(annual_rate_pct - 3.0, annual_rate_pct + 3.0, 13), 0.0, None)),
+        'terms_months': terms,
+    }
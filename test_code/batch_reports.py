@@ -0,0 +1,329 @@
+import io
+import os
+import time
+import numpy as np
+import pandas as pd
+import fitz  # PyMuPDF library
+import matplotlib.dates as mdates
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from typing import Dict, Any, List, Optional, Tuple
+from test_code.results_db import RESULTS_DB_PATH, ResultsDB
+from test_code.stress_test import monthly_cash_flows
+
+# --- Configuration ---
+# Benchmark from the repository root:  python -m test_code.batch_reports
+
+REPORT_OUTPUT_DIR = os.path.join('output', 'reports')
+REPORT_CHART_MONTHS = 12         # bar slots in the chart template; older months are dropped
+REPORT_MAX_TRANSACTIONS = 200    # most recent rows listed in the report
+REPORT_ROWS_PER_PAGE = 52
+CHART_DPI = 110
+PAGE_WIDTH, PAGE_HEIGHT = fitz.paper_size('letter')
+MARGIN = 50
+CREDIT_COLOR = '#b19cd9'
+DEBIT_COLOR = '#555555'
+ACCENT = (0.57, 0.49, 0.73)  # #917cb9, as in the app
+
+# --- Chart Template ---
+
+class ReportChartTemplate:
+    """
+    One figure, built once: monthly credit/debit bars on top and the running
+    balance below. Each render only updates artist data (bar heights, tick
+    labels, line data, limits, title), so no figure, axes or bar is created per
+    client. Not thread-safe; each worker process keeps its own.
+    """
+
+    def __init__(self, months: int = REPORT_CHART_MONTHS):
+        self.months = months
+        self.fig = Figure(figsize=(8, 5.2), dpi=CHART_DPI, facecolor='#000000')
+        FigureCanvasAgg(self.fig)
+        self.ax_flow, self.ax_balance = self.fig.subplots(2, 1, gridspec_kw={'height_ratios': [3, 2]})
+        slots = np.arange(months)
+        self.credit_bars = self.ax_flow.bar(slots - 0.2, np.zeros(months), 0.4, color=CREDIT_COLOR, label='CREDIT')
+        self.debit_bars = self.ax_flow.bar(slots + 0.2, np.zeros(months), 0.4, color=DEBIT_COLOR, label='DEBIT')
+        self.ax_flow.set_xticks(slots)
+        self.ax_flow.set_xlim(-0.6, months - 0.4)
+        self.ax_flow.set_ylabel("Amount ($)")
+        self.ax_flow.legend(title="Transaction Type", loc='upper left', fontsize=7, title_fontsize=7,
+                            facecolor='#121212', labelcolor='white')
+        self.balance_line, = self.ax_balance.plot([], [], color=CREDIT_COLOR, linewidth=1.5)
+        self.ax_balance.set_ylabel("Balance ($)")
+        self.ax_balance.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m'))
+        for ax in (self.ax_flow, self.ax_balance):
+            ax.set_facecolor('#121212')
+            ax.grid(color='#2a2a2a')
+            ax.set_axisbelow(True)
+            ax.tick_params(colors='white', labelsize=8)
+            ax.yaxis.label.set_color('white')
+        self.title = self.fig.suptitle('', color=CREDIT_COLOR, fontsize=13)
+        self.fig.subplots_adjust(left=0.1, right=0.97, top=0.9, bottom=0.08, hspace=0.45)
+
+    def render(self, transactions: pd.DataFrame, title: str) -> bytes:
+        """Draws one client's transactions into the template and returns PNG bytes."""
+        flows = monthly_cash_flows(transactions).tail(self.months)
+        n = len(flows)
+        credits = np.zeros(self.months)
+        debits = np.zeros(self.months)
+        credits[:n], debits[:n] = flows['CREDIT'].values, flows['DEBIT'].values
+        for bar, height in zip(self.credit_bars, credits):
+            bar.set_height(height)
+        for bar, height in zip(self.debit_bars, debits):
+            bar.set_height(height)
+        self.ax_flow.set_xticklabels([str(month) for month in flows['month']] + [''] * (self.months - n), rotation=45)
+        self.ax_flow.set_ylim(0, max(credits.max(), debits.max(), 1.0) * 1.1)
+
+        dated = transactions.dropna(subset=['date'])
+        if dated.empty:
+            self.balance_line.set_data([], [])
+        else:
+            x = mdates.date2num(dated['date'].to_numpy())
+            y = dated['balance'].to_numpy(dtype=float)
+            self.balance_line.set_data(x, y)
+            self.ax_balance.set_xlim(x.min() - 1, x.max() + 1)
+            pad = max((y.max() - y.min()) * 0.1, 1.0)
+            self.ax_balance.set_ylim(y.min() - pad, y.max() + pad)
+        self.title.set_text(title)
+
+        buffer = io.BytesIO()
+        self.fig.canvas.print_png(buffer)
+        return buffer.getvalue()
+
+_TEMPLATE = None
+
+def _chart_template() -> ReportChartTemplate:
+    """The calling process's template, created on first use."""
+    global _TEMPLATE
+    if _TEMPLATE is None:
+        _TEMPLATE = ReportChartTemplate()
+    return _TEMPLATE
+
+# --- PDF Composition ---
+
+def _money(value: Any) -> str:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return "N/A"
+    if value != value:
+        return "N/A"
+    return f"-${-value:,.2f}" if value < 0 else f"${value:,.2f}"
+
+def _text(value: Any) -> str:
+    return "N/A" if value is None or value != value or value == '' else str(value)
+
+def _pct(value: Any) -> str:
+    try:
+        return f"{float(value):.1%}" if value == value and value is not None else "N/A"
+    except (TypeError, ValueError):
+        return "N/A"
+
+def _transaction_line(row: Tuple) -> str:
+    # One line per row in a monospaced font, so the report stays parseable by extract_loan_data_to_dfs
+    day, description, type_str, amount, balance = row
+    day = day.strftime('%Y-%m-%d') if pd.notna(day) else '----------'
+    return f"{day}  {str(description)[:40]:<40}  {type_str:<6}  {_money(amount):>12}  {_money(balance):>12}"
+
+def compose_report_pdf(result: Dict[str, Any], profile: Dict[str, Any], transactions: pd.DataFrame,
+                       chart_png: bytes, path: str, report_date: Optional[str] = None) -> int:
+    """Writes a multi-page client report (summary + chart, then transaction pages); returns the page count."""
+    doc = fitz.open()
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    name = f"{_text(result.get('first_name'))} {_text(result.get('last_name'))}"
+
+    y = MARGIN + 10
+    page.insert_text((MARGIN, y), "Comprehensive Client Financial Report", fontsize=18, fontname='hebo', color=ACCENT)
+    y += 24
+    page.insert_text((MARGIN, y), f"Client Name: {name} | Client ID: {result['client_id']}", fontsize=11, fontname='helv')
+    y += 16
+    page.insert_text((MARGIN, y), f"Report Date: {report_date or date.today().isoformat()}", fontsize=11, fontname='helv')
+    y += 16
+    page.insert_text((MARGIN, y), f"Final Assessment: {_text(result.get('approval'))}", fontsize=11, fontname='hebo')
+
+    y += 26
+    page.insert_text((MARGIN, y), "LOAN & CREDIT PROFILE SUMMARY", fontsize=12, fontname='hebo', color=ACCENT)
+    ssn = _text(profile.get('ssn'))
+    fields = [
+        ("SSN", f"XXX-XX-{ssn[-4:]}" if ssn != 'N/A' else ssn),
+        ("Annual Income", _money(profile.get('annual_income', result.get('annual_salary')))),
+        ("Address", _text(profile.get('address'))),
+        ("Employment", _text(profile.get('employment_status'))),
+        ("Credit Score", _text(result.get('credit_score'))),
+        ("Loan Requested", _money(profile.get('loan_amount_requested'))),
+        ("Collateral Value", _money(profile.get('collateral_value'))),
+        ("Monthly Alimony", _money(profile.get('alimony_payments_monthly'))),
+        ("Client Sentiment Score", _text(result.get('sentiment_score'))),
+    ]
+    assessment = [
+        ("Approval", _text(result.get('approval'))),
+        ("Viability", _text(result.get('viability'))),
+        ("Debt-to-Income", _pct(result.get('dti_ratio'))),
+        ("Model Score", _pct(result.get('model_score'))),
+        ("Fraud Risk", f"{_text(result.get('fraud'))} ({_pct(result.get('fraud_score'))})"),
+        ("P(Negative Balance)", _pct(result.get('prob_negative_balance'))),
+    ]
+    # One insert_text call per block: every call appends a content stream, which dominates compose time
+    top = y + 20
+    for column_x, rows in ((MARGIN, fields), (PAGE_WIDTH / 2 + 20, assessment)):
+        page.insert_text((column_x, top), [f"{label}: {value}"[:60] for label, value in rows],
+                         fontsize=9.5, fontname='helv', lineheight=1.5)
+    y = top + 14 * len(fields)
+    insights_rect = fitz.Rect(MARGIN, y, PAGE_WIDTH - MARGIN, y + 44)
+    page.insert_textbox(insights_rect, f"Insights: {_text(result.get('insights'))}", fontsize=9.5, fontname='helv')
+
+    chart_top = insights_rect.y1 + 8
+    chart_height = (PAGE_WIDTH - 2 * MARGIN) * 5.2 / 8
+    page.insert_image(fitz.Rect(MARGIN, chart_top, PAGE_WIDTH - MARGIN, chart_top + chart_height), stream=chart_png)
+
+    recent = transactions.tail(REPORT_MAX_TRANSACTIONS)
+    rows = list(recent[['date', 'description', 'type', 'amount', 'balance']].itertuples(index=False, name=None))
+    for start in range(0, len(rows), REPORT_ROWS_PER_PAGE):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        y = MARGIN + 10
+        if start == 0:
+            page.insert_text((MARGIN, y), "RECENT TRANSACTION HISTORY", fontsize=12, fontname='hebo', color=ACCENT)
+            y += 18
+            opening = float(rows[0][4]) - (rows[0][3] if rows[0][2] == 'CREDIT' else -rows[0][3])
+            page.insert_text((MARGIN, y), f"Opening Balance: {_money(opening)} | Closing Balance: {_money(rows[-1][4])}",
+                             fontsize=9.5, fontname='helv')
+            y += 16
+        page.insert_text((MARGIN, y + 12), [_transaction_line(row) for row in rows[start:start + REPORT_ROWS_PER_PAGE]],
+                         fontsize=7.5, fontname='cour', lineheight=1.6)
+
+    pages = doc.page_count
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+    return pages
+
+# --- Worker ---
+
+def _report_worker(task: tuple) -> Dict[str, Any]:
+    result, profile, transactions, path, report_date = task
+    started = time.perf_counter()
+    title = f"Monthly Credits vs. Debits for {_text(result.get('first_name'))} {_text(result.get('last_name'))}"
+    chart_png = _chart_template().render(transactions, title)
+    rendered = time.perf_counter()
+    pages = compose_report_pdf(result, profile, transactions, chart_png, path, report_date)
+    finished = time.perf_counter()
+    return {
+        'client_id': result['client_id'], 'path': path, 'pages': pages, 'transactions': len(transactions),
+        'render_ms': (rendered - started) * 1000, 'compose_ms': (finished - rendered) * 1000,
+        'total_ms': (finished - started) * 1000, 'worker_pid': os.getpid(),
+    }
+
+# --- Batch Job ---
+
+def generate_client_reports(client_results: pd.DataFrame, df_transactions: pd.DataFrame,
+                            df_profiles: Optional[pd.DataFrame] = None, output_dir: str = REPORT_OUTPUT_DIR,
+                            n_workers: Optional[int] = None, report_date: Optional[str] = None) -> pd.DataFrame:
+    """
+    Writes Client_Report_<id>_<last name>.pdf for every row of `client_results`
+    (RESULT_COLUMNS, e.g. ResultsDB.latest_client_results()). `n_workers=1` runs
+    in-process; anything else uses a process pool in which every worker reuses
+    one chart template. Returns per-report timings.
+    """
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    profiles = {}
+    if df_profiles is not None and not df_profiles.empty:
+        profiles = {str(row['client_id']): row for row in df_profiles.to_dict('records')}
+    transactions = dict(tuple(df_transactions.groupby(df_transactions['client_id'].astype(str), sort=False))) \
+        if not df_transactions.empty else {}
+    empty = pd.DataFrame(columns=['client_id', 'date', 'description', 'type', 'amount', 'balance'])
+
+    tasks = []
+    for result in client_results.to_dict('records'):
+        client_id = str(result['client_id'])
+        file_name = f"Client_Report_{client_id}_{_text(result.get('last_name')).replace(' ', '_')}.pdf"
+        tasks.append((result, profiles.get(client_id, {}), transactions.get(client_id, empty),
+                      os.path.join(output_dir, file_name), report_date))
+
+    started = time.perf_counter()
+    if n_workers == 1 or len(tasks) <= 1:
+        timings = [_report_worker(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            timings = list(pool.map(_report_worker, tasks, chunksize=max(1, len(tasks) // 32)))
+    elapsed = time.perf_counter() - started
+
+    report_timings = pd.DataFrame(timings, columns=['client_id', 'path', 'pages', 'transactions', 'render_ms',
+                                                    'compose_ms', 'total_ms', 'worker_pid'])
+    if len(report_timings):
+        print(f"  -> {len(report_timings)} client reports written to {output_dir} in {elapsed:.2f}s "
+              f"({len(report_timings) / elapsed:.1f} reports/s; median render {report_timings['render_ms'].median():.0f} ms, "
+              f"compose {report_timings['compose_ms'].median():.0f} ms)")
+    return report_timings
+
+def generate_portfolio_reports(results_db_path: str = RESULTS_DB_PATH, client_ids: Optional[List[str]] = None,
+                               output_dir: str = REPORT_OUTPUT_DIR, n_workers: Optional[int] = None) -> pd.DataFrame:
+    """Reports for every client's latest assessment in the results database (or only `client_ids`)."""
+    results_db = ResultsDB(results_db_path)
+    try:
+        client_results = results_db.latest_client_results(limit=-1)
+        df_profiles = results_db.latest_client_profiles()
+        df_transactions = results_db.latest_transactions()
+    finally:
+        results_db.close()
+    if client_ids is not None:
+        wanted = {str(c) for c in client_ids}
+        client_results = client_results[client_results['client_id'].astype(str).isin(wanted)]
+    return generate_client_reports(client_results, df_transactions, df_profiles, output_dir, n_workers)
+
+# --- Benchmark ---
+
+def _synthetic_portfolio(n_clients: int, months: int = 12, per_month: int = 25, seed: int = 0) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    rng = np.random.default_rng(seed)
+    n_rows = months * per_month
+    results, frames = [], []
+    for client in range(n_clients):
+        days = np.sort(rng.integers(0, months * 30, n_rows))
+        types = rng.choice(['CREDIT', 'DEBIT'], n_rows)
+        amounts = rng.uniform(5, 900, n_rows).round(2)
+        balances = 3000 + np.cumsum(np.where(types == 'CREDIT', amounts, -amounts))
+        frames.append(pd.DataFrame({
+            'client_id': str(client), 'date': pd.Timestamp('2024-01-01') + pd.to_timedelta(days, unit='D'),
+            'description': 'Synthetic transaction', 'type': types, 'amount': amounts, 'balance': balances.round(2),
+        }))
+        results.append({'client_id': str(client), 'first_name': 'Client', 'last_name': str(client), 'credit_score': 700,
+                        'model_score': 0.8, 'dti_ratio': 0.25, 'fraud': 'Low', 'fraud_score': 0.01, 'viability': 'High',
+                        'approval': 'Approved', 'annual_salary': 90000.0, 'sentiment_score': 0.9,
+                        'prob_negative_balance': 0.02, 'insights': 'Synthetic client for the report benchmark.'})
+    return pd.DataFrame(results), pd.concat(frames, ignore_index=True)
+
+def benchmark_chart_rendering(n_clients: int = 30) -> Tuple[float, float]:
+    """Mean ms per chart: a fresh figure per client (render_monthly_chart) vs. the reused template."""
+    from test_code.pipeline import render_monthly_chart
+
+    client_results, df_transactions = _synthetic_portfolio(n_clients)
+    per_client = [group for _, group in df_transactions.groupby('client_id', sort=False)]
+
+    started = time.perf_counter()
+    for group in per_client:
+        render_monthly_chart(group, "Monthly Credits vs. Debits")
+    fresh_ms = (time.perf_counter() - started) * 1000 / n_clients
+
+    template = ReportChartTemplate()
+    started = time.perf_counter()
+    for group in per_client:
+        template.render(group, "Monthly Credits vs. Debits")
+    template_ms = (time.perf_counter() - started) * 1000 / n_clients
+    return fresh_ms, template_ms
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    print("--- Client Report Chart Rendering (30 clients, 12 months) ---")
+    fresh_ms, template_ms = benchmark_chart_rendering()
+    print(f"New figure per client: {fresh_ms:.1f} ms/chart")
+    print(f"Reused template:       {template_ms:.1f} ms/chart ({fresh_ms / template_ms:.1f}x faster)")
+
+    print("\n--- Batch Report Job (100 synthetic clients) ---")
+    client_results, df_transactions = _synthetic_portfolio(100)
+    with tempfile.TemporaryDirectory() as output_dir:
+        for workers in sorted({1, os.cpu_count() or 1}):
+            timings = generate_client_reports(client_results, df_transactions, output_dir=output_dir, n_workers=workers)
+            print(f"{workers} worker(s): {timings['pages'].sum()} pages, p95 report {timings['total_ms'].quantile(0.95):.0f} ms")
@@ -0,0 +1,138 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+from typing import Dict, Tuple
+from test_code.inference import NumpyModel
+
+# --- Configuration ---
+# Benchmark from the repository root:  python -m test_code.client_score
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+MODEL_FILE = 'client_score.npz'  # Exported from client_score.keras by models/export_models.py
+PREDICT_BATCH_SIZE = 4096
+
+# Column order of the frame client_score.keras was trained on. The shipped
+# scaler_X_*.npy carries one extra trailing column from a later run; only the
+# leading len(CLIENT_SCORE_FEATURES) statistics belong to this model
+# (models/train_client_score.py writes exactly that many).
+CLIENT_SCORE_FEATURES = [
+    'credit_score',
+    'annual_income',
+    'loan_amount_requested',
+    'collateral_value',
+    'alimony_payments_monthly',
+    'avg_balance',
+    'avg_transaction_amount',
+    'has_alimony',
+    'loan_to_income',
+    'total_debit',
+]
+
+# --- Model & Scaler Loading ---
+
+@lru_cache(maxsize=None)
+def load_client_score_backend(models_dir: str = MODELS_DIR) -> Tuple[NumpyModel, Dict[str, np.ndarray]]:
+    """
+    Loads the exported model weights and the raw scaler arrays once per process.
+    Both the network and the scaling run as plain NumPy, so neither TensorFlow
+    nor sklearn is imported. 'x_observed' marks the features the training data
+    supplied (all of them when models/train_client_score.py did not write
+    scaler_X_observed.npy).
+    """
+    model = NumpyModel.load(os.path.join(models_dir, MODEL_FILE))
+    n_features = len(CLIENT_SCORE_FEATURES)
+    observed_path = os.path.join(models_dir, 'scaler_X_observed.npy')
+    scaler = {
+        'x_mean': np.load(os.path.join(models_dir, 'scaler_X_mean.npy'))[:n_features].astype(np.float32),
+        'x_scale': np.load(os.path.join(models_dir, 'scaler_X_scale.npy'))[:n_features].astype(np.float32),
+        'y_min': np.load(os.path.join(models_dir, 'scaler_y_min.npy')).astype(np.float32),
+        'y_scale': np.load(os.path.join(models_dir, 'scaler_y_scale.npy')).astype(np.float32),
+        'x_observed': np.load(observed_path).astype(bool) if os.path.exists(observed_path) else np.ones(n_features, dtype=bool),
+    }
+    return model, scaler
+
+# --- Feature Assembly ---
+
+def build_client_features(df_client_info: pd.DataFrame, df_transactions: pd.DataFrame) -> pd.DataFrame:
+    """One feature row per client, combining profile fields with transaction aggregates (NaN where missing)."""
+    profiles = df_client_info.drop_duplicates('client_id', keep='first').set_index('client_id')
+    features = pd.DataFrame(index=profiles.index)
+    for column in ('credit_score', 'annual_income', 'loan_amount_requested', 'collateral_value', 'alimony_payments_monthly'):
+        features[column] = pd.to_numeric(profiles[column], errors='coerce')
+
+    if df_transactions.empty:
+        aggregates = pd.DataFrame(index=features.index, columns=['avg_balance', 'avg_transaction_amount', 'total_debit'])
+    else:
+        by_client = df_transactions.groupby('client_id')
+        aggregates = pd.DataFrame({
+            'avg_balance': by_client['balance'].mean(),
+            'avg_transaction_amount': by_client['amount'].mean(),
+            'total_debit': df_transactions['amount'].where(df_transactions['type'] == 'DEBIT', 0.0).groupby(df_transactions['client_id']).sum(),
+        })
+    features = features.join(aggregates)
+
+    features['has_alimony'] = (features['alimony_payments_monthly'] > 0).astype(float)
+    income = features['annual_income'].where(features['annual_income'] > 0)
+    features['loan_to_income'] = features['loan_amount_requested'] / income
+    return features[CLIENT_SCORE_FEATURES].astype(float)
+
+# --- Inference ---
+
+def predict_client_scores(features: np.ndarray, models_dir: str = MODELS_DIR) -> np.ndarray:
+    """
+    Scales a (n, n_features) matrix, runs the model in batches and inverse-scales
+    the output. Missing values and features the training data never supplied
+    are held at the training mean, as they were during training.
+    """
+    model, scaler = load_client_score_backend(models_dir)
+    features = np.asarray(features, dtype=np.float32)
+    features = np.where(np.isnan(features) | ~scaler['x_observed'], scaler['x_mean'], features)
+    scaled = (features - scaler['x_mean']) / scaler['x_scale']
+
+    outputs = []
+    for start in range(0, len(scaled), PREDICT_BATCH_SIZE):
+        batch = scaled[start:start + PREDICT_BATCH_SIZE]
+        outputs.append(model.predict(batch).reshape(-1))
+    raw = np.concatenate(outputs) if outputs else np.empty(0, dtype=np.float32)
+    return (raw - scaler['y_min'][0]) / scaler['y_scale'][0]
+
+def score_clients(df_client_info: pd.DataFrame, df_transactions: pd.DataFrame, models_dir: str = MODELS_DIR) -> pd.DataFrame:
+    """
+    Scores every client in a run with one batched prediction. The model score
+    sits next to the rule-based score (the extracted credit score the UI shows).
+    """
+    features = build_client_features(df_client_info, df_transactions)
+    return pd.DataFrame({
+        'client_id': features.index,
+        'rule_based_score': features['credit_score'].fillna(0).astype(int).values,
+        'model_score': predict_client_scores(features.values, models_dir),
+    })
+
+# --- Benchmark ---
+
+def benchmark_latency(batch_sizes: Tuple[int, ...] = (1, 10_000), repeats: int = 5) -> Dict[int, float]:
+    """Best-of-N wall time (seconds) to score batches of synthetic clients."""
+    _, scaler = load_client_score_backend()
+    rng = np.random.default_rng(0)
+    timings = {}
+    for size in batch_sizes:
+        features = scaler['x_mean'] + rng.standard_normal((size, len(CLIENT_SCORE_FEATURES))) * scaler['x_scale']
+        predict_client_scores(features)  # warm-up
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            predict_client_scores(features)
+            best = min(best, time.perf_counter() - start)
+        timings[size] = best
+    return timings
+
+
+if __name__ == "__main__":
+    print("--- Client Score Inference Benchmark ---")
+    start = time.perf_counter()
+    load_client_score_backend()
+    print(f"Model + scaler load: {time.perf_counter() - start:.3f}s")
+    for size, seconds in benchmark_latency().items():
+        print(f"{size:>6,} clients: {seconds * 1000:.2f} ms ({size / seconds:,.0f} clients/sec)")
@@ -0,0 +1,213 @@
+import os
+import re
+import time
+import fitz  # PyMuPDF library
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Optional
+
+# Debt reports list a client's existing obligations, one row per account
+# (creditor / type, outstanding balance, monthly payment). They arrive as the
+# portfolio-wide CSV, per-client CSVs, or PDFs uploaded under "Asset & Debt
+# Documentation". Every source is parsed into one long frame, aggregated per
+# client with a groupby, and joined onto the profile frame with one merge.
+
+# --- Configuration ---
+# Benchmark from the repository root:  python -m test_code.debt_reports
+
+DATABASES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'databases')
+DEBT_REPORTS_PATH = os.path.join(DATABASES_DIR, 'all_debt_reports2.csv')
+DEBT_COLUMNS = ['client_id', 'debt_type', 'balance', 'monthly_payment', 'source']
+DEBT_FEATURES = ['existing_debt_monthly', 'existing_debt_balance', 'debt_accounts']
+MIN_PAYMENT_RATE = 0.03  # monthly payment assumed for an account that only reports its balance
+DEBT_REPORT_MAX_PAGES = 5  # debt reports are short; only the first pages of other uploads are scanned for one
+
+# Accepted header spellings, compared after lower-casing and collapsing non-alphanumerics to '_'
+COLUMN_ALIASES = {
+    'client_id': ['client_id', 'clientid', 'client', 'customer_id', 'borrower_id', 'id'],
+    'debt_type': ['debt_type', 'type', 'account_type', 'loan_type', 'creditor', 'lender', 'account'],
+    'balance': ['balance', 'outstanding_balance', 'current_balance', 'amount_owed', 'total_balance', 'principal', 'debt_amount'],
+    'monthly_payment': ['monthly_payment', 'monthly_payments', 'minimum_payment', 'min_payment', 'payment',
+                        'monthly_obligation', 'monthly_amount', 'emi'],
+}
+
+DEBT_SECTION_PATTERN = re.compile(r'(?:DEBT REPORT|EXISTING DEBTS?|DEBT SUMMARY|OUTSTANDING DEBTS?)\s*(.*)', re.DOTALL | re.IGNORECASE)
+DEBT_ROW_PATTERN = re.compile(
+    r'^([A-Za-z][A-Za-z0-9 &\'./()-]*?)\s+\$?([\d,]+(?:\.\d{1,2})?)\s+\$?([\d,]+(?:\.\d{1,2})?)\s*$', re.MULTILINE
+)
+TOTAL_PAYMENT_PATTERN = re.compile(r'Total Monthly (?:Debt )?Payments?:\s*\$?([\d,]+(?:\.\d{1,2})?)', re.IGNORECASE)
+
+# --- Parsing ---
+
+def _normalize_header(name: Any) -> str:
+    return re.sub(r'[^0-9a-z]+', '_', str(name).strip().lower()).strip('_')
+
+def _money(values: pd.Series) -> pd.Series:
+    """'$1,234.50' / '1234.5' / 'N/A' -> float (NaN when unparseable)."""
+    text = values.astype(str).str.replace(r'[\$,\s]', '', regex=True)
+    return pd.to_numeric(text, errors='coerce')
+
+def normalize_debt_frame(raw: pd.DataFrame, source: str, client_id: Optional[str] = None) -> pd.DataFrame:
+    """
+    Maps a debt table with any of the accepted header spellings onto
+    DEBT_COLUMNS. Per-client files may omit the client column (pass
+    `client_id`). Missing monthly payments are estimated from the balance.
+    """
+    headers = {_normalize_header(column): column for column in raw.columns}
+    picked = {field: next((headers[alias] for alias in aliases if alias in headers), None)
+              for field, aliases in COLUMN_ALIASES.items()}
+    if picked['balance'] is None and picked['monthly_payment'] is None:
+        return pd.DataFrame(columns=DEBT_COLUMNS)
+    if picked['monthly_payment'] is None and {'description', 'amount'} <= set(headers):
+        return pd.DataFrame(columns=DEBT_COLUMNS)  # a bank statement: its balance column is the running balance
+
+    debts = pd.DataFrame(index=raw.index)
+    if picked['client_id'] is not None:
+        debts['client_id'] = raw[picked['client_id']].astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+    else:
+        debts['client_id'] = client_id or 'UNKNOWN'
+    debts['debt_type'] = raw[picked['debt_type']].astype(str).str.strip() if picked['debt_type'] is not None else 'Unspecified'
+    debts['balance'] = _money(raw[picked['balance']]) if picked['balance'] is not None else np.nan
+    payment = _money(raw[picked['monthly_payment']]) if picked['monthly_payment'] is not None else pd.Series(np.nan, index=raw.index)
+    debts['monthly_payment'] = payment.fillna(debts['balance'] * MIN_PAYMENT_RATE)
+    debts['source'] = source
+    return debts[debts['monthly_payment'].notna()].reset_index(drop=True)
+
+def parse_debt_csv(path: str) -> pd.DataFrame:
+    """A portfolio-wide or per-client debt CSV; files that are not debt tables give an empty frame."""
+    try:
+        raw = pd.read_csv(path, dtype=str)
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as e:
+        print(f"  -> Could not read debt report '{os.path.basename(path)}': {e}. Skipping.")
+        return pd.DataFrame(columns=DEBT_COLUMNS)
+    # Per-client files live in client_<n>/ folders without a client column
+    folder_match = re.search(r'client_(\d+)', os.path.basename(os.path.dirname(path)))
+    return normalize_debt_frame(raw, os.path.basename(path), folder_match.group(1) if folder_match else None)
+
+def parse_debt_text(content: str, source: str) -> pd.DataFrame:
+    """
+    Debt rows from a report's text: "<creditor/type> <balance> <monthly payment>"
+    lines after the debt heading, or only the "Total Monthly Debt Payments" line
+    when the report has no itemized table.
+    """
+    section = DEBT_SECTION_PATTERN.search(content)
+    if section is None:
+        return pd.DataFrame(columns=DEBT_COLUMNS)
+    id_match = re.search(r'Client ID:\s*\**\s*(\d+)', content)
+    client_id = id_match.group(1) if id_match else 'UNKNOWN'
+
+    rows = [(debt_type.strip(), balance, payment) for debt_type, balance, payment in DEBT_ROW_PATTERN.findall(section.group(1))
+            if not debt_type.strip().lower().startswith('total')]
+    if not rows:
+        total_match = TOTAL_PAYMENT_PATTERN.search(content)
+        if total_match is None:
+            return pd.DataFrame(columns=DEBT_COLUMNS)
+        rows = [('Total reported', 'N/A', total_match.group(1))]
+    raw = pd.DataFrame(rows, columns=['debt_type', 'balance', 'monthly_payment'])
+    return normalize_debt_frame(raw, source, client_id)
+
+def parse_debt_pdf(path: str) -> pd.DataFrame:
+    try:
+        with fitz.open(path) as doc:
+            content = "".join(doc[number].get_text() for number in range(min(doc.page_count, DEBT_REPORT_MAX_PAGES)))
+    except Exception as e:
+        print(f"Error reading '{path}': {e}. Skipping.")
+        return pd.DataFrame(columns=DEBT_COLUMNS)
+    return parse_debt_text(content, os.path.basename(path))
+
+def load_debt_reports(paths: List[str]) -> pd.DataFrame:
+    """
+    Parses every debt report among `paths` (CSV or PDF); other documents
+    contribute nothing. An account listed identically in two uploads is counted
+    once, while identical accounts within one report (two cards with the same
+    balance and payment) are all kept.
+    """
+    frames = []
+    for path in paths:
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.csv':
+            frames.append(parse_debt_csv(path))
+        elif extension == '.pdf':
+            frames.append(parse_debt_pdf(path))
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=DEBT_COLUMNS)
+    debts = pd.concat([frame.assign(_report=i) for i, frame in enumerate(frames)], ignore_index=True)
+    account = ['client_id', 'debt_type', 'balance', 'monthly_payment']
+    # The n-th copy of an account within its report only collides with the n-th copy in another report
+    debts['_occurrence'] = debts.groupby(account + ['_report'], dropna=False, sort=False).cumcount()
+    return debts[~debts.duplicated(account + ['_occurrence'])].drop(columns=['_report', '_occurrence']).reset_index(drop=True)
+
+# --- Aggregation & Join ---
+
+def aggregate_debts(debts: pd.DataFrame) -> pd.DataFrame:
+    """One row per client: total monthly obligations, total outstanding balance and account count."""
+    if debts.empty:
+        return pd.DataFrame(columns=['client_id', *DEBT_FEATURES])
+    grouped = debts.groupby(debts['client_id'].astype(str), sort=False)
+    return pd.DataFrame({
+        'existing_debt_monthly': grouped['monthly_payment'].sum(),
+        'existing_debt_balance': grouped['balance'].sum(min_count=1).fillna(0.0),
+        'debt_accounts': grouped.size(),
+    }).rename_axis('client_id').reset_index()
+
+def attach_existing_debt(df_client_info: pd.DataFrame, debts: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds DEBT_FEATURES to every profile with one hash join on client_id;
+    clients without a debt report get zeros. Existing debt columns are replaced.
+    """
+    if df_client_info.empty:
+        return df_client_info
+    profiles = df_client_info.drop(columns=[column for column in DEBT_FEATURES if column in df_client_info.columns])
+    totals = aggregate_debts(debts)
+    merged = (profiles.assign(_join_key=profiles['client_id'].astype(str))
+              .merge(totals.rename(columns={'client_id': '_join_key'}), how='left', on='_join_key', validate='many_to_one')
+              .drop(columns='_join_key'))
+    merged[DEBT_FEATURES] = merged[DEBT_FEATURES].fillna(0.0)
+    merged['debt_accounts'] = merged['debt_accounts'].astype(int)
+    return merged
+
+def combine_debt_sources(uploaded: pd.DataFrame, portfolio: pd.DataFrame) -> pd.DataFrame:
+    """Uploaded reports supersede the portfolio file for the clients they cover."""
+    if portfolio.empty:
+        return uploaded
+    portfolio = portfolio[~portfolio['client_id'].astype(str).isin(set(uploaded['client_id'].astype(str)))]
+    frames = [frame for frame in (uploaded, portfolio) if not frame.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=DEBT_COLUMNS)
+
+# --- Benchmark ---
+
+def _synthetic_debts(n_clients: int, accounts_per_client: int = 3, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    n_rows = n_clients * accounts_per_client
+    balance = rng.gamma(2.0, 6_000.0, n_rows).round(2)
+    return pd.DataFrame({
+        'client_id': rng.integers(0, n_clients, n_rows).astype(str),
+        'debt_type': rng.choice(['Credit Card', 'Auto Loan', 'Student Loan', 'Mortgage', 'Personal Loan'], n_rows),
+        'balance': balance,
+        'monthly_payment': (balance * rng.uniform(0.01, 0.05, n_rows)).round(2),
+        'source': 'synthetic',
+    })
+
+def benchmark_join(n_clients: int = 10_000) -> Dict[str, float]:
+    """Attaching debt to `n_clients` profiles: one merge vs. a filtered lookup per client."""
+    debts = _synthetic_debts(n_clients)
+    profiles = pd.DataFrame({'client_id': np.arange(n_clients).astype(str), 'annual_income': 60_000.0})
+
+    started = time.perf_counter()
+    joined = attach_existing_debt(profiles, debts)
+    merge_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    per_client = [float(debts.loc[debts['client_id'] == client_id, 'monthly_payment'].sum()) for client_id in profiles['client_id']]
+    loop_seconds = time.perf_counter() - started
+    assert np.allclose(joined['existing_debt_monthly'].to_numpy(), per_client)
+    return {'clients': n_clients, 'rows': len(debts), 'merge_ms': merge_seconds * 1000, 'loop_ms': loop_seconds * 1000}
+
+
+if __name__ == "__main__":
+    print("--- Existing-Debt Join (10,000 clients) ---")
+    timings = benchmark_join()
+    print(f"{timings['rows']:,} debt rows")
+    print(f"Vectorized merge:   {timings['merge_ms']:8.1f} ms")
+    print(f"Per-client lookups: {timings['loop_ms']:8.1f} ms")
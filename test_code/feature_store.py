@@ -0,0 +1,302 @@
+import os
+import hashlib
+import sqlite3
+import pandas as pd
+from datetime import datetime
+from typing import Callable, Dict, Any, Iterable, List, Optional, Tuple
+from test_code.transaction_query import TransactionFilter
+from test_code.identity_resolution import UNRESOLVED_ID
+
+# --- Configuration ---
+
+FEATURE_STORE_PATH = os.path.join('output', 'gasp_features.db')
+
+PROFILE_FIELDS = [
+    'client_id', 'first_name', 'last_name', 'ssn', 'address', 'annual_income', 'employment_status',
+    'credit_score', 'loan_amount_requested', 'collateral_value', 'alimony_payments_monthly', 'sentiment_score',
+]
+TRANSACTION_FIELDS = ['client_id', 'date', 'description', 'type', 'amount', 'balance']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_hash TEXT PRIMARY KEY,
+    file_name TEXT,
+    client_ids TEXT,
+    has_profile INTEGER,
+    processed_at TEXT
+);
+CREATE TABLE IF NOT EXISTS document_transactions (
+    doc_hash TEXT, row_number INTEGER, client_id TEXT, date TEXT, description TEXT,
+    type TEXT, amount REAL, balance REAL,
+    PRIMARY KEY (doc_hash, row_number)
+);
+CREATE TABLE IF NOT EXISTS profiles (
+    client_id TEXT PRIMARY KEY, first_name TEXT, last_name TEXT, ssn TEXT, address TEXT,
+    annual_income REAL, employment_status TEXT, credit_score INTEGER, loan_amount_requested REAL,
+    collateral_value REAL, alimony_payments_monthly REAL, sentiment_score REAL,
+    source_doc_hash TEXT, updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS monthly_aggregates (
+    client_id TEXT, month TEXT, credit_total REAL, debit_total REAL, n_transactions INTEGER,
+    last_date TEXT, closing_balance REAL,
+    PRIMARY KEY (client_id, month)
+);
+CREATE TABLE IF NOT EXISTS aggregated_documents (
+    doc_hash TEXT PRIMARY KEY, merged_at TEXT
+);
+CREATE TABLE IF NOT EXISTS sentiment_aggregates (
+    client_id TEXT PRIMARY KEY, observations INTEGER, sentiment_sum REAL,
+    sentiment_min REAL, sentiment_max REAL, updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS risk_outputs (
+    client_id TEXT, assessed_at TEXT, credit_score INTEGER, model_score REAL, dti TEXT,
+    fraud TEXT, fraud_score REAL, viability TEXT, approval TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_risk_outputs_client ON risk_outputs (client_id, assessed_at);
+CREATE INDEX IF NOT EXISTS idx_document_transactions_client ON document_transactions (client_id, date);
+"""
+
+# --- Helpers ---
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Content hash used as the document key."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec='seconds')
+
+# --- Feature Store ---
+
+class FeatureStore:
+    """
+    Local SQLite store of per-document extraction results and per-client
+    features (profile, monthly transaction aggregates, sentiment aggregates and
+    past risk outputs), keyed by client_id and document hash.
+    """
+
+    def __init__(self, path: str = FEATURE_STORE_PATH):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # --- Documents ---
+
+    def known_documents(self, doc_hashes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        hashes = list(doc_hashes)
+        if not hashes:
+            return {}
+        placeholders = ','.join('?' * len(hashes))
+        rows = self.conn.execute(
+            f"SELECT doc_hash, client_ids, has_profile FROM documents WHERE doc_hash IN ({placeholders})", hashes
+        ).fetchall()
+        return {doc_hash: {'client_ids': client_ids.split(',') if client_ids else [], 'has_profile': bool(has_profile)}
+                for doc_hash, client_ids, has_profile in rows}
+
+    def load_or_extract(self, filepaths: List[str],
+                        extractor: Callable[[List[str]], Tuple[pd.DataFrame, pd.DataFrame]]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Returns the same (profiles, transactions) frames as `extractor`, but only
+        runs it on documents whose hash is not stored yet. New documents are
+        saved and their transactions merged into the monthly aggregates.
+        """
+        hashes = [file_sha256(path) for path in filepaths]
+        known = self.known_documents(hashes)
+        info_frames, trans_frames = [], []
+        for path, doc_hash in zip(filepaths, hashes):
+            if doc_hash in known:
+                print(f"  -> Feature store hit for {os.path.basename(path)}; skipping extraction.")
+                if known[doc_hash]['has_profile']:
+                    info_frames.append(self.load_profiles(known[doc_hash]['client_ids']))
+                trans_frames.append(self.load_document_transactions(doc_hash))
+                continue
+            df_info, df_trans = extractor([path])
+            self.save_document(doc_hash, os.path.basename(path), df_info, df_trans)
+            info_frames.append(df_info)
+            trans_frames.append(df_trans)
+
+        df_info = pd.concat([f for f in info_frames if not f.empty], ignore_index=True) if any(not f.empty for f in info_frames) else pd.DataFrame()
+        df_trans = pd.concat([f for f in trans_frames if not f.empty], ignore_index=True) if any(not f.empty for f in trans_frames) else pd.DataFrame()
+        return df_info, df_trans
+
+    def save_document(self, doc_hash: str, file_name: str, df_info: pd.DataFrame, df_trans: pd.DataFrame) -> None:
+        client_ids = sorted(set(df_info.get('client_id', pd.Series(dtype=str)).astype(str))
+                            | set(df_trans.get('client_id', pd.Series(dtype=str)).astype(str)))
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?)",
+                (doc_hash, file_name, ','.join(client_ids), int(not df_info.empty), _now())
+            )
+            if not df_trans.empty:
+                rows = df_trans[TRANSACTION_FIELDS].assign(date=df_trans['date'].dt.strftime('%Y-%m-%d'))
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO document_transactions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(doc_hash, i, *row) for i, row in enumerate(rows.itertuples(index=False, name=None))]
+                )
+        if not df_info.empty:
+            self.upsert_profiles(df_info, doc_hash)
+        if not df_trans.empty:
+            self.merge_monthly_aggregates(doc_hash, df_trans)
+
+    def load_document_transactions(self, doc_hash: str) -> pd.DataFrame:
+        frame = pd.read_sql_query(
+            f"SELECT {', '.join(TRANSACTION_FIELDS)} FROM document_transactions WHERE doc_hash = ? ORDER BY row_number",
+            self.conn, params=(doc_hash,)
+        )
+        frame['date'] = pd.to_datetime(frame['date'], errors='coerce')
+        return frame
+
+    def scan(self, transaction_filter: TransactionFilter) -> pd.DataFrame:
+        """Transactions across all stored documents, with the filter pushed down into the WHERE clause."""
+        if transaction_filter.lookback_months is not None:
+            where, params = transaction_filter.replace(lookback_months=None, start=None).to_sql()
+            latest = self.conn.execute(f"SELECT MAX(date) FROM document_transactions WHERE {where}", params).fetchone()[0]
+            transaction_filter = transaction_filter.resolve(pd.Timestamp(latest) if latest else None)
+        where, params = transaction_filter.to_sql()
+        frame = pd.read_sql_query(
+            f"SELECT {', '.join(TRANSACTION_FIELDS)} FROM document_transactions WHERE {where} ORDER BY client_id, date, doc_hash, row_number",
+            self.conn, params=params
+        )
+        frame['date'] = pd.to_datetime(frame['date'], errors='coerce')
+        return frame
+
+    # --- Profiles & Sentiment ---
+
+    def upsert_profiles(self, df_info: pd.DataFrame, doc_hash: Optional[str] = None) -> None:
+        rows = df_info.reindex(columns=PROFILE_FIELDS)
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO profiles VALUES ({','.join('?' * (len(PROFILE_FIELDS) + 2))})",
+                [(*row, doc_hash, _now()) for row in rows.itertuples(index=False, name=None)]
+            )
+            self.conn.executemany(
+                """INSERT INTO sentiment_aggregates VALUES (?, 1, ?, ?, ?, ?)
+                   ON CONFLICT(client_id) DO UPDATE SET
+                       observations = observations + 1,
+                       sentiment_sum = sentiment_sum + excluded.sentiment_sum,
+                       sentiment_min = MIN(sentiment_min, excluded.sentiment_min),
+                       sentiment_max = MAX(sentiment_max, excluded.sentiment_max),
+                       updated_at = excluded.updated_at""",
+                [(str(cid), float(score), float(score), float(score), _now())
+                 for cid, score in zip(rows['client_id'], rows['sentiment_score']) if pd.notna(score)]
+            )
+
+    def load_profiles(self, client_ids: Iterable[str]) -> pd.DataFrame:
+        ids = [str(cid) for cid in client_ids]
+        if not ids:
+            return pd.DataFrame(columns=PROFILE_FIELDS)
+        return pd.read_sql_query(
+            f"SELECT {', '.join(PROFILE_FIELDS)} FROM profiles WHERE client_id IN ({','.join('?' * len(ids))})",
+            self.conn, params=ids
+        )
+
+    def sentiment_summary(self, client_id: str) -> Dict[str, Any]:
+        row = self.conn.execute(
+            "SELECT observations, sentiment_sum, sentiment_min, sentiment_max FROM sentiment_aggregates WHERE client_id = ?",
+            (str(client_id),)
+        ).fetchone()
+        if row is None:
+            return {}
+        observations, total, low, high = row
+        return {'observations': observations, 'mean': total / observations, 'min': low, 'max': high}
+
+    # --- Monthly Aggregates ---
+
+    def merge_monthly_aggregates(self, doc_hash: str, df_trans: pd.DataFrame) -> pd.DataFrame:
+        """
+        Folds a document's new transactions into the stored monthly aggregates.
+        A document already merged is skipped by hash, and rows that an earlier
+        merged document already counted (same client, date, description, type,
+        amount and balance, e.g. a re-exported copy of the same statement) are
+        skipped by content, so only new rows and statement months add to the
+        totals. Rows whose client_id is UNKNOWN are left out, since they cannot
+        be attributed to one client's history. Returns the rows that were merged.
+        """
+        frame = df_trans[TRANSACTION_FIELDS].dropna(subset=['date']).copy()
+        frame['client_id'] = frame['client_id'].astype(str)
+        frame = frame[frame['client_id'] != UNRESOLVED_ID]
+        frame['month'] = frame['date'].dt.strftime('%Y-%m')
+
+        merged = self.conn.execute("SELECT 1 FROM aggregated_documents WHERE doc_hash = ?", (doc_hash,)).fetchone()
+        fresh = frame.iloc[:0] if merged else self._uncounted_rows(frame)
+        if fresh.empty:
+            return fresh.drop(columns='month')
+
+        fresh['credit'] = fresh['amount'].where(fresh['type'] == 'CREDIT', 0.0)
+        fresh['debit'] = fresh['amount'].where(fresh['type'] == 'DEBIT', 0.0)
+        ordered = fresh.sort_values('date', kind='stable')
+        monthly = ordered.groupby(['client_id', 'month']).agg(
+            credit_total=('credit', 'sum'), debit_total=('debit', 'sum'), n_transactions=('amount', 'size'),
+            last_date=('date', 'max'), closing_balance=('balance', 'last'),
+        ).reset_index()
+        monthly['last_date'] = monthly['last_date'].dt.strftime('%Y-%m-%d')
+
+        with self.conn:
+            self.conn.executemany(
+                """INSERT INTO monthly_aggregates VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(client_id, month) DO UPDATE SET
+                       credit_total = credit_total + excluded.credit_total,
+                       debit_total = debit_total + excluded.debit_total,
+                       n_transactions = n_transactions + excluded.n_transactions,
+                       last_date = MAX(last_date, excluded.last_date),
+                       closing_balance = CASE WHEN excluded.last_date >= last_date
+                                              THEN excluded.closing_balance ELSE closing_balance END""",
+                list(monthly.itertuples(index=False, name=None))
+            )
+            self.conn.execute("INSERT INTO aggregated_documents VALUES (?, ?)", (doc_hash, _now()))
+        return fresh.drop(columns=['month', 'credit', 'debit'])
+
+    def _uncounted_rows(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """The rows of `frame` not already stored by a document merged into the aggregates."""
+        ids = sorted(frame['client_id'].unique())
+        if not ids:
+            return frame
+        counted = pd.read_sql_query(
+            f"""SELECT DISTINCT {', '.join(TRANSACTION_FIELDS)} FROM document_transactions
+                WHERE doc_hash IN (SELECT doc_hash FROM aggregated_documents)
+                  AND client_id IN ({','.join('?' * len(ids))})""",
+            self.conn, params=ids
+        )
+        if counted.empty:
+            return frame
+        keys = frame[TRANSACTION_FIELDS].assign(date=frame['date'].dt.strftime('%Y-%m-%d'))
+        counted = counted.astype({'client_id': str, 'date': str, 'description': str, 'type': str})
+        seen = keys.merge(counted.assign(_counted=True), on=TRANSACTION_FIELDS, how='left')['_counted'].notna().to_numpy()
+        return frame[~seen]
+
+    def monthly_history(self, client_ids: Iterable[str]) -> pd.DataFrame:
+        """Stored monthly history in the same shape as stress_test.monthly_cash_flows."""
+        ids = [str(cid) for cid in client_ids]
+        if not ids:
+            return pd.DataFrame(columns=['client_id', 'month', 'CREDIT', 'DEBIT', 'closing_balance'])
+        history = pd.read_sql_query(
+            f"""SELECT client_id, month, credit_total AS CREDIT, debit_total AS DEBIT, closing_balance
+                FROM monthly_aggregates WHERE client_id IN ({','.join('?' * len(ids))}) ORDER BY client_id, month""",
+            self.conn, params=ids
+        )
+        history['month'] = pd.PeriodIndex(history['month'], freq='M')
+        return history
+
+    # --- Risk Outputs ---
+
+    def record_risk_output(self, client_id: str, results: Dict[str, Any]) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO risk_outputs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (str(client_id), _now(), results.get('credit_score'), results.get('model_score'), results.get('dti'),
+                 results.get('fraud'), results.get('fraud_score'), results.get('viability'), results.get('approval'))
+            )
+
+    def risk_history(self, client_id: str) -> pd.DataFrame:
+        return pd.read_sql_query(
+            "SELECT * FROM risk_outputs WHERE client_id = ? ORDER BY assessed_at", self.conn, params=(str(client_id),)
+        )
@@ -0,0 +1,171 @@
+import os
+import time
+import uuid
+import pickle
+import tempfile
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # frames then cross the process boundary pickled, as before
+    pa = None
+
+# Frames handed from a worker process back to its parent used to be pickled
+# whole by the process pool. The producer now writes each frame as one Arrow
+# record batch into an uncompressed IPC file on tmpfs and sends back only the
+# path; the consumer memory-maps the file and wraps the buffers as pandas
+# columns, so numeric and string data are never copied or re-parsed.
+
+# --- Configuration ---
+# Benchmark from the repository root:  python -m test_code.frame_ipc [n_rows]
+
+SHARED_ROOT = '/dev/shm' if os.path.isdir('/dev/shm') else None  # None -> the system temp dir
+IPC_SUFFIX = '.arrow'
+
+# --- Producer ---
+
+def write_frame_ipc(frame: pd.DataFrame, path: str) -> int:
+    """Writes `frame` as a single record batch (one chunk per column keeps the read zero-copy). Returns bytes written."""
+    table = pa.Table.from_pandas(frame, preserve_index=None).combine_chunks()
+    with pa.OSFile(path + '.tmp', 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        written = sink.tell()
+    os.replace(path + '.tmp', path)
+    return written
+
+def export_frames(frames: Dict[str, pd.DataFrame], directory: Optional[str] = None) -> Dict[str, Tuple[str, Any]]:
+    """
+    The picklable handle a worker returns instead of its frames: name ->
+    ('arrow', path) for every frame written to `directory`, or ('pickle',
+    frame) when pyarrow is missing or cannot represent a column (e.g. mixed
+    Python objects).
+    """
+    directory = directory or SHARED_ROOT or tempfile.gettempdir()
+    handle = {}
+    for name, frame in frames.items():
+        if pa is None:
+            handle[name] = ('pickle', frame)
+            continue
+        path = os.path.join(directory, f"{name}_{uuid.uuid4().hex}{IPC_SUFFIX}")
+        try:
+            write_frame_ipc(frame, path)
+            handle[name] = ('arrow', path)
+        except (pa.ArrowException, TypeError, ValueError):
+            handle[name] = ('pickle', frame)
+    return handle
+
+# --- Consumer ---
+
+def read_frame_ipc(path: str) -> pd.DataFrame:
+    """
+    Wraps a memory-mapped IPC file as a DataFrame without copying: columns
+    stay separate blocks (split_blocks) that point into the mapping, which
+    lives as long as any column does.
+    """
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True)
+
+def import_frames(handle: Dict[str, Tuple[str, Any]], remove: bool = True) -> Dict[str, pd.DataFrame]:
+    """
+    The frames behind an export_frames handle. With `remove` the files are
+    unlinked right away; the mapped pages stay valid until the frames are
+    released.
+    """
+    frames = {}
+    for name, (kind, payload) in handle.items():
+        if kind == 'pickle':
+            frames[name] = payload
+            continue
+        frames[name] = read_frame_ipc(payload)
+        if remove:
+            try:
+                os.remove(payload)
+            except OSError:  # Windows keeps mapped files locked; the spool directory is removed later
+                pass
+    return frames
+
+# --- Benchmark ---
+
+def synthetic_transactions(n_rows: int, n_clients: int = 1_000, seed: int = 0) -> pd.DataFrame:
+    """A transactions frame shaped like extraction output (string ids and descriptions, float amounts)."""
+    rng = np.random.default_rng(seed)
+    descriptions = np.array(['Direct Deposit - Payroll', 'POS Debit - Grocery Store', 'Utility Bill - Electric Co',
+                             'ATM Withdrawal', 'Online Transfer from Savings', 'Card Payment - Restaurant'])
+    amounts = rng.uniform(5, 2_500, n_rows).round(2)
+    types = rng.choice(['CREDIT', 'DEBIT'], n_rows)
+    return pd.DataFrame({
+        'date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, n_rows), unit='D'),
+        'description': descriptions[rng.integers(0, len(descriptions), n_rows)],
+        'type': types,
+        'amount': amounts,
+        'balance': (5_000 + np.cumsum(np.where(types == 'CREDIT', amounts, -amounts))).round(2),
+        'client_id': rng.integers(0, n_clients, n_rows).astype(str),
+    })
+
+def _produce(n_rows: int, via_arrow: bool) -> Tuple[Any, float]:
+    """Worker side of the process benchmark: (frame or handle, seconds spent generating the frame)."""
+    started = time.perf_counter()
+    frame = synthetic_transactions(n_rows)
+    generated = time.perf_counter() - started
+    return (export_frames({'transactions': frame}) if via_arrow else frame), generated
+
+def benchmark_transfer(n_rows: int = 1_000_000, repeats: int = 3) -> Dict[str, float]:
+    """
+    Serialize / deserialize milliseconds and payload bytes for pickle vs.
+    Arrow IPC on an `n_rows` transaction frame (best of `repeats`), plus the
+    time for a worker process to hand the frame to its parent each way
+    (round trip minus the worker's frame generation).
+    """
+    frame = synthetic_transactions(n_rows)
+    results = {'rows': n_rows}
+
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        payload = pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL)
+        dumped = time.perf_counter()
+        pickle.loads(payload)
+        timings.append(((dumped - started) * 1000, (time.perf_counter() - dumped) * 1000))
+    results['pickle_write_ms'], results['pickle_read_ms'] = min(timings)
+    results['pickle_bytes'] = len(payload)
+
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        handle = export_frames({'transactions': frame})
+        written = time.perf_counter()
+        results['arrow_bytes'] = os.path.getsize(handle['transactions'][1])
+        roundtrip = import_frames(handle)['transactions']
+        timings.append(((written - started) * 1000, (time.perf_counter() - written) * 1000))
+    results['arrow_write_ms'], results['arrow_read_ms'] = min(timings)
+    pd.testing.assert_frame_equal(roundtrip, frame)
+
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        pool.submit(int).result()  # start the worker outside the timings
+        for via_arrow, key in ((False, 'pickle_process_ms'), (True, 'arrow_process_ms')):
+            started = time.perf_counter()
+            received, generation_seconds = pool.submit(_produce, n_rows, via_arrow).result()
+            if via_arrow:
+                received = import_frames(received)['transactions']
+            results[key] = (time.perf_counter() - started - generation_seconds) * 1000
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    if pa is None:
+        sys.exit("pyarrow is not installed; frames are pickled across processes.")
+    print(f"--- DataFrame Handoff, {rows:,} transaction rows ---")
+    results = benchmark_transfer(rows)
+    print(f"{'':8} {'write ms':>9} {'read ms':>9} {'MB':>8} {'worker -> parent ms':>20}")
+    for kind in ('pickle', 'arrow'):
+        print(f"{kind:8} {results[f'{kind}_write_ms']:>9.1f} {results[f'{kind}_read_ms']:>9.1f} "
+              f"{results[f'{kind}_bytes'] / 1e6:>8.1f} {results[f'{kind}_process_ms']:>20.1f}")
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+from typing import Tuple
+from test_code.reconciliation import BALANCE_TOLERANCE, balance_gaps
+
+# --- Configuration ---
+
+ROLLING_WINDOW = 10            # Prior transactions used for each row's baseline
+MIN_PERIODS = 5                # Baseline needs at least this many prior rows
+ZSCORE_THRESHOLD = 3.0         # |z| above this is an amount spike
+ROUND_AMOUNT_MIN = 100.0       # Only amounts at or above this count as "round"
+BURST_MIN_TRANSACTIONS = 4     # Same-day transaction count that counts as a burst
+RATE_SATURATION = 0.20         # Share of flagged rows at which a signal maxes out
+
+FLAG_WEIGHTS = {
+    'flag_amount_spike': 0.25,
+    'flag_balance_break': 0.35,
+    'flag_duplicate': 0.20,
+    'flag_round_amount': 0.05,
+    'flag_burst': 0.15,
+}
+
+# --- Row-Level Signals ---
+
+def add_fraud_signals(df_transactions: pd.DataFrame, window: int = ROLLING_WINDOW) -> pd.DataFrame:
+    """
+    Returns a copy of the transaction frame with rolling statistics and one
+    boolean column per fraud signal. Rows keep their statement order within each
+    client (the running balance depends on it), and every step is a grouped
+    shift/rolling/duplicated operation, so cost stays linear in the row count.
+    """
+    frame = df_transactions.reset_index(drop=True).copy()
+    by_client = frame.groupby('client_id', sort=False)
+
+    # Rolling baseline over the *previous* `window` amounts so a spike does not mask itself
+    prior_amount = by_client['amount'].shift(1)
+    rolling = prior_amount.groupby(frame['client_id'], sort=False).rolling(window, min_periods=MIN_PERIODS)
+    frame['rolling_mean'] = rolling.mean().reset_index(level=0, drop=True)
+    frame['rolling_std'] = rolling.std().reset_index(level=0, drop=True)
+    std = frame['rolling_std'].where(frame['rolling_std'] > 0)
+    frame['amount_zscore'] = (frame['amount'] - frame['rolling_mean']) / std
+    frame['flag_amount_spike'] = frame['amount_zscore'].abs() > ZSCORE_THRESHOLD
+
+    # Balance continuity: balance[i] should equal balance[i-1] +/- amount[i]
+    frame['balance_gap'] = balance_gaps(frame)
+    frame['flag_balance_break'] = frame['balance_gap'].abs() > BALANCE_TOLERANCE
+
+    frame['flag_duplicate'] = frame.duplicated(['client_id', 'date', 'description', 'type', 'amount'], keep='first')
+
+    cents = np.round(frame['amount'].to_numpy() * 100).astype(np.int64)
+    frame['flag_round_amount'] = (frame['amount'] >= ROUND_AMOUNT_MIN) & (cents % 10000 == 0)
+
+    daily_count = frame.groupby(['client_id', 'date'], sort=False)['amount'].transform('size')
+    frame['flag_burst'] = daily_count >= BURST_MIN_TRANSACTIONS
+
+    flag_columns = list(FLAG_WEIGHTS)
+    frame['flag_count'] = frame[flag_columns].sum(axis=1)
+    return frame
+
+# --- Client-Level Scoring ---
+
+def score_fraud_signals(signals: pd.DataFrame) -> pd.DataFrame:
+    """
+    Collapses row flags into a 0-1 fraud score per client: each signal's flagged
+    share is scaled against RATE_SATURATION, capped at 1 and weighted.
+    """
+    flag_columns = list(FLAG_WEIGHTS)
+    rates = signals.groupby('client_id', sort=False)[flag_columns].mean()
+    weights = pd.Series(FLAG_WEIGHTS)
+    scores = (rates / RATE_SATURATION).clip(upper=1.0).mul(weights, axis=1).sum(axis=1)
+
+    summary = rates.add_suffix('_rate')
+    summary['flagged_rows'] = (signals['flag_count'] > 0).groupby(signals['client_id'], sort=False).sum().astype(int)
+    summary['fraud_score'] = scores.round(4)
+    summary['fraud_risk'] = fraud_risk_tier(summary['fraud_score'])
+    return summary.reset_index()
+
+def fraud_risk_tier(scores: pd.Series) -> pd.Series:
+    """Maps numeric fraud scores to the Low/Medium/High labels shown in the UI."""
+    return pd.Series(
+        np.select([scores >= 0.5, scores >= 0.2], ['High', 'Medium'], default='Low'),
+        index=scores.index
+    )
+
+def detect_fraud_signals(df_transactions: pd.DataFrame, window: int = ROLLING_WINDOW) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Runs the full detector. Returns (flagged_rows, client_scores): the
+    transactions that tripped at least one signal, and one score row per client.
+    """
+    if df_transactions.empty:
+        return df_transactions.copy(), pd.DataFrame(columns=['client_id', 'flagged_rows', 'fraud_score', 'fraud_risk'])
+    signals = add_fraud_signals(df_transactions, window)
+    return signals[signals['flag_count'] > 0], score_fraud_signals(signals)
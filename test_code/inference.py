@@ -0,0 +1,102 @@
+import json
+import pickle
+import numpy as np
+from typing import Dict, Any, List
+
+# Pure-NumPy runtime for models exported by test_code/models/export_models.py.
+# Nothing here imports TensorFlow or Keras.
+
+# --- Activations ---
+
+def _softmax(x: np.ndarray) -> np.ndarray:
+    shifted = np.exp(x - x.max(axis=-1, keepdims=True))
+    return shifted / shifted.sum(axis=-1, keepdims=True)
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0.0),
+    'sigmoid': lambda x: np.exp(-np.logaddexp(0.0, -x)),
+    'tanh': np.tanh,
+    'softmax': _softmax,
+}
+
+SUPPORTED_LAYERS = ('InputLayer', 'Dense', 'Dropout', 'Embedding', 'GlobalAveragePooling1D', 'Flatten')
+
+# --- Model Runtime ---
+
+class NumpyModel:
+    """A Sequential stack of layers evaluated with NumPy matmuls."""
+
+    def __init__(self, layers: List[Dict[str, Any]], weights: Dict[str, np.ndarray], input_shape: List[Any]):
+        self.layers = layers
+        self.weights = weights
+        self.input_shape = input_shape
+
+    @classmethod
+    def load(cls, path: str) -> 'NumpyModel':
+        """Loads an exported .npz (layer spec in `__spec__`, one array per weight)."""
+        with np.load(path, allow_pickle=False) as archive:
+            spec = json.loads(str(archive['__spec__']))
+            weights = {name: archive[name] for name in archive.files if name != '__spec__'}
+        return cls(spec['layers'], weights, spec['input_shape'])
+
+    def predict(self, inputs: np.ndarray) -> np.ndarray:
+        x = np.asarray(inputs)
+        mask = None
+        for index, layer in enumerate(self.layers):
+            kind = layer['class_name']
+            if kind == 'Dense':
+                x = x.astype(np.float32, copy=False) @ self.weights[f'{index}_kernel']
+                if layer.get('use_bias', True):
+                    x = x + self.weights[f'{index}_bias']
+                x = ACTIVATIONS[layer.get('activation', 'linear')](x)
+            elif kind == 'Embedding':
+                if layer.get('mask_zero'):
+                    mask = x != 0
+                x = self.weights[f'{index}_embeddings'][x.astype(np.intp, copy=False)]
+            elif kind == 'GlobalAveragePooling1D':
+                if mask is None:
+                    x = x.mean(axis=1)
+                else:
+                    counts = np.maximum(mask.sum(axis=1, keepdims=True), 1)
+                    x = (x * mask[..., None]).sum(axis=1) / counts
+                    mask = None
+            elif kind == 'Flatten':
+                x = x.reshape(len(x), -1)
+            # InputLayer and Dropout are identities at inference time
+        return x
+
+    def __call__(self, inputs: np.ndarray) -> np.ndarray:
+        return self.predict(inputs)
+
+# --- Tokenizer State ---
+
+class _TokenizerState:
+    """Stand-in for the Keras Tokenizer class so its pickle loads without Keras."""
+
+
+class _TokenizerUnpickler(pickle.Unpickler):
+    def find_class(self, module: str, name: str):
+        if name == 'Tokenizer':
+            return _TokenizerState
+        return super().find_class(module, name)
+
+def load_tokenizer_state(path: str) -> Dict[str, Any]:
+    """
+    Reads a pickled Keras Tokenizer (or an exported vocab JSON) and returns its
+    settings plus `word_index` as plain Python objects.
+    """
+    if path.endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    with open(path, 'rb') as f:
+        state = _TokenizerUnpickler(f).load().__dict__
+    return {
+        'filters': state.get('filters', ''),
+        'lower': state.get('lower', True),
+        'split': state.get('split', ' '),
+        'char_level': state.get('char_level', False),
+        'num_words': state.get('num_words'),
+        'oov_token': state.get('oov_token'),
+        'word_index': dict(state['word_index']),
+    }
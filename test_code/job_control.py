@@ -0,0 +1,78 @@
+import threading
+import time
+from typing import Dict, Any, Callable, Optional
+
+# --- Configuration ---
+
+# Share of the overall progress bar each pipeline stage covers, in run order.
+STAGE_WEIGHTS = {
+    'extraction': 0.70,
+    'reconciliation': 0.05,
+    'analysis': 0.15,
+    'visuals': 0.07,
+    'persistence': 0.03,
+}
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+# --- Cancellation ---
+
+class PipelineCancelled(Exception):
+    """Raised at the next chunk boundary after a CancellationToken is cancelled."""
+
+
+class CancellationToken:
+    """Thread-safe flag a caller sets to stop a running job between chunks."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise PipelineCancelled("Pipeline run was cancelled.")
+
+# --- Progress ---
+
+class ProgressReporter:
+    """
+    Turns stage / file / page positions into progress events of the form
+    {'stage', 'fraction', 'message', ...} for an optional callback, and checks
+    the cancellation token every time it reports, so every event is also a
+    cancellation point.
+    """
+
+    def __init__(self, callback: Optional[ProgressCallback] = None, cancel_token: Optional[CancellationToken] = None):
+        self.callback = callback
+        self.cancel_token = cancel_token
+        self.started = time.perf_counter()
+        self._stage_offsets = {}
+        offset = 0.0
+        for stage, weight in STAGE_WEIGHTS.items():
+            self._stage_offsets[stage] = offset
+            offset += weight
+
+    def check(self) -> None:
+        if self.cancel_token is not None:
+            self.cancel_token.raise_if_cancelled()
+
+    def report(self, stage: str, stage_fraction: float, message: str, **details: Any) -> None:
+        """`stage_fraction` is how far through `stage` (0-1) the job is."""
+        self.check()
+        if self.callback is None:
+            return
+        fraction = self._stage_offsets[stage] + STAGE_WEIGHTS[stage] * min(max(stage_fraction, 0.0), 1.0)
+        self.callback(dict(details, stage=stage, fraction=min(fraction, 1.0), message=message,
+                           elapsed=time.perf_counter() - self.started))
+
+    def file_page(self, file_index: int, n_files: int, file_name: str, page: int, n_pages: int) -> None:
+        """Extraction progress for page `page` (1-based) of file `file_index` (0-based)."""
+        stage_fraction = (file_index + page / max(n_pages, 1)) / max(n_files, 1)
+        self.report('extraction', stage_fraction, f"Reading {file_name} (page {page}/{n_pages}, file {file_index + 1}/{n_files})",
+                    file=file_name, file_index=file_index, files=n_files, page=page, pages=n_pages)
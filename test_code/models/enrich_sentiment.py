@@ -0,0 +1,244 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional, Tuple
+
+from test_code.text_tokenizer import MAX_LEN, load_vocabulary, texts_to_padded
+from test_code.shared_models import publish_models, attach_models
+
+# --- Configuration ---
+# Run from the repository root:
+#   python -m test_code.models.enrich_sentiment --model test_code/models/sentiment_analysis.npz --workers 8
+
+MODELS_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASES_DIR = os.path.join(os.path.dirname(MODELS_DIR), 'databases')
+CSV_PATH = os.path.join(DATABASES_DIR, 'mock_portfolios copy', 'all_statements.csv')
+OUTPUT_PATH = os.path.join(DATABASES_DIR, 'mock_portfolios copy', 'allstatements_with_sentiment.csv')
+MODEL_PATH = os.path.join(MODELS_DIR, 'sentiment_analysis.npz')
+TOKENIZER_PATH = os.path.join(MODELS_DIR, 'sentiment_vocab.json')
+DEFAULT_COLUMNS = ["date", "description", "type", "amount", "balance", "client_id"]
+PREDICT_BATCH_SIZE = 4096
+
+# --- Worker State (one model per process) ---
+
+_WORKER_MODEL = None
+_WORKER_VOCAB = None
+
+def load_sentiment_model(model_path: str):
+    """Exported .npz models run on the NumPy runtime; .keras files fall back to Keras."""
+    if model_path.endswith('.npz'):
+        from test_code.inference import NumpyModel
+        return NumpyModel.load(model_path).predict
+    from keras.models import load_model
+    model = load_model(model_path, compile=False)
+    return lambda batch: model.predict(batch, verbose=0)
+
+def check_sentiment_model(model_path: str, max_len: int = MAX_LEN) -> None:
+    """
+    Fails before any worker starts when the model is missing or an exported
+    model does not take `max_len` token ids per row. The text model
+    (sentiment_analysis.keras) is not shipped with the repository, and
+    sentiment_regressor.npz is an 8-feature regressor, not a text model.
+    """
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Sentiment model '{model_path}' not found. This job needs the token-sequence text model "
+                                f"(sentiment_analysis.keras, exported to .npz by models/export_models.py), which is not "
+                                f"shipped with the repository.")
+    if model_path.endswith('.npz'):
+        from test_code.inference import NumpyModel
+        width = NumpyModel.load(model_path).input_shape[-1]
+        if width != max_len:
+            raise ValueError(f"'{os.path.basename(model_path)}' takes {width} input columns, but the job feeds {max_len} "
+                             f"token ids per description; it is not a text model.")
+
+def _init_worker(model_path: str, tokenizer_path: str) -> None:
+    global _WORKER_MODEL, _WORKER_VOCAB
+    _WORKER_MODEL = load_sentiment_model(model_path)
+    _WORKER_VOCAB = load_vocabulary(tokenizer_path)
+
+def _init_shared_worker(shared_dir: str) -> None:
+    """Attaches to the weights and vocabulary the parent published instead of loading private copies."""
+    global _WORKER_MODEL, _WORKER_VOCAB
+    resources = attach_models(shared_dir)
+    _WORKER_MODEL = resources['sentiment'].predict
+    _WORKER_VOCAB = resources['vocabulary']
+
+def classify_scores(scores: np.ndarray) -> np.ndarray:
+    """Vectorized version of train_sentiment.classify_score (0.33 / 0.67 thresholds)."""
+    return np.select([scores < 0.33, scores < 0.67], ['negative', 'neutral'], default='positive')
+
+# --- Sharding ---
+
+def read_header(csv_path: str) -> Tuple[Optional[List[str]], int]:
+    """Returns (column names or None if headerless, byte offset of the first data row)."""
+    with open(csv_path, 'rb') as f:
+        first_line = f.readline()
+    names = next(iter(pd.read_csv(io.BytesIO(first_line), header=None).itertuples(index=False)))
+    if 'description' in [str(name).strip() for name in names]:
+        return [str(name).strip() for name in names], len(first_line)
+    return None, 0
+
+def plan_byte_shards(csv_path: str, n_shards: int) -> List[Tuple[int, int]]:
+    """
+    Splits the data section of a CSV into `n_shards` contiguous byte ranges whose
+    boundaries are moved forward to the next newline, so no row is split.
+    Assumes descriptions never contain embedded newlines.
+    """
+    _, data_start = read_header(csv_path)
+    file_size = os.path.getsize(csv_path)
+    step = max(1, (file_size - data_start) // n_shards)
+    boundaries = [data_start]
+    with open(csv_path, 'rb') as f:
+        for shard in range(1, n_shards):
+            f.seek(max(data_start + shard * step, boundaries[-1]))
+            f.readline()
+            position = min(f.tell(), file_size)
+            if position > boundaries[-1]:
+                boundaries.append(position)
+    boundaries.append(file_size)
+    return [(start, end) for start, end in zip(boundaries[:-1], boundaries[1:]) if end > start]
+
+def _shard_paths(parts_dir: str, shard_index: int) -> Tuple[str, str]:
+    stem = os.path.join(parts_dir, f"shard_{shard_index:05d}")
+    return stem + '.csv', stem + '.json'
+
+# --- Shard Scoring ---
+
+def score_shard(csv_path: str, shard_index: int, start: int, end: int, columns: List[str], parts_dir: str) -> Dict[str, Any]:
+    """Scores one byte range and writes it (plus a completion marker) to `parts_dir`."""
+    started = time.perf_counter()
+    with open(csv_path, 'rb') as f:
+        f.seek(start)
+        shard_df = pd.read_csv(io.BytesIO(f.read(end - start)), names=columns, header=None)
+
+    padded = texts_to_padded(shard_df['description'].astype(str).str.lower(), _WORKER_VOCAB, MAX_LEN)
+    scores = np.empty(len(padded), dtype=np.float32)
+    for batch_start in range(0, len(padded), PREDICT_BATCH_SIZE):
+        batch = padded[batch_start:batch_start + PREDICT_BATCH_SIZE]
+        scores[batch_start:batch_start + len(batch)] = np.asarray(_WORKER_MODEL(batch)).reshape(-1)
+    shard_df['sentiment_score'] = scores
+    shard_df['sentiment'] = classify_scores(scores)
+
+    part_path, marker_path = _shard_paths(parts_dir, shard_index)
+    shard_df.to_csv(part_path + '.tmp', index=False)
+    os.replace(part_path + '.tmp', part_path)
+
+    elapsed = time.perf_counter() - started
+    stats = {'shard': shard_index, 'pid': os.getpid(), 'rows': len(shard_df), 'seconds': elapsed,
+             'rows_per_sec': len(shard_df) / elapsed if elapsed else 0.0}
+    with open(marker_path, 'w') as f:
+        json.dump(stats, f)
+    return stats
+
+# --- Merge ---
+
+def merge_shards(parts_dir: str, n_shards: int, output_path: str) -> int:
+    """Concatenates shard outputs in shard order (= original row order); returns bytes written."""
+    with open(output_path + '.tmp', 'wb') as out:
+        for shard_index in range(n_shards):
+            part_path, _ = _shard_paths(parts_dir, shard_index)
+            with open(part_path, 'rb') as part:
+                header = part.readline()
+                if shard_index == 0:
+                    out.write(header)
+                shutil.copyfileobj(part, out, length=16 * 1024 * 1024)
+        written = out.tell()
+    os.replace(output_path + '.tmp', output_path)
+    return written
+
+# --- Job Driver ---
+
+def run_enrichment(csv_path: str = CSV_PATH, output_path: str = OUTPUT_PATH, model_path: str = MODEL_PATH,
+                   tokenizer_path: str = TOKENIZER_PATH, n_workers: int = os.cpu_count() or 1,
+                   n_shards: Optional[int] = None, share_models: bool = True) -> pd.DataFrame:
+    """
+    Runs the resumable sharded job. Completed shards (those with a marker) are
+    skipped on re-runs as long as the input file and shard plan are unchanged.
+    With `share_models`, an exported .npz model and the vocabulary are
+    published once and memory-mapped by every worker (see shared_models).
+    Returns the per-shard stats.
+    """
+    check_sentiment_model(model_path)
+    parts_dir = output_path + '.parts'
+    os.makedirs(parts_dir, exist_ok=True)
+    header, _ = read_header(csv_path)
+    columns = header or DEFAULT_COLUMNS
+
+    stat = os.stat(csv_path)
+    plan = {'input': os.path.abspath(csv_path), 'size': stat.st_size, 'mtime': stat.st_mtime,
+            'shards': plan_byte_shards(csv_path, n_shards or n_workers * 4)}
+    manifest_path = os.path.join(parts_dir, 'manifest.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f)
+        if previous != json.loads(json.dumps(plan)):
+            print("  -> Input or shard plan changed; discarding previous partial results.")
+            shutil.rmtree(parts_dir)
+            os.makedirs(parts_dir)
+    with open(manifest_path, 'w') as f:
+        json.dump(plan, f)
+
+    stats, pending = [], []
+    for shard_index, (start, end) in enumerate(plan['shards']):
+        _, marker_path = _shard_paths(parts_dir, shard_index)
+        if os.path.exists(marker_path):
+            with open(marker_path) as f:
+                stats.append(dict(json.load(f), resumed=True))
+        else:
+            pending.append((shard_index, start, end))
+    print(f"  -> {len(plan['shards'])} shards, {len(stats)} already complete, {len(pending)} to score on {n_workers} workers")
+
+    shared = publish_models(None, model_path, tokenizer_path) if share_models and pending and model_path.endswith('.npz') else None
+    initializer, initargs = (_init_shared_worker, (shared.directory,)) if shared else (_init_worker, (model_path, tokenizer_path))
+    try:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=initializer, initargs=initargs) as pool:
+            futures = [pool.submit(score_shard, csv_path, index, start, end, columns, parts_dir) for index, start, end in pending]
+            for future in as_completed(futures):
+                result = future.result()
+                stats.append(dict(result, resumed=False))
+                print(f"  -> shard {result['shard']:>5} done by pid {result['pid']}: {result['rows']:,} rows at {result['rows_per_sec']:,.0f} rows/sec")
+    finally:
+        if shared is not None:
+            shared.close()
+
+    merge_shards(parts_dir, len(plan['shards']), output_path)
+    return pd.DataFrame(stats).sort_values('shard').reset_index(drop=True)
+
+def worker_throughput(stats: pd.DataFrame) -> pd.DataFrame:
+    """Rows, busy seconds and rows/sec per worker process for the shards scored this run."""
+    fresh = stats[~stats['resumed']]
+    report = fresh.groupby('pid').agg(shards=('shard', 'count'), rows=('rows', 'sum'), seconds=('seconds', 'sum'))
+    report['rows_per_sec'] = report['rows'] / report['seconds']
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded multi-process sentiment enrichment of a statements CSV.")
+    parser.add_argument('--input', default=CSV_PATH)
+    parser.add_argument('--output', default=OUTPUT_PATH)
+    parser.add_argument('--model', default=MODEL_PATH, help="Exported .npz (NumPy runtime) or .keras model.")
+    parser.add_argument('--tokenizer', default=TOKENIZER_PATH)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--shards', type=int, default=None, help="Defaults to 4 shards per worker.")
+    parser.add_argument('--no-share', action='store_true', help="Let every worker load its own copy of the model and vocabulary.")
+    args = parser.parse_args()
+
+    print("--- Sharded Sentiment Enrichment ---")
+    job_start = time.perf_counter()
+    try:
+        shard_stats = run_enrichment(args.input, args.output, args.model, args.tokenizer, args.workers, args.shards, not args.no_share)
+    except (FileNotFoundError, ValueError) as e:
+        sys.exit(f"Cannot run the enrichment: {e}")
+    total_rows = int(shard_stats['rows'].sum())
+    elapsed = time.perf_counter() - job_start
+    print(f"\n✅ Done! {total_rows:,} rows in {elapsed:.1f}s ({total_rows / elapsed:,.0f} rows/sec overall) -> {args.output}")
+    if (~shard_stats['resumed']).any():
+        print("\n--- Throughput per Worker ---")
+        print(worker_throughput(shard_stats).to_string())
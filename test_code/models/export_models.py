@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import time
+import zipfile
+import argparse
+import subprocess
+import numpy as np
+import h5py
+
+from test_code.inference import NumpyModel, SUPPORTED_LAYERS, load_tokenizer_state
+
+# --- Configuration ---
+# Run from the repository root:  python -m test_code.models.export_models [--check] [--reference] [--benchmark]
+
+MODELS_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_EXPORTS = {
+    'client_score.keras': 'client_score.npz',
+    'sentiment_regressor.keras': 'sentiment_regressor.npz',
+}
+TOKENIZER_PATH = os.path.join(MODELS_DIR, 'sentiment_analysis_tokenizer.pickle')
+VOCAB_PATH = os.path.join(MODELS_DIR, 'sentiment_vocab.json')
+PARITY_TOLERANCE = 1e-5
+REFERENCE_ROWS = 256  # fixed inputs whose Keras outputs are saved next to each export
+
+# --- Export ---
+
+def export_keras_model(keras_path: str, output_path: str) -> dict:
+    """
+    Converts a Keras 3 `.keras` archive (config.json + model.weights.h5) into a
+    flat .npz the NumPy runtime can load. Only needs zipfile and h5py.
+    """
+    with zipfile.ZipFile(keras_path) as archive:
+        config = json.loads(archive.read('config.json'))
+        weights_file = archive.open('model.weights.h5')
+        with h5py.File(weights_file, 'r') as h5:
+            layer_configs = config['config']['layers']
+            layers, arrays = [], {}
+            for index, layer in enumerate(layer_configs):
+                kind = layer['class_name']
+                if kind not in SUPPORTED_LAYERS:
+                    raise NotImplementedError(f"Layer type '{kind}' in {os.path.basename(keras_path)} is not supported by the NumPy runtime.")
+                cfg = layer['config']
+                entry = {'class_name': kind, 'name': cfg['name']}
+                if kind == 'InputLayer':
+                    input_shape = cfg.get('batch_shape') or cfg.get('batch_input_shape')
+                elif kind == 'Dense':
+                    entry.update(activation=cfg['activation'], use_bias=cfg.get('use_bias', True))
+                    variables = h5[f"layers/{cfg['name']}/vars"]
+                    arrays[f'{index}_kernel'] = variables['0'][()].astype(np.float32)
+                    if entry['use_bias']:
+                        arrays[f'{index}_bias'] = variables['1'][()].astype(np.float32)
+                elif kind == 'Embedding':
+                    entry['mask_zero'] = cfg.get('mask_zero', False)
+                    arrays[f'{index}_embeddings'] = h5[f"layers/{cfg['name']}/vars/0"][()].astype(np.float32)
+                layers.append(entry)
+
+    if layer_configs[0]['class_name'] != 'InputLayer':
+        input_shape = layer_configs[0].get('build_config', {}).get('input_shape')
+    spec = {'source': os.path.basename(keras_path), 'input_shape': input_shape, 'layers': layers}
+    np.savez(output_path, __spec__=np.array(json.dumps(spec)), **arrays)
+    return spec
+
+def export_tokenizer(tokenizer_path: str = TOKENIZER_PATH, output_path: str = VOCAB_PATH) -> int:
+    """Flattens the pickled Keras Tokenizer into a JSON vocab (settings + word_index)."""
+    state = load_tokenizer_state(tokenizer_path)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    return len(state['word_index'])
+
+def export_all(models_dir: str = MODELS_DIR) -> None:
+    for keras_file, npz_file in MODEL_EXPORTS.items():
+        spec = export_keras_model(os.path.join(models_dir, keras_file), os.path.join(models_dir, npz_file))
+        print(f"  -> {keras_file} -> {npz_file} ({len(spec['layers'])} layers, input {spec['input_shape']})")
+    n_words = export_tokenizer()
+    print(f"  -> {os.path.basename(TOKENIZER_PATH)} -> {os.path.basename(VOCAB_PATH)} ({n_words} words)")
+
+# --- Parity Check ---
+
+def _random_inputs(model: NumpyModel, n_rows: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    if model.layers and model.layers[0]['class_name'] == 'Embedding':
+        vocab_size = model.weights['0_embeddings'].shape[0]
+        return rng.integers(0, vocab_size, size=(n_rows, model.input_shape[-1])).astype(np.int32)
+    return rng.standard_normal((n_rows, model.input_shape[-1])).astype(np.float32) * 3.0
+
+def check_parity(models_dir: str = MODELS_DIR, n_rows: int = 2048) -> bool:
+    """Compares NumPy runtime outputs with Keras on random inputs; needs Keras installed."""
+    from keras.models import load_model
+
+    all_ok = True
+    for keras_file, npz_file in MODEL_EXPORTS.items():
+        numpy_model = NumpyModel.load(os.path.join(models_dir, npz_file))
+        keras_model = load_model(os.path.join(models_dir, keras_file), compile=False)
+        inputs = _random_inputs(numpy_model, n_rows)
+        expected = np.asarray(keras_model.predict(inputs, verbose=0))
+        max_diff = float(np.abs(numpy_model.predict(inputs) - expected).max())
+        ok = max_diff <= PARITY_TOLERANCE
+        all_ok &= ok
+        print(f"  -> {keras_file}: max |numpy - keras| = {max_diff:.2e} [{'OK' if ok else 'MISMATCH'}]")
+    return all_ok
+
+def reference_path(npz_path: str) -> str:
+    return os.path.splitext(npz_path)[0] + '_reference.npz'
+
+def save_reference_outputs(models_dir: str = MODELS_DIR, n_rows: int = REFERENCE_ROWS) -> None:
+    """
+    Saves Keras outputs for fixed (seeded) inputs next to each export as
+    <model>_reference.npz, so check_reference_outputs can verify the NumPy
+    runtime without TensorFlow. Needs Keras installed.
+    """
+    from keras.models import load_model
+
+    for keras_file, npz_file in MODEL_EXPORTS.items():
+        npz_path = os.path.join(models_dir, npz_file)
+        inputs = _random_inputs(NumpyModel.load(npz_path), n_rows)
+        outputs = np.asarray(load_model(os.path.join(models_dir, keras_file), compile=False).predict(inputs, verbose=0))
+        np.savez(reference_path(npz_path), inputs=inputs, outputs=outputs.astype(np.float32))
+        print(f"  -> {keras_file}: {n_rows} reference outputs -> {os.path.basename(reference_path(npz_path))}")
+
+def check_reference_outputs(models_dir: str = MODELS_DIR) -> dict:
+    """Max |numpy - keras| per export against its saved reference outputs (NaN when none is saved). NumPy only."""
+    diffs = {}
+    for npz_file in MODEL_EXPORTS.values():
+        npz_path = os.path.join(models_dir, npz_file)
+        if not os.path.exists(reference_path(npz_path)):
+            diffs[npz_file] = float('nan')
+            continue
+        with np.load(reference_path(npz_path), allow_pickle=False) as reference:
+            predicted = NumpyModel.load(npz_path).predict(reference['inputs'])
+            diffs[npz_file] = float(np.abs(predicted - reference['outputs']).max())
+    return diffs
+
+# --- Benchmarks ---
+
+COLD_START_SNIPPETS = {
+    'numpy': "from test_code.inference import NumpyModel; import numpy as np; "
+             "m = NumpyModel.load('{npz}'); m.predict(np.zeros((1, {width}), np.float32))",
+    'keras': "from keras.models import load_model; import numpy as np; "
+             "m = load_model('{keras}', compile=False); m.predict(np.zeros((1, {width}), np.float32), verbose=0)",
+}
+
+def benchmark_cold_start(keras_file: str = 'client_score.keras', runtimes=('numpy', 'keras')) -> dict:
+    """Wall time of a fresh interpreter that loads the model and scores one row."""
+    npz_path = os.path.join(MODELS_DIR, MODEL_EXPORTS[keras_file])
+    width = NumpyModel.load(npz_path).input_shape[-1]
+    timings = {}
+    for runtime in runtimes:
+        code = COLD_START_SNIPPETS[runtime].format(npz=npz_path, keras=os.path.join(MODELS_DIR, keras_file), width=width)
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable, '-c', code], capture_output=True)
+        timings[runtime] = time.perf_counter() - start if completed.returncode == 0 else float('nan')
+    return timings
+
+def benchmark_batch_latency(npz_file: str = 'client_score.npz', batch_sizes=(1, 256, 10_000), repeats: int = 20) -> dict:
+    """Best-of-N NumPy runtime latency per batch size."""
+    model = NumpyModel.load(os.path.join(MODELS_DIR, npz_file))
+    timings = {}
+    for size in batch_sizes:
+        inputs = _random_inputs(model, size)
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model.predict(inputs)
+            best = min(best, time.perf_counter() - start)
+        timings[size] = best
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export GA$P Keras models to the NumPy inference runtime.")
+    parser.add_argument('--check', action='store_true', help="Verify exported models against Keras outputs.")
+    parser.add_argument('--reference', action='store_true', help="Save Keras outputs for fixed inputs next to the exports.")
+    parser.add_argument('--benchmark', action='store_true', help="Report cold start and per-batch latency.")
+    args = parser.parse_args()
+
+    print("--- Exporting Models ---")
+    export_all()
+    if args.check:
+        print("--- Parity Check ---")
+        if not check_parity():
+            sys.exit(1)
+    if args.reference:
+        print("--- Reference Outputs ---")
+        save_reference_outputs()
+    if args.benchmark:
+        print("--- Cold Start (fresh interpreter, load + 1 prediction) ---")
+        for runtime, seconds in benchmark_cold_start().items():
+            print(f"  -> {runtime:>5}: {seconds:.2f}s")
+        print("--- NumPy Runtime Batch Latency ---")
+        for size, seconds in benchmark_batch_latency().items():
+            print(f"  -> {size:>6,} rows: {seconds * 1000:.3f} ms")
@@ -0,0 +1,316 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterator, List, Tuple
+
+from test_code.client_score import CLIENT_SCORE_FEATURES, MODELS_DIR
+from test_code.models.export_models import export_keras_model
+
+try:
+    import resource
+except ImportError:  # Windows: peak memory is not reported
+    resource = None
+
+# --- Configuration ---
+# Run from the repository root:  python -m test_code.models.train_client_score [--stats-only] [--epochs N]
+#
+# The CSVs are never loaded whole. One streaming pass computes the scaler
+# statistics; every epoch then re-reads the files chunk by chunk through a
+# tf.data pipeline, so memory is bounded by
+#   (files read in parallel + prefetched chunks) * CHUNK_ROWS + SHUFFLE_BUFFER rows
+# whatever the dataset size.
+
+DATA_DIR = os.path.join(os.path.dirname(MODELS_DIR), 'databases')
+TRAINING_FILES = [
+    os.path.join(DATA_DIR, 'LC_loans_granting_model_dataset.csv'),
+    os.path.join(DATA_DIR, 'train_lending_club.csv'),
+]
+CHUNK_ROWS = 50_000
+BATCH_SIZE = 512
+SHUFFLE_BUFFER = 100_000   # rows
+PREFETCH_CHUNKS = 2
+EPOCHS = 10
+VALIDATION_EVERY = 10      # every 10th row of each file is held out
+LEARNING_RATE = 1e-3
+
+# Source column names accepted for each model feature (first match wins). The
+# LendingClub granting dataset names them fico_n / revenue / loan_amnt.
+FEATURE_ALIASES = {
+    'credit_score': ['credit_score', 'fico_n', 'fico_range_low', 'fico'],
+    'annual_income': ['annual_income', 'annual_inc', 'revenue'],
+    'loan_amount_requested': ['loan_amount_requested', 'loan_amnt', 'loan_amount'],
+    'collateral_value': ['collateral_value'],
+    'alimony_payments_monthly': ['alimony_payments_monthly'],
+    'avg_balance': ['avg_balance', 'avg_cur_bal'],
+    'avg_transaction_amount': ['avg_transaction_amount'],
+    'has_alimony': ['has_alimony'],
+    'loan_to_income': ['loan_to_income'],
+    'total_debit': ['total_debit'],
+}
+# Target columns: the model predicts a 0-1 client score where higher is better
+TARGET_ALIASES = ['client_score', 'target', 'Default', 'loan_status']
+GOOD_LOAN_STATUSES = {'Fully Paid', 'Current', 'Does not meet the credit policy. Status:Fully Paid'}
+
+# --- Chunked Reading & Preprocessing ---
+
+def _source_columns(header: List[str]) -> Tuple[Dict[str, str], str]:
+    """Maps each feature to the column that supplies it in this file, and picks the target column."""
+    present = set(header)
+    mapping = {feature: next((c for c in aliases if c in present), None) for feature, aliases in FEATURE_ALIASES.items()}
+    target = next((c for c in TARGET_ALIASES if c in present), None)
+    if target is None:
+        raise ValueError(f"No target column ({', '.join(TARGET_ALIASES)}) in columns {sorted(present)}")
+    return {feature: column for feature, column in mapping.items() if column is not None}, target
+
+def read_chunks(path: str, chunk_rows: int = CHUNK_ROWS) -> Iterator[Tuple[pd.DataFrame, Dict[str, str], str]]:
+    """Yields (chunk, feature->column map, target column), reading only the columns that are used."""
+    header = list(pd.read_csv(path, nrows=0).columns)
+    mapping, target = _source_columns(header)
+    wanted = set(mapping.values()) | {target}
+    for chunk in pd.read_csv(path, usecols=lambda c: c in wanted, chunksize=chunk_rows, low_memory=True):
+        yield chunk, mapping, target
+
+def chunk_to_arrays(chunk: pd.DataFrame, mapping: Dict[str, str], target: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Raw feature matrix (NaN where a file lacks a feature or a value) and the
+    target for one chunk; derived features are filled in when their inputs exist.
+    """
+    n = len(chunk)
+    features = np.full((n, len(CLIENT_SCORE_FEATURES)), np.nan, dtype=np.float32)
+    for j, feature in enumerate(CLIENT_SCORE_FEATURES):
+        if feature in mapping:
+            features[:, j] = pd.to_numeric(chunk[mapping[feature]], errors='coerce').to_numpy(dtype=np.float32)
+
+    col = {feature: j for j, feature in enumerate(CLIENT_SCORE_FEATURES)}
+    alimony, income, loan = (features[:, col[f]] for f in ('alimony_payments_monthly', 'annual_income', 'loan_amount_requested'))
+    if 'has_alimony' not in mapping and 'alimony_payments_monthly' in mapping:
+        features[:, col['has_alimony']] = np.where(np.isnan(alimony), np.nan, (alimony > 0).astype(np.float32))
+    if 'loan_to_income' not in mapping and 'annual_income' in mapping and 'loan_amount_requested' in mapping:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            features[:, col['loan_to_income']] = np.where(income > 0, loan / income, np.nan)
+
+    raw_target = chunk[target]
+    if target == 'loan_status':
+        y = raw_target.isin(GOOD_LOAN_STATUSES).astype(np.float32).where(raw_target.notna()).to_numpy(dtype=np.float32)
+    else:
+        y = pd.to_numeric(raw_target, errors='coerce').to_numpy(dtype=np.float32)
+        if target == 'Default':
+            y = 1.0 - y
+    keep = ~np.isnan(y)
+    return features[keep], y[keep]
+
+def iter_split(paths: List[str], split: str, chunk_rows: int = CHUNK_ROWS) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Chunks of one split: every VALIDATION_EVERY-th source row is 'validation', the rest 'train'."""
+    for path in paths:
+        for chunk, mapping, target in read_chunks(path, chunk_rows):
+            held_out = chunk.index.to_numpy() % VALIDATION_EVERY == 0
+            chunk = chunk[held_out] if split == 'validation' else chunk[~held_out]
+            if len(chunk):
+                yield chunk_to_arrays(chunk, mapping, target)
+
+# --- Streaming Statistics ---
+
+class StreamingStats:
+    """
+    Per-column count / mean / M2 (sum of squared deviations) plus min and max,
+    merged chunk by chunk (Chan et al.), ignoring NaNs. Matches the population
+    statistics StandardScaler / MinMaxScaler compute in memory.
+    """
+
+    def __init__(self, n_columns: int):
+        self.count = np.zeros(n_columns)
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+        self.min = np.full(n_columns, np.inf)
+        self.max = np.full(n_columns, -np.inf)
+
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64).reshape(len(values), -1)
+        valid = ~np.isnan(values)
+        n_b = valid.sum(axis=0)
+        if not n_b.any():
+            return
+        filled = np.where(valid, values, 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_b = np.where(n_b > 0, filled.sum(axis=0) / n_b, 0.0)
+        m2_b = (np.where(valid, values - mean_b, 0.0) ** 2).sum(axis=0)
+
+        total = self.count + n_b
+        delta = mean_b - self.mean
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.mean = np.where(total > 0, self.mean + delta * n_b / total, 0.0)
+            self.m2 = self.m2 + m2_b + np.where(total > 0, delta ** 2 * self.count * n_b / total, 0.0)
+        self.count = total
+        self.min = np.fmin(self.min, np.where(valid, values, np.inf).min(axis=0))
+        self.max = np.fmax(self.max, np.where(valid, values, -np.inf).max(axis=0))
+
+    @property
+    def std(self) -> np.ndarray:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(np.where(self.count > 0, self.m2 / self.count, np.nan))
+        return np.where(std == 0, 1.0, std)  # zero-variance columns are left unscaled, as in sklearn
+
+def compute_scalers(paths: List[str], chunk_rows: int = CHUNK_ROWS,
+                    models_dir: str = MODELS_DIR) -> Dict[str, np.ndarray]:
+    """
+    One streaming pass over the training split. Features no file supplies keep
+    their current scaler_X_* values and are flagged in 'observed', so inference
+    holds them at the mean too. Also returns row counts and throughput.
+    """
+    x_stats = StreamingStats(len(CLIENT_SCORE_FEATURES))
+    y_stats = StreamingStats(1)
+    rows, started = 0, time.perf_counter()
+    for features, target in iter_split(paths, 'train', chunk_rows):
+        x_stats.update(features)
+        y_stats.update(target)
+        rows += len(target)
+    elapsed = time.perf_counter() - started
+    if rows == 0:
+        raise ValueError(f"No training rows with a target in {paths}")
+
+    n_features = len(CLIENT_SCORE_FEATURES)
+    previous_mean = np.load(os.path.join(models_dir, 'scaler_X_mean.npy'))[:n_features]
+    previous_scale = np.load(os.path.join(models_dir, 'scaler_X_scale.npy'))[:n_features]
+    observed = x_stats.count > 0
+    y_range = float(y_stats.max[0] - y_stats.min[0]) or 1.0
+    return {
+        'x_mean': np.where(observed, x_stats.mean, previous_mean),
+        'x_scale': np.where(observed, x_stats.std, previous_scale),
+        # MinMaxScaler's min_ / scale_, so that y_scaled = y * y_scale + y_min
+        'y_min': np.array([-y_stats.min[0] / y_range]),
+        'y_scale': np.array([1.0 / y_range]),
+        'observed': observed,
+        'train_rows': rows,
+        'rows_per_sec': rows / elapsed if elapsed else 0.0,
+    }
+
+def write_scalers(scalers: Dict[str, np.ndarray], models_dir: str = MODELS_DIR) -> None:
+    for key, file_name in (('x_mean', 'scaler_X_mean.npy'), ('x_scale', 'scaler_X_scale.npy'),
+                           ('y_min', 'scaler_y_min.npy'), ('y_scale', 'scaler_y_scale.npy')):
+        np.save(os.path.join(models_dir, file_name), np.asarray(scalers[key], dtype=np.float64))
+    np.save(os.path.join(models_dir, 'scaler_X_observed.npy'), np.asarray(scalers['observed'], dtype=bool))
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource is not None else float('nan')
+
+# --- tf.data Pipeline ---
+
+def make_dataset(paths: List[str], split: str, scalers: Dict[str, np.ndarray], batch_size: int = BATCH_SIZE,
+                 chunk_rows: int = CHUNK_ROWS, shuffle: bool = True):
+    """
+    Files are read in parallel (interleave), chunks are scaled in parallel
+    (map), rows are shuffled within a bounded buffer, and batches are
+    prefetched while the previous step trains.
+    """
+    import tensorflow as tf
+
+    n_features = len(CLIENT_SCORE_FEATURES)
+    signature = (tf.TensorSpec((None, n_features), tf.float32), tf.TensorSpec((None,), tf.float32))
+
+    def file_chunks(path):
+        return tf.data.Dataset.from_generator(
+            lambda p: iter_split([p.decode()], split, chunk_rows), args=(path,), output_signature=signature
+        )
+
+    x_mean = tf.constant(scalers['x_mean'], tf.float32)
+    x_scale = tf.constant(scalers['x_scale'], tf.float32)
+    y_min = float(scalers['y_min'][0])
+    y_scale = float(scalers['y_scale'][0])
+
+    def scale(features, target):
+        scaled = (features - x_mean) / x_scale
+        scaled = tf.where(tf.math.is_nan(scaled), tf.zeros_like(scaled), scaled)  # missing -> the mean
+        return scaled, target * y_scale + y_min
+
+    dataset = tf.data.Dataset.from_tensor_slices(paths).interleave(
+        file_chunks, cycle_length=len(paths), num_parallel_calls=tf.data.AUTOTUNE, deterministic=not shuffle
+    )
+    dataset = dataset.map(scale, num_parallel_calls=tf.data.AUTOTUNE).prefetch(PREFETCH_CHUNKS).unbatch()
+    if shuffle:
+        dataset = dataset.shuffle(SHUFFLE_BUFFER, reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+def build_model(n_features: int = len(CLIENT_SCORE_FEATURES)):
+    """Same architecture as the shipped client_score.keras (and the NumPy runtime's supported layers)."""
+    import tensorflow as tf
+
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(n_features,)),
+        tf.keras.layers.Dense(128, activation='relu'),
+        tf.keras.layers.Dense(64, activation='relu'),
+        tf.keras.layers.Dense(1, activation='sigmoid'),
+    ])
+    model.compile(optimizer=tf.keras.optimizers.Adam(LEARNING_RATE), loss='mse', metrics=['mae'])
+    return model
+
+def _throughput_callback(train_rows: int):
+    import tensorflow as tf
+
+    class RowsPerSecond(tf.keras.callbacks.Callback):
+        def on_epoch_begin(self, epoch, logs=None):
+            self.started = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            elapsed = time.perf_counter() - self.started
+            print(f"  -> Epoch {epoch + 1}: {train_rows:,} rows in {elapsed:.1f}s ({train_rows / elapsed:,.0f} rows/sec), "
+                  f"loss {logs.get('loss', float('nan')):.5f}, val_loss {logs.get('val_loss', float('nan')):.5f}, "
+                  f"peak RSS {peak_rss_mb():,.0f} MB")
+
+    return RowsPerSecond()
+
+# --- Training ---
+
+def train(paths: List[str] = TRAINING_FILES, epochs: int = EPOCHS, batch_size: int = BATCH_SIZE,
+          chunk_rows: int = CHUNK_ROWS, models_dir: str = MODELS_DIR) -> Dict[str, float]:
+    """
+    Retrains client_score.keras from the streamed CSVs, then writes the new
+    scaler_*.npy files and re-exports client_score.npz for the NumPy runtime.
+    Nothing in models_dir changes unless training completes.
+    """
+    import tensorflow as tf
+
+    print("--- Pass 1/2: Streaming scaler statistics ---")
+    scalers = compute_scalers(paths, chunk_rows, models_dir)
+    missing = [f for f, seen in zip(CLIENT_SCORE_FEATURES, scalers['observed']) if not seen]
+    print(f"  -> {scalers['train_rows']:,} training rows at {scalers['rows_per_sec']:,.0f} rows/sec, peak RSS {peak_rss_mb():,.0f} MB")
+    if missing:
+        print(f"  -> [WARNING] No source column for {', '.join(missing)}; kept their previous scaling and hold them at the mean in training and inference.")
+
+    print(f"--- Pass 2/2: Training ({epochs} epochs, batch {batch_size}) ---")
+    train_data = make_dataset(paths, 'train', scalers, batch_size, chunk_rows)
+    validation_data = make_dataset(paths, 'validation', scalers, batch_size, chunk_rows, shuffle=False)
+    model = build_model()
+    history = model.fit(
+        train_data, validation_data=validation_data, epochs=epochs, verbose=0,
+        callbacks=[_throughput_callback(scalers['train_rows']),
+                   tf.keras.callbacks.EarlyStopping(patience=2, restore_best_weights=True)],
+    )
+
+    keras_path = os.path.join(models_dir, 'client_score.keras')
+    model.save(keras_path)
+    write_scalers(scalers, models_dir)
+    spec = export_keras_model(keras_path, os.path.join(models_dir, 'client_score.npz'))
+    print(f"  -> Saved {keras_path}, scaler_*.npy and client_score.npz ({len(spec['layers'])} layers)")
+    return {'train_rows': scalers['train_rows'], 'val_loss': float(min(history.history.get('val_loss', [np.nan])))}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retrain the GA$P client-score model from the LendingClub CSVs.")
+    parser.add_argument('files', nargs='*', default=TRAINING_FILES, help="Training CSVs (default: the LendingClub datasets).")
+    parser.add_argument('--epochs', type=int, default=EPOCHS)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--stats-only', action='store_true', help="Only run the streaming statistics pass; write nothing.")
+    args = parser.parse_args()
+
+    if args.stats_only:
+        print("--- Streaming scaler statistics ---")
+        scalers = compute_scalers(args.files, args.chunk_rows)
+        print(f"  -> {scalers['train_rows']:,} training rows at {scalers['rows_per_sec']:,.0f} rows/sec, peak RSS {peak_rss_mb():,.0f} MB")
+        for feature, mean, scale, seen in zip(CLIENT_SCORE_FEATURES, scalers['x_mean'], scalers['x_scale'], scalers['observed']):
+            print(f"  {feature:<26} mean {mean:>14,.4f}  scale {scale:>14,.4f}{'' if seen else '  (previous value)'}")
+        sys.exit(0)
+    train(args.files, args.epochs, args.batch_size, args.chunk_rows)
@@ -1,16 +1,15 @@
 import pandas as pd
 import numpy as np
-import pickle
 import tensorflow as tf
 from keras.models import load_model
-from keras.preprocessing.sequence import pad_sequences
+from test_code.text_tokenizer import MAX_LEN, load_vocabulary, texts_to_padded
 
 # --- Configuration ---
 MODEL_PATH = r"test/models/sentiment_analysis.keras"
 TOKENIZER_PATH = r"test/models/sentiment_analysis_tokenizer.pickle"
 CSV_PATH = r"test/databases/mock_portfolios copy/all_statements.csv"
 OUTPUT_PATH = r"test/databases/mock_portfolios copy/allstatements_with_sentiment.csv"
-MAX_LEN = 40
+PREDICT_BATCH_SIZE = 4096
 
 # --- Helper Functions ---
 
@@ -29,8 +28,7 @@ def get_sentiment_and_score(text: str, model, tokenizer) -> tuple[float, str]:
     Preprocesses a single text string and returns both the raw score and sentiment label.
     """
     # Preprocess the text
-    sequence = tokenizer.texts_to_sequences([text.lower()])
-    padded = pad_sequences(sequence, maxlen=MAX_LEN, padding='post', truncating='post')
+    padded = texts_to_padded([text.lower()], tokenizer, MAX_LEN)
     
     # Predict the raw score
     score = model.predict(padded, verbose=0)[0][0]
@@ -59,25 +57,16 @@ def process_csv_file(model, tokenizer):
     print(f"Loaded {len(statements_df)} statements.")
 
     print("Preprocessing text descriptions...")
-    descriptions = statements_df["description"].astype(str).str.lower().tolist()
-    # sequences = tokenizer.texts_to_sequences(descriptions)
-    # padded_sequences = pad_sequences(sequences, maxlen=MAX_LEN, padding="post", truncating="post")
+    descriptions = statements_df["description"].astype(str).str.lower()
+    padded_sequences = texts_to_padded(descriptions, tokenizer, MAX_LEN)
 
-    # print("Predicting sentiment for CSV...")
-    # raw_predictions = model.predict(padded_sequences, verbose=1)
+    print("Predicting sentiment for CSV...")
+    raw_predictions = model.predict(padded_sequences, batch_size=PREDICT_BATCH_SIZE, verbose=1)
 
-    # print("Interpreting scores and saving output...")
-    # scores = [score[0] for score in raw_predictions]
-    # sentiments = [classify_score(score) for score in scores]
+    print("Interpreting scores and saving output...")
+    scores = raw_predictions[:, 0]
+    sentiments = [classify_score(score) for score in scores]
 
-    scores, sentiments = [], []
-
-    for i in descriptions:
-        score, sentiment = get_sentiment_and_score(i, model, tokenizer)
-        scores.append(score)
-        sentiments.append(sentiment)
-        print(f'Sentiment for "{i}": {sentiment}, {score}')
-    
     statements_df["sentiment_score"] = scores
     statements_df["sentiment"] = sentiments
     
@@ -92,8 +81,7 @@ def process_csv_file(model, tokenizer):
 if __name__ == "__main__":
     print("Loading model and tokenizer for the session...")
     sentiment_model = load_model(MODEL_PATH)
-    with open(TOKENIZER_PATH, "rb") as f:
-        tokenizer = pickle.load(f)
+    tokenizer = load_vocabulary(TOKENIZER_PATH)
     print("Load complete.\n")
 
     process_csv_file(sentiment_model, tokenizer)
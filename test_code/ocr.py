@@ -0,0 +1,252 @@
+import io
+import os
+import sys
+import time
+import hashlib
+import sqlite3
+import fitz  # PyMuPDF library
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+try:
+    import pytesseract
+    from PIL import Image
+except ImportError:  # OCR is optional: without it, pages with no text layer are reported and skipped
+    pytesseract = None
+
+# Scanned PDFs and photographed forms (JPG/PNG uploads) have no text layer, so
+# page.get_text() returns nothing for them. Those pages are rasterized and run
+# through Tesseract in a process pool; the recognized text is cached by the
+# hash of the page image, so the same scan is never recognized twice.
+
+# --- Configuration ---
+# DPI benchmark from the repository root:  python -m test_code.ocr scanned.pdf [more.pdf ...]
+
+OCR_CACHE_PATH = os.path.join('output', 'gasp_ocr_cache.db')
+OCR_DPI = 300            # Tesseract wants ~20-30 px capital height; 10-12 pt statement text gets there at 300 dpi
+OCR_DPI_CANDIDATES = [150, 200, 300, 400]
+OCR_MIN_TEXT_CHARS = 20  # pages with less extractable text than this are treated as images
+OCR_WORKERS = max((os.cpu_count() or 1) - 1, 1)
+OCR_LANGUAGE = 'eng'
+OCR_CONFIG = '--oem 1 --psm 6'  # LSTM engine, one uniform block of text: keeps statement rows on one line each
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ocr_pages (
+    image_hash TEXT PRIMARY KEY,
+    text TEXT,
+    seconds REAL,
+    created_at TEXT
+);
+"""
+
+# --- Stats (per process) ---
+
+_STATS = {'pages': 0, 'ocr_pages': 0, 'cache_hits': 0, 'seconds': 0.0, 'skipped': 0}
+
+def ocr_stats() -> Dict[str, Any]:
+    """Running totals for this process: pages seen, pages recognized, cache hits and OCR wall time."""
+    return dict(_STATS)
+
+def combine_ocr_stats(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sums stats from several processes (e.g. the app and its extraction subprocess)."""
+    total = {key: sum(part.get(key, 0) for part in parts) for key in _STATS}
+    total['pages_per_sec'] = total['ocr_pages'] / total['seconds'] if total['seconds'] > 0 else 0.0
+    return total
+
+def ocr_stats_delta(before: Dict[str, Any], after: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    after = after or ocr_stats()
+    return combine_ocr_stats([{key: after[key] - before.get(key, 0) for key in _STATS}])
+
+# --- Page Images ---
+
+def page_needs_ocr(text: str) -> bool:
+    return len(text.strip()) < OCR_MIN_TEXT_CHARS
+
+def page_image(doc: fitz.Document, page_number: int, dpi: int = OCR_DPI) -> bytes:
+    """
+    Grayscale PNG of a page (1-based). Image uploads are returned as stored:
+    they are already rasterized, and resampling them only loses detail.
+    """
+    if not doc.is_pdf and doc.page_count == 1 and doc.name and os.path.exists(doc.name):
+        with open(doc.name, 'rb') as f:
+            return f.read()
+    pixmap = doc[page_number - 1].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+    return pixmap.tobytes('png')
+
+def image_hash(image: bytes) -> str:
+    return hashlib.sha256(image).hexdigest()
+
+# --- Worker ---
+
+def _init_ocr_worker() -> None:
+    # Tesseract's OpenMP threads would oversubscribe the pool: one thread per worker
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+
+def _recognize(image: bytes) -> Tuple[str, float]:
+    started = time.perf_counter()
+    with Image.open(io.BytesIO(image)) as picture:
+        text = pytesseract.image_to_string(picture, lang=OCR_LANGUAGE, config=OCR_CONFIG)
+    return text, time.perf_counter() - started
+
+# --- Cache ---
+
+class OcrCache:
+    """SQLite map from page-image hash to recognized text."""
+
+    def __init__(self, path: str = OCR_CACHE_PATH):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def get_many(self, hashes: List[str]) -> Dict[str, str]:
+        found = {}
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT image_hash, text FROM ocr_pages WHERE image_hash IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            found.update(rows)
+        return found
+
+    def put_many(self, entries: List[Tuple[str, str, float]]) -> None:
+        created_at = datetime.now().isoformat(timespec='seconds')
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO ocr_pages VALUES (?, ?, ?, ?)",
+                                  [(h, text, seconds, created_at) for h, text, seconds in entries])
+
+    def close(self) -> None:
+        self.conn.close()
+
+# --- Engine ---
+
+class OcrEngine:
+    """
+    Recognizes page images with Tesseract in a lazily started process pool,
+    consulting the cache first. The pool is reused across documents until
+    close().
+    """
+
+    def __init__(self, dpi: int = OCR_DPI, workers: int = OCR_WORKERS, cache_path: Optional[str] = OCR_CACHE_PATH):
+        self.dpi = dpi
+        self.workers = workers
+        self.cache = OcrCache(cache_path) if cache_path else None
+        self._pool = None
+
+    @property
+    def available(self) -> bool:
+        return pytesseract is not None
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+
+    def _recognize_all(self, images: List[bytes]) -> List[Tuple[str, float]]:
+        if self.workers <= 1 or len(images) <= 1:
+            return [_recognize(image) for image in images]
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_ocr_worker)
+        return list(self._pool.map(_recognize, images))
+
+    def recognize(self, images: List[bytes]) -> List[str]:
+        """Text for each image, in order; cache misses are recognized in parallel."""
+        hashes = [image_hash(image) for image in images]
+        texts = self.cache.get_many(sorted(set(hashes))) if self.cache is not None else {}
+        _STATS['cache_hits'] += sum(1 for h in hashes if h in texts)
+
+        missing = {}
+        for h, image in zip(hashes, images):
+            if h not in texts:
+                missing.setdefault(h, image)
+        if missing:
+            started = time.perf_counter()
+            results = self._recognize_all(list(missing.values()))
+            _STATS['seconds'] += time.perf_counter() - started
+            _STATS['ocr_pages'] += len(results)
+            texts.update((h, text) for h, (text, _) in zip(missing, results))
+            if self.cache is not None:
+                self.cache.put_many([(h, text, seconds) for h, (text, seconds) in zip(missing, results)])
+        return [texts[h] for h in hashes]
+
+    def fill_missing_text(self, doc: fitz.Document, page_texts: List[str],
+                          on_page: Optional[Callable[[], None]] = None, first_page: int = 1) -> List[str]:
+        """
+        Replaces the text of every page without a text layer by its OCR text.
+        `page_texts` holds pages `first_page`, `first_page + 1`, ... of `doc`;
+        `on_page()` is called once per recognized page.
+        """
+        targets = [number for number, text in enumerate(page_texts, start=first_page) if page_needs_ocr(text)]
+        _STATS['pages'] += len(page_texts)
+        if not targets:
+            return page_texts
+        if not self.available:
+            _STATS['skipped'] += len(targets)
+            print(f"  -> [OCR] {len(targets)} of {len(page_texts)} page(s) in {os.path.basename(doc.name or 'document')} "
+                  f"have no text layer and pytesseract is not installed; they were skipped.")
+            return page_texts
+
+        page_texts = list(page_texts)
+        started = time.perf_counter()
+        images = [page_image(doc, number, self.dpi) for number in targets]
+        _STATS['seconds'] += time.perf_counter() - started  # rasterizing is part of the OCR cost
+        for number, text in zip(targets, self.recognize(images)):
+            page_texts[number - first_page] = text
+            if on_page is not None:
+                on_page()
+        return page_texts
+
+_DEFAULT_ENGINE = None
+
+def default_ocr_engine() -> OcrEngine:
+    """Engine shared by every extraction in this process (one pool, one cache connection)."""
+    global _DEFAULT_ENGINE
+    if _DEFAULT_ENGINE is None:
+        _DEFAULT_ENGINE = OcrEngine()
+    return _DEFAULT_ENGINE
+
+# --- DPI Benchmark ---
+
+def _similarity(text: str, reference: str) -> float:
+    from difflib import SequenceMatcher
+    return SequenceMatcher(None, ' '.join(text.split()), ' '.join(reference.split()), autojunk=False).ratio()
+
+def benchmark_dpi(pdf_paths: List[str], dpis: List[int] = OCR_DPI_CANDIDATES, workers: int = OCR_WORKERS) -> List[Dict[str, Any]]:
+    """
+    Rasterizes and recognizes every page of the given scans at each DPI
+    (uncached) and reports pages/sec and agreement with the highest DPI's text.
+    """
+    results, reference = [], None
+    for dpi in sorted(dpis, reverse=True):
+        engine = OcrEngine(dpi=dpi, workers=workers, cache_path=None)
+        started = time.perf_counter()
+        texts = []
+        try:
+            for path in pdf_paths:
+                with fitz.open(path) as doc:
+                    texts.extend(engine.recognize([page_image(doc, number, dpi) for number in range(1, doc.page_count + 1)]))
+        finally:
+            engine.close()
+        elapsed = time.perf_counter() - started
+        reference = reference or texts
+        results.append({
+            'dpi': dpi, 'pages': len(texts), 'seconds': elapsed, 'pages_per_sec': len(texts) / elapsed if elapsed else 0.0,
+            'agreement': sum(_similarity(t, r) for t, r in zip(texts, reference)) / max(len(texts), 1),
+        })
+    return sorted(results, key=lambda row: row['dpi'])
+
+
+if __name__ == "__main__":
+    if pytesseract is None:
+        sys.exit("pytesseract (and the tesseract binary) must be installed to run the OCR benchmark.")
+    if len(sys.argv) < 2:
+        sys.exit("usage: python -m test_code.ocr scanned.pdf [more.pdf ...]")
+    print(f"--- OCR DPI Benchmark ({OCR_WORKERS} workers) ---")
+    for row in benchmark_dpi(sys.argv[1:]):
+        print(f"{row['dpi']:>4} dpi: {row['pages_per_sec']:6.2f} pages/s, agreement with {max(OCR_DPI_CANDIDATES)} dpi {row['agreement']:.1%}")
@@ -1,10 +1,41 @@
 import pandas as pd
 import re
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Callable, Optional
+import io
 import os
+import time
+from functools import partial
 import fitz  # PyMuPDF library
 import matplotlib.pyplot as plt
 import seaborn as sns
+from test_code.amortization import (
+    DEFAULT_INTEREST_RATE, DEFAULT_TERM_MONTHS, amortization_schedules,
+    default_scenario_axes, sweep_loan_scenarios
+)
+from test_code.categorization import category_spend
+from test_code.client_score import score_clients
+from test_code.debt_reports import attach_existing_debt, combine_debt_sources, load_debt_reports
+from test_code.feature_store import FeatureStore, file_sha256
+from test_code.fraud_signals import detect_fraud_signals
+from test_code.identity_resolution import IDENTITY_FIELDS, UNRESOLVED_ID, resolve_identities
+from test_code.job_control import CancellationToken, PipelineCancelled, ProgressCallback, ProgressReporter
+from test_code.ocr import OcrEngine, combine_ocr_stats, default_ocr_engine, ocr_stats, ocr_stats_delta, page_needs_ocr
+from test_code.reconciliation import reconcile_balances
+from test_code.resource_budget import BudgetExceeded, BudgetedExtractor, ResourceBudget, budget_utilization
+from test_code.results_db import ResultsDB, client_results_frame
+from test_code.stress_test import closing_balances, monthly_cash_flows, stress_test_client
+from test_code.transaction_query import TransactionFilter, TransactionIndex, TransactionQuery
+
+# --- Configuration ---
+
+TRANSACTION_ROW_PATTERN = re.compile(
+    r'^(\d{4}-\d{2}-\d{2})\s+(.+?)\s+(CREDIT|DEBIT)\s+(-?[\$\d,\.]+)\s+(-?[\$\d,\.]+)$', re.MULTILINE
+)  # amounts may carry a leading minus (overdrawn balances are written as -$1,234.56)
+CLIENT_ID_PATTERN = re.compile(r'Client ID:\s*\**\s*(\d+)')  # also matches the markdown form '**Client ID:** 7'
+STREAMING_HEADER_PAGES = 2  # pages of text kept in streaming mode for the ID, name and profile fields
+IDENTITY_PAGES = 1  # pages read for a document's identity (client ID, name, SSN, address)
+LOW_IDENTITY_CONFIDENCE = 0.25  # documents linked with less confidence than this are reported
+GAMBLING_SHARE_THRESHOLD = 0.05  # share of debits spent on gambling that counts as a risk factor
 
 # --- Helper Functions for Data Cleaning (from pdf_to_csv_debug.py) ---
 
@@ -25,8 +56,9 @@ def clean_ssn(ssn: str) -> str:
     return ssn.strip().replace('"', '').replace('\n', '') if isinstance(ssn, str) else ''
 
 def parse_client_name(client_name_line: str) -> Tuple[str, str]:
-    """Extracts first and last name from a 'Client Name: First Last' string."""
+    """Extracts first and last name from a 'Client Name: First Last' string (markdown bold allowed)."""
     try:
+        client_name_line = client_name_line.replace('*', '')
         match = re.search(r'Client Name:\s*(\w+)\s*(\w+)\s*\|', client_name_line)
         if match:
             return match.group(1), match.group(2)
@@ -36,71 +68,152 @@ def parse_client_name(client_name_line: str) -> Tuple[str, str]:
     except Exception:
         return '', ''
 
+def read_document_identity(path: str, df_info: Optional[pd.DataFrame] = None, df_trans: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+    """
+    Who a document is about, from the header of its first page(s): client ID,
+    name (client / account holder / applicant), SSN and address. Fields the
+    header lacks are filled from the document's extracted profile or
+    transactions (e.g. for scanned pages, whose text came from OCR).
+    """
+    content = ''
+    try:
+        with fitz.open(path) as doc:
+            content = "".join(doc[number].get_text() for number in range(min(doc.page_count, IDENTITY_PAGES)))
+    except Exception:
+        pass  # CSVs and unreadable files are identified by their extracted frames only
+    text = content.replace('*', '')
+    identity = {'doc': path, 'client_id': '', 'first_name': '', 'last_name': '', 'ssn': '', 'address': ''}
+    id_match = CLIENT_ID_PATTERN.search(content)
+    identity['client_id'] = id_match.group(1) if id_match else ''
+    name_line_match = re.search(r'Client Name:\s*.*\|', text)
+    if name_line_match:
+        identity['first_name'], identity['last_name'] = parse_client_name(name_line_match.group(0))
+    else:
+        name_match = re.search(r'(?:Full Name|Account Holder|Applicant Name|Client Name):[ \t]*([^\n]+)', text)
+        parts = name_match.group(1).split() if name_match else []
+        if parts:
+            identity['first_name'], identity['last_name'] = parts[0], parts[-1]
+    ssn_match = re.search(r'SSN[^:\n]*:\s*([^\n]+)', text)
+    identity['ssn'] = clean_ssn(ssn_match.group(1)) if ssn_match else ''
+    address_match = re.search(r'Address:\s*([^\n]+)', text)
+    identity['address'] = address_match.group(1).strip() if address_match else ''
+
+    if df_info is not None and not df_info.empty:
+        profile = df_info.iloc[0]
+        for field in ('first_name', 'last_name', 'ssn', 'address'):
+            if not identity[field] and str(profile.get(field, '')) not in ('', 'N/A', 'nan'):
+                identity[field] = str(profile.get(field))
+    for frame in (df_info, df_trans):
+        if not identity['client_id'] and frame is not None and not frame.empty and 'client_id' in frame:
+            identity['client_id'] = str(frame['client_id'].iloc[0])
+    return identity
+
 # --- PDF Data Extraction Function (from pdf_to_csv_debug.py) ---
 
-def extract_loan_data_to_dfs(pdf_file_paths: List[str]) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    """Reads and parses data from a list of PDF file paths."""
+def _parse_profile(content: str, client_id: str, first_name: str, last_name: str) -> Dict[str, Any]:
+    """Pulls the loan-profile fields out of a document's text."""
+    record = {'client_id': client_id, 'first_name': first_name, 'last_name': last_name}
+    data_points = {
+        'ssn': r'SSN:\s*([^\n]+)',
+        'address': r'Address:\s*([^\n]+)',
+        'annual_income': r'Annual Income:\s*([^\n]+)',
+        'employment_status': r'Employment:\s*([^\n]+)',
+        'credit_score': r'Credit Score:\s*([^\n]+)',
+        'loan_amount_requested': r'Loan Requested:\s*([^\n]+)',
+        'collateral_value': r'Collateral Value:\s*([^\n]+)',
+        'alimony_payments_monthly': r'Monthly Alimony:\s*([^\n]+)',
+        'sentiment_score': r'Client Sentiment Score:\s*(-?\d+\.?\d*)',
+    }
+    for key, pattern in data_points.items():
+        match = re.search(pattern, content, re.DOTALL | re.IGNORECASE)
+        record[key] = match.group(1).strip() if match else 'N/A'
+    
+    record['ssn'] = clean_ssn(record.get('ssn', ''))
+    record['annual_income'] = clean_currency(record.get('annual_income', '0'))
+    record['credit_score'] = int(clean_currency(record.get('credit_score', '0')))
+    record['loan_amount_requested'] = clean_currency(record.get('loan_amount_requested', '0'))
+    record['collateral_value'] = clean_currency(record.get('collateral_value', '0'))
+    record['alimony_payments_monthly'] = clean_currency(record.get('alimony_payments_monthly', '0'))
+    score_str = str(record.get('sentiment_score', '0'))
+    record['sentiment_score'] = float(score_str) if score_str.replace('.', '', 1).replace('-', '', 1).isdigit() else float('nan')
+    return record
+
+def _transaction_record(client_id: str, row: Tuple[str, ...]) -> Dict[str, Any]:
+    date_str, description, type_str, amount_str, balance_str = row
+    return {
+        'client_id': client_id, 'date': date_str.strip(), 'description': description.strip(),
+        'type': type_str.strip(), 'amount': clean_currency(amount_str),
+        'balance': clean_currency(balance_str)
+    }
+
+def extract_loan_data_to_dfs(pdf_file_paths: List[str],
+                             transaction_filter: Optional[TransactionFilter] = None,
+                             on_page: Optional[Callable[[str, int, int], None]] = None,
+                             ocr: Optional[OcrEngine] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Reads and parses data from a list of PDF (or image) file paths.
+    A concrete `transaction_filter` (client / date window / type) is applied to
+    each parsed row before it is built, so excluded rows are never materialized.
+    Pages without a text layer are recognized by `ocr` (default: the shared
+    engine). `on_page(path, pages_done, n_pages)` is called after each page is
+    read; it may raise PipelineCancelled to stop between pages.
+    """
     loan_applicant_data = []
     bank_transactions_data = []
     for path in pdf_file_paths:
         try:
             doc = fitz.open(path)
-            content = "".join(page.get_text() for page in doc)
-            doc.close()
+            n_pages = doc.page_count
         except Exception as e:
             print(f"Error reading '{path}': {e}. Skipping.")
             continue
+        page_texts = []
+        pages_done = 0
+
+        def page_done():
+            nonlocal pages_done
+            pages_done += 1
+            if on_page is not None:
+                on_page(path, pages_done, n_pages)
+
+        try:
+            for page in doc:
+                try:
+                    page_texts.append(page.get_text())
+                except Exception as e:
+                    print(f"Error reading '{path}': {e}. Skipping.")
+                    page_texts = []
+                    break
+                if not page_needs_ocr(page_texts[-1]):
+                    page_done()
+            # Scanned pages are rasterized and recognized together, in parallel, once the text layer is read
+            if any(page_needs_ocr(text) for text in page_texts):
+                page_texts = (ocr or default_ocr_engine()).fill_missing_text(doc, page_texts, page_done)
+        finally:
+            doc.close()
+        content = "".join(page_texts)
         if not content:
             continue
 
-        id_match = re.search(r'Client ID:\s*(\d+)', content)
+        id_match = CLIENT_ID_PATTERN.search(content)
         client_id = id_match.group(1) if id_match else 'UNKNOWN'
         name_line_match = re.search(r'Client Name:\s*.*\|', content)
         first_name, last_name = parse_client_name(name_line_match.group(0)) if name_line_match else ('', '')
 
         if 'LOAN & CREDIT PROFILE SUMMARY' in content:
-            record = {'client_id': client_id, 'first_name': first_name, 'last_name': last_name}
-            data_points = {
-                'ssn': r'SSN:\s*([^\n]+)',
-                'address': r'Address:\s*([^\n]+)',
-                'annual_income': r'Annual Income:\s*([^\n]+)',
-                'employment_status': r'Employment:\s*([^\n]+)',
-                'credit_score': r'Credit Score:\s*([^\n]+)',
-                'loan_amount_requested': r'Loan Requested:\s*([^\n]+)',
-                'collateral_value': r'Collateral Value:\s*([^\n]+)',
-                'alimony_payments_monthly': r'Monthly Alimony:\s*([^\n]+)',
-                'sentiment_score': r'Client Sentiment Score:\s*(-?\d+\.?\d*)',
-            }
-            for key, pattern in data_points.items():
-                match = re.search(pattern, content, re.DOTALL | re.IGNORECASE)
-                record[key] = match.group(1).strip() if match else 'N/A'
-            
-            record['ssn'] = clean_ssn(record.get('ssn', ''))
-            record['annual_income'] = clean_currency(record.get('annual_income', '0'))
-            record['credit_score'] = int(clean_currency(record.get('credit_score', '0')))
-            record['loan_amount_requested'] = clean_currency(record.get('loan_amount_requested', '0'))
-            record['collateral_value'] = clean_currency(record.get('collateral_value', '0'))
-            record['alimony_payments_monthly'] = clean_currency(record.get('alimony_payments_monthly', '0'))
-            score_str = str(record.get('sentiment_score', '0'))
-            record['sentiment_score'] = float(score_str) if score_str.replace('.', '', 1).replace('-', '', 1).isdigit() else 0.0
-            loan_applicant_data.append(record)
+            loan_applicant_data.append(_parse_profile(content, client_id, first_name, last_name))
 
+        if transaction_filter is not None and transaction_filter.client_ids is not None and client_id not in transaction_filter.client_ids:
+            continue
         if 'TRANSACTION HISTORY' in content:
             transaction_block_match = re.search(r'TRANSACTION HISTORY\s*(.*)', content, re.DOTALL)
             if transaction_block_match:
                 transaction_block = transaction_block_match.group(1)
-                transaction_rows = re.findall(
-                    r'^(\d{4}-\d{2}-\d{2})\s+(.+?)\s+(CREDIT|DEBIT)\s+([\$\d,\.]+)\s+([\$\d,\.]+)$',
-                    transaction_block,
-                    re.MULTILINE
-                )
+                transaction_rows = TRANSACTION_ROW_PATTERN.findall(transaction_block)
                 for row in transaction_rows:
-                    date_str, description, type_str, amount_str, balance_str = row
-                    bank_transactions_data.append({
-                        'client_id': client_id, 'date': date_str.strip(), 'description': description.strip(),
-                        'type': type_str.strip(), 'amount': clean_currency(amount_str),
-                        'balance': clean_currency(balance_str)
-                    })
+                    if transaction_filter is not None and not transaction_filter.matches(client_id, row[0], row[2]):
+                        continue
+                    bank_transactions_data.append(_transaction_record(client_id, row))
     
     loan_df = pd.DataFrame(loan_applicant_data)
     trans_df = pd.DataFrame(bank_transactions_data)
@@ -109,19 +222,116 @@ def extract_loan_data_to_dfs(pdf_file_paths: List[str]) -> Tuple[pd.DataFrame, p
 
     return loan_df, trans_df
 
+def extract_document_streaming(path: str, max_rows: int,
+                               on_page: Optional[Callable[[str, int, int], None]] = None,
+                               ocr: Optional[OcrEngine] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Page-at-a-time variant of extract_loan_data_to_dfs for one oversized
+    document. Only the first STREAMING_HEADER_PAGES pages of text are kept (for
+    the ID, name and profile fields); transaction rows are parsed page by page
+    and held as raw tuples. Scanned pages are recognized one at a time, so only
+    one page image is in memory. Raises BudgetExceeded past `max_rows` rows.
+    """
+    header_pages, raw_rows = [], []
+    client_id, in_history = None, False
+    with fitz.open(path) as doc:
+        n_pages = doc.page_count
+        for page_number, page in enumerate(doc, start=1):
+            text = page.get_text()
+            if page_needs_ocr(text):
+                text = (ocr or default_ocr_engine()).fill_missing_text(doc, [text], first_page=page_number)[0]
+            if page_number <= STREAMING_HEADER_PAGES:
+                header_pages.append(text)
+            if client_id is None:
+                id_match = CLIENT_ID_PATTERN.search(text)
+                client_id = id_match.group(1) if id_match else None
+            if not in_history and 'TRANSACTION HISTORY' in text:
+                in_history = True
+                text = re.search(r'TRANSACTION HISTORY\s*(.*)', text, re.DOTALL).group(1)
+            if in_history:
+                raw_rows.extend(TRANSACTION_ROW_PATTERN.findall(text))
+                if len(raw_rows) > max_rows:
+                    raise BudgetExceeded('rows', len(raw_rows), max_rows, os.path.basename(path))
+            if on_page is not None:
+                on_page(path, page_number, n_pages)
+
+    header = "".join(header_pages)
+    client_id = client_id or 'UNKNOWN'
+    name_line_match = re.search(r'Client Name:\s*.*\|', header)
+    first_name, last_name = parse_client_name(name_line_match.group(0)) if name_line_match else ('', '')
+    loan_df = pd.DataFrame([_parse_profile(header, client_id, first_name, last_name)] if 'LOAN & CREDIT PROFILE SUMMARY' in header else [])
+    trans_df = pd.DataFrame([_transaction_record(client_id, row) for row in raw_rows])
+    if not trans_df.empty:
+        trans_df['date'] = pd.to_datetime(trans_df['date'], errors='coerce')
+    return loan_df, trans_df
+
 # --- Pipeline Step Functions ---
 
-def step_1_data_receiver(filepaths: List[str]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+def _concat_non_empty(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    frames = [frame for frame in frames if not frame.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+def step_1_data_receiver(filepaths: List[str], feature_store: Optional[FeatureStore] = None,
+                         extractor: Callable[..., Tuple[pd.DataFrame, pd.DataFrame]] = extract_loan_data_to_dfs,
+                         progress: Optional[ProgressReporter] = None,
+                         checkpoint: Optional[Dict[str, Tuple[pd.DataFrame, pd.DataFrame]]] = None,
+                         identities: Optional[Dict[str, Any]] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
     Acts as the initial data handler, extracting data from uploaded PDF files.
+    With a feature store, documents seen before are served from it instead.
+    Files are extracted one at a time: `progress` gets an event per page and
+    per file (and may cancel in between), and each finished file is kept in
+    `checkpoint` under its content hash so an interrupted run can resume.
+    Documents are then linked to clients by identity resolution and their rows
+    relabelled with the resolved client_id; the per-document assignments and
+    statistics are stored in `identities` when a dict is passed.
     """
     print("\n[STEP 1/3] Data received and initialized.")
     print(f"  -> Processing files: {[os.path.basename(p) for p in filepaths]}")
-    return extract_loan_data_to_dfs(filepaths)
-
-def step_2_analyze(df_client_info: pd.DataFrame, df_transactions: pd.DataFrame) -> Dict[str, Any]:
+    info_frames, trans_frames, identity_records = [], [], []
+    for file_index, path in enumerate(filepaths):
+        name = os.path.basename(path)
+        on_page = None
+        if progress is not None:
+            progress.check()
+            on_page = lambda _, page, n_pages: progress.file_page(file_index, len(filepaths), name, page, n_pages)
+
+        doc_hash = file_sha256(path) if checkpoint is not None else None
+        if doc_hash is not None and doc_hash in checkpoint:
+            print(f"  -> Resuming: {name} was already extracted by an earlier run.")
+            df_info, df_trans = checkpoint[doc_hash]
+        else:
+            extract_file = lambda paths: extractor(paths, on_page=on_page)
+            df_info, df_trans = feature_store.load_or_extract([path], extract_file) if feature_store is not None else extract_file([path])
+            if doc_hash is not None:
+                checkpoint[doc_hash] = (df_info, df_trans)
+        info_frames.append(df_info)
+        trans_frames.append(df_trans)
+        identity_records.append(read_document_identity(path, df_info, df_trans))
+
+        if progress is not None:
+            progress.report('extraction', (file_index + 1) / len(filepaths), f"Extracted {name} ({file_index + 1}/{len(filepaths)} files)",
+                            file=name, file_index=file_index, files=len(filepaths))
+
+    # Link documents to clients and relabel every document's rows with its resolved client_id
+    assignments, stats = resolve_identities(pd.DataFrame(identity_records, columns=IDENTITY_FIELDS))
+    print(f"  -> Identity resolution: {stats['documents']} documents -> {stats['clients']} clients "
+          f"({stats['candidate_pairs']} of {stats['all_pairs']} pairs compared, {stats['seconds'] * 1000:.1f} ms)")
+    for index, client_id in enumerate(assignments['client_id']):
+        info_frames[index] = info_frames[index].assign(client_id=client_id) if not info_frames[index].empty else info_frames[index]
+        trans_frames[index] = trans_frames[index].assign(client_id=client_id) if not trans_frames[index].empty else trans_frames[index]
+    if identities is not None:
+        identities.update({'assignments': assignments, 'stats': stats})
+    return _concat_non_empty(info_frames), _concat_non_empty(trans_frames)
+
+def step_2_analyze(df_client_info: pd.DataFrame, df_transactions: pd.DataFrame,
+                   interest_rate: float = DEFAULT_INTEREST_RATE, term_months: int = DEFAULT_TERM_MONTHS,
+                   monthly_history: Optional[pd.DataFrame] = None, lookback_months: Optional[int] = None) -> Dict[str, Any]:
     """
     Performs a more detailed, multi-factor client validity analysis and generates results for the UI.
+    `interest_rate` is the annual rate in percent used to amortize the requested loan.
+    `monthly_history` (from the feature store) extends the stress test beyond this packet's statements.
+    `lookback_months` limits every transaction-based signal to the most recent months (None = all history).
     """
     print("\n[STEP 2/3] Running client validity analysis...")
     print(f"  -> Analyzing {len(df_client_info)} clients with {len(df_transactions)} transactions...")
@@ -134,20 +344,64 @@ def step_2_analyze(df_client_info: pd.DataFrame, df_transactions: pd.DataFrame)
     annual_salary = float(client_data.get('annual_income', 0))
     loan_amount_requested = float(client_data.get('loan_amount_requested', 0))
     alimony_payments_monthly = float(client_data.get('alimony_payments_monthly', 0))
+    existing_debt_monthly = float(client_data.get('existing_debt_monthly', 0) or 0)
     sentiment_score = float(client_data.get('sentiment_score', 0))
-    total_debit = 0.0
-    if not df_transactions.empty:
-        total_debit = df_transactions[df_transactions['type'] == 'DEBIT']['amount'].sum()
+
+    # Scope transactions to the client and the lookback window via the sorted index
+    transactions = TransactionQuery(TransactionIndex(df_transactions)).last_months(lookback_months)
+    window_trans = transactions.collect() if lookback_months is not None else df_transactions
+    client_trans = transactions.for_clients(client_data['client_id']).collect()
+    total_debit = float(client_trans.loc[client_trans['type'] == 'DEBIT', 'amount'].sum())
 
     # --- Enhanced Analysis Logic ---
     
     # 1. Calculate a dynamic Debt-to-Income (DTI) ratio
     monthly_income = annual_salary / 12 if annual_salary > 0 else 1
-    # Estimate monthly payment on new loan (e.g., 5-year term) + existing alimony
-    estimated_new_debt_monthly = (loan_amount_requested / 60) 
-    total_monthly_debt = estimated_new_debt_monthly + alimony_payments_monthly
+    # Amortize the new loan at the entered rate and term + existing alimony + debts from debt reports
+    schedule = amortization_schedules(loan_amount_requested, interest_rate, term_months)
+    estimated_new_debt_monthly = float(schedule['payment'][0, 0])
+    total_interest = float(schedule['interest'][0].sum())
+    total_monthly_debt = estimated_new_debt_monthly + alimony_payments_monthly + existing_debt_monthly
     dti_ratio = total_monthly_debt / monthly_income if monthly_income > 0 else 1.0
 
+    # Sweep nearby amount/rate/term scenarios so the UI can show alternatives
+    loan_scenarios = sweep_loan_scenarios(
+        monthly_income, alimony_payments_monthly + existing_debt_monthly,
+        **default_scenario_axes(loan_amount_requested, interest_rate, term_months)
+    )
+
+    # Monte Carlo cash-flow stress test on the client's monthly history
+    flows = monthly_cash_flows(client_trans)
+    opening_balance = float(closing_balances(client_trans).iloc[0]) if not client_trans.empty else 0.0
+    if monthly_history is not None:
+        stored_flows = monthly_history[monthly_history['client_id'] == str(client_data['client_id'])]
+        if lookback_months is not None:
+            stored_flows = stored_flows.tail(lookback_months)
+        if len(stored_flows) > len(flows):
+            flows = stored_flows
+            opening_balance = opening_balance if not client_trans.empty else float(stored_flows['closing_balance'].iloc[-1])
+    stress = stress_test_client(flows['CREDIT'].values, flows['DEBIT'].values, opening_balance)
+
+    # Rolling-window fraud signals over the client's transactions
+    flagged_rows, fraud_scores = detect_fraud_signals(client_trans)
+    if fraud_scores.empty:
+        fraud_score, fraud = 0.0, "N/A"
+    else:
+        fraud_score, fraud = float(fraud_scores['fraud_score'].iloc[0]), fraud_scores['fraud_risk'].iloc[0]
+
+    # Spending by category (housing, payroll, gambling, loan repayments, alimony, ...) for every client in the run
+    spend_by_category = category_spend(window_trans)
+    client_spend = spend_by_category[spend_by_category['client_id'] == client_data['client_id']]
+    gambling_share = float(client_spend['share_gambling'].iloc[0]) if not client_spend.empty else 0.0
+
+    # Model-based client score, predicted in one batch for every client in the run
+    try:
+        client_scores = score_clients(df_client_info, window_trans)
+        model_score = float(client_scores.set_index('client_id').loc[client_data['client_id'], 'model_score'])
+    except OSError as e:
+        print(f"  -> Client-score model unavailable ({e}); using rule-based score only.")
+        client_scores, model_score = None, None
+
     # 2. Multi-factor risk scoring
     risk_score = 0
     risk_factors = []
@@ -174,21 +428,22 @@ def step_2_analyze(df_client_info: pd.DataFrame, df_transactions: pd.DataFrame)
         risk_score += 15
         risk_factors.append("negative sentiment detected in documents")
 
+    if gambling_share > GAMBLING_SHARE_THRESHOLD:
+        risk_score += 15
+        risk_factors.append(f"gambling accounting for {gambling_share:.0%} of spending")
+
     # 3. Map final risk score to outputs
     if risk_score > 50:
-        fraud = "Medium"
         viability = "Low"
         approval = "Denied"
         reasons = " and ".join(risk_factors)
         insights = f"Client presents a higher risk due to {reasons}. Not recommended for approval at this time."
     elif risk_score > 20:
-        fraud = "Low"
         viability = "Medium"
         approval = "Conditional Approval"
         reasons = " and ".join(risk_factors)
         insights = f"Client has a fair profile but approval is conditional due to {reasons}. Further review is recommended."
     else:
-        fraud = "Low"
         viability = "High"
         approval = "Approved"
         insights = "Client has an excellent credit history and a strong financial profile. Low risk for investment."
@@ -197,29 +452,42 @@ def step_2_analyze(df_client_info: pd.DataFrame, df_transactions: pd.DataFrame)
 
     # Compile results into a dictionary for the UI
     return {
+        'client_id': str(client_data['client_id']),
         'credit_score': credit_score,
+        'model_score': model_score,
+        'client_scores': client_scores,
         'fraud': fraud,
+        'fraud_score': fraud_score,
+        'category_spend': spend_by_category,
+        'gambling_share': gambling_share,
+        'flagged_transactions': flagged_rows,
         'viability': viability,
         'dti': f"{dti_ratio:.1%}",
+        'dti_ratio': dti_ratio,
+        'loan_amount_requested': loan_amount_requested,
+        'monthly_payment': estimated_new_debt_monthly,
+        'existing_debt_monthly': existing_debt_monthly,
+        'existing_debt_balance': float(client_data.get('existing_debt_balance', 0) or 0),
+        'total_interest': total_interest,
+        'loan_scenarios': loan_scenarios,
         'annual_salary': annual_salary,
         'total_debit': total_debit,
+        'prob_negative_balance': stress['prob_negative_balance'],
+        'expected_shortfall': stress['expected_shortfall'],
         'approval': approval,
         'insights': insights,
+        'lookback_months': lookback_months,
         'client_data': client_data, # Pass along for visual generation
         'transactions_df': df_transactions, # Pass along for visual generation
     }
 
-def step_3_generate_visuals(analysis_results: Dict, output_path: str = 'temp_uploaded_files') -> str:
-    """Generates and saves a visual summary of the client's finances."""
-    print("\n[STEP 3/3] Generating visual report...")
-    
-    transactions_df = analysis_results['transactions_df']
-    client_data = analysis_results['client_data']
-    
-    if transactions_df.empty:
-        print(" -> No transaction data to visualize.")
-        return ""
+def monthly_chart_data(transactions_df: pd.DataFrame) -> pd.DataFrame:
+    """The numbers behind the monthly chart: CREDIT / DEBIT totals per calendar month."""
+    month = transactions_df['date'].dt.to_period('M').rename('month')
+    return transactions_df.groupby([month, 'type'])['amount'].sum().unstack().fillna(0)
 
+def render_monthly_chart(transactions_df: pd.DataFrame, title: str) -> bytes:
+    """Renders the monthly credits vs. debits bar chart and returns it as PNG bytes."""
     # Set theme for the plot
     sns.set_theme(style="whitegrid", rc={"axes.facecolor": "#121212", "grid.color": "#2a2a2a", 
                                         "text.color": "white", "xtick.color": "white", 
@@ -229,56 +497,197 @@ def step_3_generate_visuals(analysis_results: Dict, output_path: str = 'temp_upl
     fig, ax = plt.subplots(figsize=(10, 5))
 
     # Summarize transactions by month
-    transactions_df['month'] = transactions_df['date'].dt.to_period('M')
-    monthly_summary = transactions_df.groupby(['month', 'type'])['amount'].sum().unstack().fillna(0)
+    monthly_summary = monthly_chart_data(transactions_df)
     
     monthly_summary.plot(kind='bar', ax=ax, color={"CREDIT": "#b19cd9", "DEBIT": "#555555"})
 
-    ax.set_title(f"Monthly Credits vs. Debits for {client_data['first_name']} {client_data['last_name']}", color="#b19cd9", fontsize=16)
+    ax.set_title(title, color="#b19cd9", fontsize=16)
     ax.set_xlabel("Month", color="white")
     ax.set_ylabel("Amount ($)", color="white")
     ax.tick_params(axis='x', rotation=45)
     ax.legend(title="Transaction Type")
     plt.tight_layout()
 
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', transparent=False, facecolor='#000000')
+    plt.close(fig)
+    return buffer.getvalue()
+
+def step_3_generate_visuals(analysis_results: Dict, output_path: str = 'temp_uploaded_files',
+                            render_chart: Callable[[pd.DataFrame, str], bytes] = render_monthly_chart,
+                            lookback_months: Optional[int] = None) -> str:
+    """Generates and saves a visual summary of the client's finances, optionally for the last `lookback_months` only."""
+    print("\n[STEP 3/3] Generating visual report...")
+    
+    client_data = analysis_results['client_data']
+    transactions_df = TransactionQuery(TransactionIndex(analysis_results['transactions_df'])) \
+        .for_clients(client_data['client_id']).last_months(lookback_months).collect()
+    
+    if transactions_df.empty:
+        print(" -> No transaction data to visualize.")
+        return ""
+
+    title = f"Monthly Credits vs. Debits for {client_data['first_name']} {client_data['last_name']}"
+    if lookback_months is not None:
+        title += f" (last {lookback_months} months)"
+    chart_png = render_chart(transactions_df, title)
+
     # Save the plot to the specified output path
     if not os.path.exists(output_path):
         os.makedirs(output_path)
     chart_path = os.path.join(output_path, f"financial_summary_{client_data['client_id']}.png")
-    plt.savefig(chart_path, transparent=False, facecolor='#000000')
-    plt.close(fig)
+    with open(chart_path, 'wb') as f:
+        f.write(chart_png)
     print(f" -> Visual report saved to: {chart_path}")
     return chart_path
 
 
 # --- Main Pipeline Function (Streamlit Entry Point) ---
 
-def run_gasp_pipeline(file_paths: List[str]) -> Dict[str, Any]:
+# Stage functions run_gasp_pipeline calls; a caller can swap in cached versions
+# with the same signatures via `stages` (see test_code/streamlit_cache.py). With
+# a budget, a replacement 'extract' stage is called with `compute=` set to the
+# BudgetedExtractor and must use it for the files it does not serve itself.
+PIPELINE_STAGES: Dict[str, Callable] = {
+    'extract': extract_loan_data_to_dfs,
+    'analyze': step_2_analyze,
+    'render_chart': render_monthly_chart,
+}
+
+def run_gasp_pipeline(file_paths: List[str], interest_rate: float = DEFAULT_INTEREST_RATE,
+                      term_months: int = DEFAULT_TERM_MONTHS, validate_balances: bool = True,
+                      feature_store_path: Optional[str] = None, results_db_path: Optional[str] = None,
+                      stages: Optional[Dict[str, Callable]] = None, lookback_months: Optional[int] = None,
+                      chart_lookback_months: Optional[int] = None, progress_callback: Optional[ProgressCallback] = None,
+                      cancel_token: Optional[CancellationToken] = None,
+                      checkpoint: Optional[Dict[str, Tuple[pd.DataFrame, pd.DataFrame]]] = None,
+                      budget: Optional[ResourceBudget] = None, debt_reports_path: Optional[str] = None,
+                      chart_dir: str = 'temp_uploaded_files') -> Dict[str, Any]:
     """
     The main callable function for the Streamlit application.
     It runs the entire analysis pipeline, including visual generation.
+    Passing `feature_store_path` reuses and updates the per-client feature store;
+    passing `results_db_path` persists the run to the results database.
+    `stages` overrides entries of PIPELINE_STAGES (e.g. with cached versions).
+    `lookback_months` / `chart_lookback_months` window the scoring and the chart (None = all history).
+    `progress_callback` receives progress events per page, file and stage; `cancel_token` is checked
+    between them. Files already in `checkpoint` (filled in by earlier, interrupted runs) are not re-extracted.
+    With a `budget`, extraction runs through a BudgetedExtractor (size/page/row limits, memory-capped
+    subprocess); a replaced stages['extract'] (e.g. the cache) calls it for the files it does not serve.
+    Debt reports among the uploads (CSV or PDF), plus `debt_reports_path` (a portfolio-wide debt CSV) for
+    clients no upload covers, are joined onto the profiles so DTI includes existing obligations.
+    The chart PNG is written to `chart_dir`.
     """
+    stages = {**PIPELINE_STAGES, **(stages or {})}
+    progress = ProgressReporter(progress_callback, cancel_token)
+    budgeted_extractor = BudgetedExtractor(budget, progress.check) if budget is not None else None
     pipeline_summary = []
+    stage_timings = {}
+    feature_store = FeatureStore(feature_store_path) if feature_store_path else None
     print("\nThank you for choosing GA$P. We are processing your request...")
     pipeline_summary.append("SETUP: All custom modules imported successfully.")
     pipeline_summary.append("\nThank you for choosing GA$P. We are processing your request...")
     
     try:
         # 1. Initialize Data
-        df_info, df_trans = step_1_data_receiver(file_paths)
+        stage_start = time.perf_counter()
+        ocr_before = ocr_stats()
+        identities = {}
+        extractor = stages['extract']
+        if budgeted_extractor is not None:
+            extractor = budgeted_extractor if extractor is extract_loan_data_to_dfs else partial(extractor, compute=budgeted_extractor)
+        df_info, df_trans = step_1_data_receiver(file_paths, feature_store, extractor, progress, checkpoint, identities)
+        stage_timings['extraction'] = time.perf_counter() - stage_start
         pipeline_summary.extend([
             "\n[STEP 1/3] Data received and initialized.",
-            f" -> Processing files: {[os.path.basename(p) for p in file_paths]}"
+            f" -> Processing files: {[os.path.basename(p) for p in file_paths]}",
+            f" -> Identity resolution: {identities['stats']['documents']} documents linked to {identities['stats']['clients']} client(s)"
         ])
+        uncertain = identities['assignments'][identities['assignments']['confidence'] < LOW_IDENTITY_CONFIDENCE]
+        pipeline_summary.extend(
+            f"[WARNING] {os.path.basename(doc)} was assigned to client {client_id} with low confidence ({confidence:.2f}); check that it belongs to this client."
+            for doc, client_id, confidence in uncertain[['doc', 'client_id', 'confidence']].itertuples(index=False, name=None)
+        )
+        # Isolated extraction recognizes pages in its subprocess, which reports its own OCR stats
+        ocr_parts = [ocr_stats_delta(ocr_before)]
+        if budgeted_extractor is not None and budget.isolate:
+            ocr_parts.extend(doc['ocr'] for doc in budgeted_extractor.usage if isinstance(doc.get('ocr'), dict))
+        ocr_usage = combine_ocr_stats(ocr_parts)
+        if ocr_usage['ocr_pages'] or ocr_usage['cache_hits']:
+            pipeline_summary.append(
+                f" -> OCR: {ocr_usage['ocr_pages']} scanned page(s) recognized at {ocr_usage['pages_per_sec']:.2f} pages/s, "
+                f"{ocr_usage['cache_hits']} served from the OCR cache"
+            )
+        if ocr_usage['skipped']:
+            pipeline_summary.append(f"[WARNING] {ocr_usage['skipped']} page(s) have no text layer and OCR is not installed; they were skipped.")
+        resource_usage = None
+        if budgeted_extractor is not None:
+            resource_usage = budget_utilization(budgeted_extractor.usage, budget)
+            if resource_usage['documents']:
+                pipeline_summary.append(
+                    f" -> Resource budget: {resource_usage['documents']} documents extracted in isolation "
+                    f"({resource_usage['streamed']} streamed, {resource_usage['rejected']} rejected); peak use "
+                    f"bytes {resource_usage['bytes']:.0%}, pages {resource_usage['pages']:.0%}, "
+                    f"rows {resource_usage['rows']:.0%}, memory {resource_usage['memory']:.0%}"
+                )
+            pipeline_summary.extend(f"[WARNING] {reason}" for reason in resource_usage.get('rejections', []))
         
         if df_info.empty:
+            rejections = resource_usage.get('rejections', []) if resource_usage else []
             return {
                 "pipeline_summary": pipeline_summary + ["[ERROR] No loan profile data could be extracted."],
                 "error": "Could not parse loan profile PDF. Please check the file format and content."
+                         + (f" Rejected over budget: {'; '.join(rejections)}" if rejections else "")
             }
 
+        # Existing obligations from debt reports, joined onto every profile by client_id
+        stage_start = time.perf_counter()
+        debts = load_debt_reports(file_paths)
+        if not debts.empty:
+            # A single-client report follows its document's resolved client; reports the resolver
+            # could not identify (e.g. CSVs) and multi-client tables keep their own client_id
+            assignments = identities['assignments']
+            resolved = assignments[assignments['client_id'] != UNRESOLVED_ID]
+            resolved_by_name = dict(zip(resolved['doc'].map(os.path.basename), resolved['client_id']))
+            remapped = debts['source'].map(resolved_by_name)
+            single_client = debts.groupby('source')['client_id'].transform('nunique').eq(1)
+            debts['client_id'] = remapped.where(single_client & remapped.notna(), debts['client_id'])
+        if debt_reports_path:
+            debts = combine_debt_sources(debts, load_debt_reports([debt_reports_path]))
+        df_info = attach_existing_debt(df_info, debts)
+        stage_timings['debt_reports'] = time.perf_counter() - stage_start
+        if not debts.empty:
+            pipeline_summary.append(
+                f" -> Debt reports: {len(debts)} account(s) for {debts['client_id'].nunique()} client(s), "
+                f"${df_info['existing_debt_monthly'].sum():,.2f}/month attached to {int((df_info['debt_accounts'] > 0).sum())} profile(s)"
+            )
+
+        # Validate running balances before anything gets scored
+        balance_breaks, extraction_quality = None, None
+        if validate_balances:
+            progress.report('reconciliation', 0.0, "Reconciling running balances...")
+            stage_start = time.perf_counter()
+            balance_breaks, extraction_quality = reconcile_balances(df_trans)
+            stage_timings['reconciliation'] = time.perf_counter() - stage_start
+            pipeline_summary.append(
+                f" -> Balance reconciliation: {extraction_quality['breaks']} breaks in "
+                f"{extraction_quality['checked_rows']} checked rows (status: {extraction_quality['status']}, "
+                f"{stage_timings['reconciliation'] * 1000:.1f} ms)"
+            )
+            if extraction_quality['status'] in ('DEGRADED', 'FAILED'):
+                pipeline_summary.append(
+                    f"[WARNING] Running balances do not reconcile for client(s) "
+                    f"{', '.join(extraction_quality['clients_with_breaks'])}; parsed transactions may be incomplete."
+                )
+
         # 2. Analyze Data
-        analysis_results = step_2_analyze(df_info, df_trans)
+        progress.report('analysis', 0.0, "Scoring client...")
+        stage_start = time.perf_counter()
+        monthly_history = feature_store.monthly_history(df_info['client_id'].unique()) if feature_store else None
+        analysis_results = stages['analyze'](df_info, df_trans, interest_rate, term_months, monthly_history, lookback_months)
+        stage_timings['analysis'] = time.perf_counter() - stage_start
+        if feature_store is not None:
+            feature_store.record_risk_output(analysis_results['client_data']['client_id'], analysis_results)
         pipeline_summary.extend([
             "\n[STEP 2/3] Running client validity analysis...",
             f" -> Analyzing {len(df_info)} clients with {len(df_trans)} transactions...",
@@ -286,8 +695,29 @@ def run_gasp_pipeline(file_paths: List[str]) -> Dict[str, Any]:
         ])
         
         # 3. Generate Visuals
-        chart_path = step_3_generate_visuals(analysis_results)
+        progress.report('visuals', 0.0, "Rendering charts...")
+        stage_start = time.perf_counter()
+        chart_path = step_3_generate_visuals(analysis_results, chart_dir, stages['render_chart'], chart_lookback_months)
+        stage_timings['visuals'] = time.perf_counter() - stage_start
         analysis_results['chart_path'] = chart_path
+        analysis_results['extraction_quality'] = extraction_quality
+        analysis_results['balance_breaks'] = balance_breaks
+        analysis_results['resource_usage'] = resource_usage
+        analysis_results['ocr_usage'] = ocr_usage
+        analysis_results['identity_resolution'] = identities['assignments']
+
+        # Persist the run (profiles, transactions, client result) in one transaction
+        if results_db_path:
+            progress.report('persistence', 0.0, "Saving results...")
+            stage_start = time.perf_counter()
+            results_db = ResultsDB(results_db_path)
+            try:
+                analysis_results['run_id'] = results_db.record_run(
+                    'pipeline', file_paths, df_info, df_trans, client_results_frame(analysis_results), stage_timings=stage_timings
+                )
+            finally:
+                results_db.close()
+            stage_timings['persistence'] = time.perf_counter() - stage_start
 
         # Clean up dataframes from dict before returning to UI
         del analysis_results['client_data']
@@ -297,11 +727,27 @@ def run_gasp_pipeline(file_paths: List[str]) -> Dict[str, Any]:
         print("\n[STEP 4/4] Finalizing report...")
         pipeline_summary.append("\n[STEP 3/3] Generating final report...") # This line is kept for consistency in logs
         analysis_results['pipeline_summary'] = pipeline_summary
+        analysis_results['stage_timings'] = stage_timings
+        progress.report('persistence', 1.0, "Assessment complete.")
         print("\nGA$P process successfully completed.")
         
+    except PipelineCancelled:
+        completed = len(checkpoint) if checkpoint is not None else 0
+        print(f"\nPipeline cancelled after {time.perf_counter() - progress.started:.1f}s.")
+        return {
+            "cancelled": True,
+            "error": f"Assessment cancelled. {completed} extracted file(s) are kept and will be reused if you restart.",
+            "pipeline_summary": pipeline_summary + ["[CANCELLED] Run stopped by user."],
+            "stage_timings": stage_timings,
+        }
     except Exception as e:
         print(f"\nFATAL ERROR encountered during pipeline execution: {e}")
         return {"error": str(e), "pipeline_summary": pipeline_summary}
+    finally:
+        if feature_store is not None:
+            feature_store.close()
+        if budgeted_extractor is not None:
+            budgeted_extractor.close()
         
     return analysis_results
 
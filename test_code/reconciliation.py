@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Tuple
+
+# --- Configuration ---
+
+BALANCE_TOLERANCE = 0.01       # Dollars of slack allowed in running balances
+DEGRADED_BREAK_RATE = 0.01     # Above this share of broken rows extraction is suspect
+FAILED_BREAK_RATE = 0.10       # Above this share the parsed statement is not trustworthy
+
+# --- Balance Arithmetic ---
+
+def signed_amounts(df_transactions: pd.DataFrame) -> pd.Series:
+    """Credits as positive and debits as negative amounts."""
+    return df_transactions['amount'].where(df_transactions['type'] == 'CREDIT', -df_transactions['amount'])
+
+def balance_gaps(df_transactions: pd.DataFrame) -> np.ndarray:
+    """
+    Difference between each reported balance and balance[i-1] +/- amount[i],
+    computed with one np.diff over client-contiguous rows. The first row of
+    every client has nothing to check against and comes back as NaN.
+    """
+    codes, _ = pd.factorize(df_transactions['client_id'])
+    balance = df_transactions['balance'].to_numpy(dtype=float)
+    signed = signed_amounts(df_transactions).to_numpy(dtype=float)
+
+    # Extraction emits each client's rows contiguously; only reorder when it did not
+    order = None
+    if len(codes) > 1 and (np.diff(codes) < 0).any():
+        order = np.argsort(codes, kind='stable')
+        codes, balance, signed = codes[order], balance[order], signed[order]
+
+    gaps = np.full(len(balance), np.nan)
+    if len(balance) > 1:
+        same_client = codes[1:] == codes[:-1]
+        gaps[1:] = np.where(same_client, np.diff(balance) - signed[1:], np.nan)
+
+    if order is not None:
+        restored = np.empty_like(gaps)
+        restored[order] = gaps
+        gaps = restored
+    return gaps
+
+# --- Validation Stage ---
+
+def reconcile_balances(df_transactions: pd.DataFrame, tolerance: float = BALANCE_TOLERANCE) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Checks every running balance against the previous one. Returns the rows
+    that break the chain (with their expected balance and gap) and an
+    extraction-quality report for the pipeline summary.
+    """
+    if df_transactions.empty:
+        return df_transactions.copy(), {
+            'rows': 0, 'checked_rows': 0, 'breaks': 0, 'break_rate': 0.0,
+            'quality': 1.0, 'status': 'NO DATA', 'clients_with_breaks': [],
+        }
+
+    gaps = balance_gaps(df_transactions)
+    checked = ~np.isnan(gaps)
+    broken = checked & (np.abs(np.nan_to_num(gaps)) > tolerance)
+
+    breaks = df_transactions.loc[broken].copy()
+    breaks['expected_balance'] = df_transactions['balance'].to_numpy()[broken] - gaps[broken]
+    breaks['balance_gap'] = gaps[broken]
+
+    n_checked = int(checked.sum())
+    n_breaks = int(broken.sum())
+    break_rate = n_breaks / n_checked if n_checked else 0.0
+    if break_rate > FAILED_BREAK_RATE:
+        status = 'FAILED'
+    elif break_rate > DEGRADED_BREAK_RATE:
+        status = 'DEGRADED'
+    else:
+        status = 'OK'
+
+    report = {
+        'rows': len(df_transactions),
+        'checked_rows': n_checked,
+        'breaks': n_breaks,
+        'break_rate': break_rate,
+        'quality': 1.0 - break_rate,
+        'status': status,
+        'clients_with_breaks': sorted(breaks['client_id'].astype(str).unique().tolist()),
+    }
+    return breaks, report
@@ -0,0 +1,421 @@
+import io
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+import contextlib
+import tracemalloc
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from test_code.pipeline import PIPELINE_STAGES, extract_loan_data_to_dfs, monthly_chart_data, run_gasp_pipeline
+from test_code.feature_store import FeatureStore
+from test_code.models.export_models import PARITY_TOLERANCE, check_reference_outputs
+
+# Golden-output and performance regression harness. Every sample packet (the
+# documents of one client in one of PACKET_DIRS) is run through
+# run_gasp_pipeline. The parsed frames, risk fields and chart data are
+# recorded as golden outputs, and per-stage timings and traced peak memory
+# as baselines. A check run reports correctness diffs against the goldens
+# and performance deltas against the baselines, checks that loading the same
+# statement twice leaves the feature store's monthly history unchanged, and
+# compares the NumPy runtime with the Keras reference outputs saved next to
+# each exported model.
+
+# --- Configuration ---
+# Run from the repository root:
+#   python -m test_code.regression_harness record     # (re)write goldens and baselines
+#   python -m test_code.regression_harness check      # diff against them; exit code 1 on any output change
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden')
+PERFORMANCE_BASELINE_PATH = os.path.join(GOLDEN_DIR, 'performance.json')
+PACKET_DIRS = ['test_code/pdfs', 'output', 'temp_uploaded_files']
+DOCUMENT_PREFIX = re.compile(r'^(?:Loan_Profile|Bank_Statement|Client_Report|Loan_Application)_')
+FLOAT_DECIMALS = 6
+MAX_GOLDEN_RECORDS = 50  # frames up to this many rows are stored cell by cell, larger ones as hashes
+VOLATILE_FIELDS = {'stage_timings', 'pipeline_summary', 'ocr_usage.seconds', 'ocr_usage.pages_per_sec'}
+TIMING_REPEATS = 3
+SLOWDOWN_TOLERANCE = 0.25  # a stage is flagged when it is this much slower than its baseline...
+MIN_SLOWDOWN_MS = 5.0      # ...and at least this many milliseconds slower
+MAX_REPORTED_DIFFS = 20    # per packet
+
+# --- Packets ---
+
+def discover_packets(packet_dirs: List[str] = PACKET_DIRS) -> Dict[str, List[str]]:
+    """
+    Packet id -> PDF paths relative to the repository root. Documents are
+    grouped per directory by what follows the document-type prefix, so
+    Loan_Profile_1_Newman.pdf and Bank_Statement_1_Newman.pdf form '<dir>/1_Newman'.
+    """
+    packets = {}
+    for directory in packet_dirs:
+        absolute = os.path.join(REPO_ROOT, directory)
+        if not os.path.isdir(absolute):
+            continue
+        for name in sorted(os.listdir(absolute)):
+            stem, extension = os.path.splitext(name)
+            if extension.lower() != '.pdf':
+                continue
+            packet_id = f"{os.path.basename(directory)}__{DOCUMENT_PREFIX.sub('', stem)}"
+            packets.setdefault(packet_id, []).append(os.path.join(directory, name))
+    return packets
+
+# --- Canonical Form ---
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode()).hexdigest()[:16]
+
+def frame_summary(frame: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Shape, dtypes and a hash per column (plus one over the index and one
+    overall). Small frames also keep their rows, so a diff can name the cell.
+    """
+    columns = {str(column): [canonical(value) for value in frame[column].tolist()] for column in frame.columns}
+    summary = {
+        'shape': list(frame.shape),
+        'dtypes': {str(column): str(dtype) for column, dtype in frame.dtypes.items()},
+        'column_sha256': {column: _digest(values) for column, values in columns.items()},
+        'index_sha256': _digest([canonical(value) for value in frame.index.tolist()]),
+        'sha256': _digest(columns),
+    }
+    if len(frame) <= MAX_GOLDEN_RECORDS:
+        summary['records'] = [dict(zip(columns, row)) for row in zip(*columns.values())]
+    return summary
+
+def canonical(value: Any, path: str = '') -> Any:
+    """A JSON-ready, platform-stable form of a pipeline value; floats rounded, VOLATILE_FIELDS dropped."""
+    if isinstance(value, pd.DataFrame):
+        return frame_summary(value)
+    if isinstance(value, pd.Series):
+        return frame_summary(value.to_frame())
+    if isinstance(value, dict):
+        return {str(key): canonical(item, f"{path}.{key}" if path else str(key)) for key, item in value.items()
+                if (f"{path}.{key}" if path else str(key)) not in VOLATILE_FIELDS}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [canonical(item, path) for item in value]
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return round(float(value), FLOAT_DECIMALS) if np.isfinite(value) else str(float(value))
+    if value is None or isinstance(value, str):
+        return value
+    if value is pd.NA or value is pd.NaT:
+        return 'nan'
+    return str(value)
+
+# --- Running a Packet ---
+
+class _StageRecorder:
+    """
+    Wraps the pipeline's stage functions to capture the frames handed to the
+    analysis, the chart data, and (while tracemalloc runs) each stage's peak.
+    """
+
+    STAGE_NAMES = {'extract': 'extraction', 'analyze': 'analysis', 'render_chart': 'visuals'}
+
+    def __init__(self, trace_memory: bool):
+        self.trace_memory = trace_memory
+        self.captured: Dict[str, Any] = {}
+        self.peaks: Dict[str, int] = {}
+        self.overall_peak = 0
+
+    def wrap(self, key: str, func: Callable) -> Callable:
+        stage = self.STAGE_NAMES[key]
+
+        def wrapped(*args, **kwargs):
+            if stage == 'analysis':
+                self.captured['client_info'], self.captured['transactions'] = args[0], args[1]
+            elif stage == 'visuals':
+                self.captured['chart'] = {'title': args[1], 'data': monthly_chart_data(args[0])}
+            if not self.trace_memory:
+                return func(*args, **kwargs)
+            current, peak = tracemalloc.get_traced_memory()
+            self.overall_peak = max(self.overall_peak, peak)
+            tracemalloc.reset_peak()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stage_peak = tracemalloc.get_traced_memory()[1]
+                self.overall_peak = max(self.overall_peak, stage_peak)
+                self.peaks[stage] = max(self.peaks.get(stage, 0), stage_peak - current)
+
+        return wrapped
+
+    def stages(self) -> Dict[str, Callable]:
+        return {key: self.wrap(key, func) for key, func in PIPELINE_STAGES.items()}
+
+def run_packet(files: List[str], trace_memory: bool = False) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    One pipeline run over `files` (charts go to a temporary directory).
+    Returns (canonical outputs, performance): stage timings in ms and, with
+    `trace_memory`, the traced peak MB per stage and for the whole run.
+    """
+    recorder = _StageRecorder(trace_memory)
+    if trace_memory:
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        with tempfile.TemporaryDirectory() as chart_dir, contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            results = run_gasp_pipeline(files, stages=recorder.stages(), chart_dir=chart_dir)
+            elapsed = time.perf_counter() - started
+        if trace_memory:
+            recorder.overall_peak = max(recorder.overall_peak, tracemalloc.get_traced_memory()[1])
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+
+    results = dict(results)
+    if results.get('chart_path'):
+        results['chart_path'] = os.path.basename(results['chart_path'])
+    outputs = {
+        'files': files,
+        'frames': {name: canonical(recorder.captured[name]) for name in ('client_info', 'transactions') if name in recorder.captured},
+        'chart': canonical(recorder.captured.get('chart')),
+        'results': canonical(results),
+    }
+    performance = {'stages_ms': {stage: seconds * 1000 for stage, seconds in results.get('stage_timings', {}).items()},
+                   'total_ms': elapsed * 1000}
+    if trace_memory:
+        performance['peak_mb'] = {stage: peak / 1e6 for stage, peak in recorder.peaks.items()}
+        performance['peak_mb']['total'] = (recorder.overall_peak - baseline) / 1e6
+    return json.loads(json.dumps(outputs)), performance
+
+def measure_packet(files: List[str], repeats: int = TIMING_REPEATS) -> Tuple[Dict[str, Any], Dict[str, Any], bool]:
+    """
+    `repeats` timed runs (medians are kept) plus one run under tracemalloc for
+    peak memory, which would distort the timings. Returns (outputs,
+    performance, deterministic), where deterministic means every run produced
+    the same outputs.
+    """
+    runs = [run_packet(files) for _ in range(max(repeats, 1))]
+    traced_outputs, traced = run_packet(files, trace_memory=True)
+    outputs = runs[0][0]
+    deterministic = all(run_outputs == outputs for run_outputs, _ in runs[1:]) and traced_outputs == outputs
+
+    stages = sorted({stage for _, performance in runs for stage in performance['stages_ms']})
+    performance = {
+        'stages_ms': {stage: float(np.median([p['stages_ms'].get(stage, 0.0) for _, p in runs])) for stage in stages},
+        'total_ms': float(np.median([p['total_ms'] for _, p in runs])),
+        'peak_mb': traced['peak_mb'],
+    }
+    return outputs, performance, deterministic
+
+# --- Diffs ---
+
+def diff_outputs(golden: Any, current: Any, path: str = '') -> List[str]:
+    """Every leaf where `current` differs from `golden`, as '<path>: <golden> -> <current>'."""
+    if isinstance(golden, dict) and isinstance(current, dict):
+        diffs = []
+        for key in sorted(set(golden) | set(current)):
+            child = f"{path}.{key}" if path else key
+            if key not in current:
+                diffs.append(f"{child}: missing (golden {golden[key]!r:.80})")
+            elif key not in golden:
+                diffs.append(f"{child}: new field ({current[key]!r:.80})")
+            else:
+                diffs.extend(diff_outputs(golden[key], current[key], child))
+        return diffs
+    if isinstance(golden, list) and isinstance(current, list):
+        if len(golden) != len(current):
+            return [f"{path}: {len(golden)} items -> {len(current)} items"]
+        return [diff for index, (old, new) in enumerate(zip(golden, current)) for diff in diff_outputs(old, new, f"{path}[{index}]")]
+    return [] if golden == current else [f"{path}: {golden!r:.80} -> {current!r:.80}"]
+
+def performance_deltas(baseline: Dict[str, Any], current: Dict[str, Any]) -> pd.DataFrame:
+    """One row per packet and stage: baseline / current ms and peak MB, the relative change, and a slowdown flag."""
+    rows = []
+    for packet_id, measured in current.items():
+        reference = baseline.get(packet_id)
+        if reference is None:
+            continue
+        timings = dict(measured['stages_ms'], total=measured['total_ms'])
+        reference_timings = dict(reference['stages_ms'], total=reference['total_ms'])
+        for stage, current_ms in timings.items():
+            baseline_ms = reference_timings.get(stage, np.nan)
+            rows.append({
+                'packet': packet_id, 'stage': stage, 'baseline_ms': baseline_ms, 'current_ms': current_ms,
+                'baseline_peak_mb': reference.get('peak_mb', {}).get(stage, np.nan),
+                'current_peak_mb': measured.get('peak_mb', {}).get(stage, np.nan),
+            })
+    deltas = pd.DataFrame(rows, columns=['packet', 'stage', 'baseline_ms', 'current_ms', 'baseline_peak_mb', 'current_peak_mb'])
+    deltas['time_change'] = deltas['current_ms'] / deltas['baseline_ms'] - 1
+    deltas['peak_change'] = deltas['current_peak_mb'] / deltas['baseline_peak_mb'] - 1
+    deltas['slower'] = ((deltas['time_change'] > SLOWDOWN_TOLERANCE)
+                        & (deltas['current_ms'] - deltas['baseline_ms'] > MIN_SLOWDOWN_MS))
+    return deltas
+
+# --- Feature Store ---
+
+def check_feature_store_dedup(packets: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """
+    Loads each bank statement into a fresh feature store once, then again
+    (the same file, plus its copies from the other packet directories, which
+    are often byte-different). Returns {statement: diffs} for every statement
+    whose monthly history changed.
+    """
+    copies = {}
+    for files in packets.values():
+        for path in files:
+            if os.path.basename(path).startswith('Bank_Statement_'):
+                copies.setdefault(os.path.basename(path), []).append(path)
+    failures = {}
+    with contextlib.redirect_stdout(io.StringIO()), tempfile.TemporaryDirectory() as scratch:
+        for name, paths in copies.items():
+            store = FeatureStore(os.path.join(scratch, f"{name}.db"))
+            try:
+                store.load_or_extract(paths[:1], extract_loan_data_to_dfs)
+                client_ids = store.conn.execute("SELECT client_id FROM monthly_aggregates").fetchall()
+                once = store.monthly_history([client_id for client_id, in client_ids])
+                for path in paths:
+                    store.load_or_extract([path], extract_loan_data_to_dfs)
+                diffs = diff_outputs(canonical(once), canonical(store.monthly_history([client_id for client_id, in client_ids])))
+            finally:
+                store.close()
+            if diffs:
+                failures[name] = diffs
+    return failures
+
+# --- Record & Check ---
+
+def _golden_path(packet_id: str) -> str:
+    return os.path.join(GOLDEN_DIR, f"{packet_id}.json")
+
+def _load_json(path: str) -> Any:
+    with open(path) as f:
+        return json.load(f)
+
+def _write_json(path: str, value: Any) -> None:
+    with open(path + '.tmp', 'w') as f:
+        json.dump(value, f, indent=1, sort_keys=True)
+        f.write('\n')
+    os.replace(path + '.tmp', path)
+
+def _select(packets: Dict[str, List[str]], filters: Optional[List[str]]) -> Dict[str, List[str]]:
+    return {packet_id: files for packet_id, files in packets.items() if not filters or any(f in packet_id for f in filters)}
+
+def record(filters: Optional[List[str]] = None, repeats: int = TIMING_REPEATS) -> Dict[str, Any]:
+    """Runs the selected packets and writes their golden outputs and performance baselines."""
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    baselines = _load_json(PERFORMANCE_BASELINE_PATH) if os.path.exists(PERFORMANCE_BASELINE_PATH) else {}
+    nondeterministic = []
+    for packet_id, files in _select(discover_packets(), filters).items():
+        outputs, performance, deterministic = measure_packet(files, repeats)
+        _write_json(_golden_path(packet_id), outputs)
+        baselines[packet_id] = performance
+        if not deterministic:
+            nondeterministic.append(packet_id)
+        print(f"  -> recorded {packet_id}: {len(files)} document(s), {performance['total_ms']:.0f} ms, "
+              f"peak {performance['peak_mb']['total']:.1f} MB{'' if deterministic else ' [NONDETERMINISTIC]'}")
+    _write_json(PERFORMANCE_BASELINE_PATH, baselines)
+    return {'packets': len(baselines), 'nondeterministic': nondeterministic}
+
+def check(filters: Optional[List[str]] = None, repeats: int = TIMING_REPEATS) -> Dict[str, Any]:
+    """
+    Runs the selected packets and compares them with the goldens and
+    baselines. Returns {'diffs': {packet: [...]}, 'missing': [...],
+    'nondeterministic': [...], 'performance': deltas frame,
+    'feature_store': {statement: [...]}, 'model_parity': {export: max |numpy - keras|}}.
+    """
+    baselines = _load_json(PERFORMANCE_BASELINE_PATH) if os.path.exists(PERFORMANCE_BASELINE_PATH) else {}
+    report = {'diffs': {}, 'missing': [], 'nondeterministic': []}
+    measured = {}
+    for packet_id, files in _select(discover_packets(), filters).items():
+        if not os.path.exists(_golden_path(packet_id)):
+            report['missing'].append(packet_id)
+            continue
+        outputs, measured[packet_id], deterministic = measure_packet(files, repeats)
+        diffs = diff_outputs(_load_json(_golden_path(packet_id)), outputs)
+        if diffs:
+            report['diffs'][packet_id] = diffs
+        if not deterministic:
+            report['nondeterministic'].append(packet_id)
+        print(f"  -> {packet_id}: {'OK' if not diffs else f'{len(diffs)} difference(s)'}"
+              f"{'' if deterministic else ' [NONDETERMINISTIC]'}")
+    report['performance'] = performance_deltas(baselines, measured)
+    report['feature_store'] = check_feature_store_dedup(_select(discover_packets(), filters))
+    report['model_parity'] = check_reference_outputs()
+    return report
+
+def parity_failures(report: Dict[str, Any]) -> List[str]:
+    return [name for name, diff in report['model_parity'].items() if diff > PARITY_TOLERANCE]
+
+def print_check_report(report: Dict[str, Any]) -> None:
+    print("\n--- Correctness ---")
+    for packet_id, diffs in report['diffs'].items():
+        print(f"{packet_id}:")
+        for diff in diffs[:MAX_REPORTED_DIFFS]:
+            print(f"    {diff}")
+        if len(diffs) > MAX_REPORTED_DIFFS:
+            print(f"    ... {len(diffs) - MAX_REPORTED_DIFFS} more")
+    if report['missing']:
+        print(f"No golden output (run `record`): {', '.join(report['missing'])}")
+    if report['nondeterministic']:
+        print(f"Outputs changed between repeated runs: {', '.join(report['nondeterministic'])}")
+    if not report['diffs']:
+        print("All outputs match the goldens.")
+
+    print("\n--- Feature Store (same statement loaded twice) ---")
+    for name, diffs in report['feature_store'].items():
+        print(f"{name}: monthly history changed")
+        for diff in diffs[:MAX_REPORTED_DIFFS]:
+            print(f"    {diff}")
+    if not report['feature_store']:
+        print("Monthly histories unchanged.")
+
+    print("\n--- Model Parity (saved Keras reference outputs) ---")
+    for name, diff in report['model_parity'].items():
+        if np.isnan(diff):
+            print(f"  -> {name}: no reference saved (run `python -m test_code.models.export_models --reference`)")
+        else:
+            print(f"  -> {name}: max |numpy - keras| = {diff:.2e} [{'OK' if diff <= PARITY_TOLERANCE else 'MISMATCH'}]")
+
+    deltas = report['performance']
+    if deltas.empty:
+        return
+    print("\n--- Performance (all packets) ---")
+    totals = deltas.groupby('stage', sort=False).agg(baseline_ms=('baseline_ms', 'sum'), current_ms=('current_ms', 'sum'),
+                                                     baseline_peak_mb=('baseline_peak_mb', 'max'), current_peak_mb=('current_peak_mb', 'max'))
+    print(f"{'stage':15} {'baseline ms':>12} {'current ms':>11} {'change':>8} {'peak MB':>9} {'was':>8}")
+    for stage, row in totals.iterrows():
+        change = row['current_ms'] / row['baseline_ms'] - 1 if row['baseline_ms'] else np.nan
+        print(f"{stage:15} {row['baseline_ms']:>12.1f} {row['current_ms']:>11.1f} {change:>+8.0%} "
+              f"{row['current_peak_mb']:>9.1f} {row['baseline_peak_mb']:>8.1f}")
+    slower = deltas[deltas['slower']]
+    for row in slower.itertuples(index=False):
+        print(f"[SLOWER] {row.packet} {row.stage}: {row.baseline_ms:.1f} -> {row.current_ms:.1f} ms ({row.time_change:+.0%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Golden-output and performance regression harness for the pipeline.")
+    parser.add_argument('mode', choices=['record', 'check'])
+    parser.add_argument('--packets', nargs='*', help="Only packets whose id contains one of these strings.")
+    parser.add_argument('--repeats', type=int, default=TIMING_REPEATS, help="Timed runs per packet (medians are reported).")
+    parser.add_argument('--fail-on-slowdown', action='store_true', help="Also exit with 1 when a stage is flagged slower.")
+    args = parser.parse_args()
+
+    if os.path.abspath(os.getcwd()) != REPO_ROOT:
+        sys.exit("Run from the repository root; packet paths (and the goldens) are relative to it.")
+    if args.mode == 'record':
+        print("--- Recording Goldens & Baselines ---")
+        summary = record(args.packets, args.repeats)
+        print(f"{summary['packets']} packet baselines in {os.path.relpath(PERFORMANCE_BASELINE_PATH, REPO_ROOT)}")
+        if summary['nondeterministic']:
+            print(f"[WARNING] Outputs changed between repeated runs: {', '.join(summary['nondeterministic'])}")
+    else:
+        print("--- Regression Check ---")
+        check_report = check(args.packets, args.repeats)
+        print_check_report(check_report)
+        failed = bool(check_report['diffs'] or check_report['nondeterministic'] or check_report['feature_store']
+                      or parity_failures(check_report))
+        if args.fail_on_slowdown and check_report['performance']['slower'].any():
+            failed = True
+        sys.exit(1 if failed else 0)
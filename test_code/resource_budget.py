@@ -0,0 +1,265 @@
+import os
+import queue
+import time
+import shutil
+import tempfile
+import multiprocessing
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from test_code.frame_ipc import SHARED_ROOT, export_frames, import_frames
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits, the subprocess still isolates crashes
+    resource = None
+
+# --- Configuration ---
+
+MAX_FILE_BYTES = 25 * 1024 * 1024
+MAX_PAGES = 500
+STREAMING_PAGES = 50            # documents longer than this are extracted page by page
+MAX_TRANSACTION_ROWS = 250_000  # per document
+MAX_RSS_BYTES = 1024 * 1024 * 1024  # extra address space the extraction subprocess may allocate
+PAGED_EXTENSIONS = ('.pdf', '.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp', '.xps', '.epub')  # opened by MuPDF
+PAGE_POLL_SECONDS = 0.05
+
+# --- Budget ---
+
+class BudgetExceeded(Exception):
+    """A document went over one of its resource limits."""
+
+    def __init__(self, limit: str, value: float, allowed: float, file_name: str = ''):
+        super().__init__(f"{file_name or 'document'} exceeds the {limit} budget ({value:,.0f} > {allowed:,.0f})")
+        self.limit, self.value, self.allowed, self.file_name = limit, value, allowed, file_name
+
+    def __reduce__(self):
+        return (BudgetExceeded, (self.limit, self.value, self.allowed, self.file_name))
+
+
+class ResourceBudget:
+    """Per-document limits for extraction, plus the memory ceiling of the extraction subprocess."""
+
+    def __init__(self, max_bytes: int = MAX_FILE_BYTES, max_pages: int = MAX_PAGES, streaming_pages: int = STREAMING_PAGES,
+                 max_rows: int = MAX_TRANSACTION_ROWS, max_rss_bytes: int = MAX_RSS_BYTES, isolate: bool = True):
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self.streaming_pages = streaming_pages
+        self.max_rows = max_rows
+        self.max_rss_bytes = max_rss_bytes
+        self.isolate = isolate
+
+    def __repr__(self) -> str:
+        return (f"ResourceBudget(max_bytes={self.max_bytes}, max_pages={self.max_pages}, streaming_pages={self.streaming_pages}, "
+                f"max_rows={self.max_rows}, max_rss_bytes={self.max_rss_bytes}, isolate={self.isolate})")
+
+DEFAULT_BUDGET = ResourceBudget()
+
+def plan_document(path: str, budget: ResourceBudget) -> Dict[str, Any]:
+    """
+    Cheap pre-flight check (file size and page count only, no text is read).
+    The mode is 'full', 'streaming' for long documents, or 'rejected'. Files
+    MuPDF does not page (CSV debt reports and statements) only get the size
+    check.
+    """
+    import fitz
+
+    plan = {'file': os.path.basename(path), 'bytes': os.path.getsize(path), 'pages': 0, 'mode': 'full', 'reason': ''}
+    if plan['bytes'] > budget.max_bytes:
+        return dict(plan, mode='rejected', reason=str(BudgetExceeded('bytes', plan['bytes'], budget.max_bytes, plan['file'])))
+    if os.path.splitext(path)[1].lower() not in PAGED_EXTENSIONS:
+        return plan
+    try:
+        with fitz.open(path) as doc:
+            plan['pages'] = doc.page_count
+    except Exception as e:
+        return dict(plan, mode='rejected', reason=f"{plan['file']} could not be opened: {e}")
+    if plan['pages'] > budget.max_pages:
+        return dict(plan, mode='rejected', reason=str(BudgetExceeded('pages', plan['pages'], budget.max_pages, plan['file'])))
+    if plan['pages'] > budget.streaming_pages:
+        plan['mode'] = 'streaming'
+    return plan
+
+# --- Extraction Subprocess ---
+
+_PAGE_QUEUE = None
+_BASELINE_RSS = 0
+
+def _proc_status_bytes(field: str) -> Optional[int]:
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+def _init_extraction_worker(max_rss_bytes: int, page_queue) -> None:
+    """Caps the worker's address space at its current size plus the budget (RLIMIT_RSS is not enforced on Linux)."""
+    global _PAGE_QUEUE, _BASELINE_RSS
+    _PAGE_QUEUE = page_queue
+    _BASELINE_RSS = _proc_status_bytes('VmRSS') or 0
+    baseline = _proc_status_bytes('VmSize')
+    if resource is not None and baseline is not None:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (baseline + max_rss_bytes, hard))
+
+def _peak_rss_bytes() -> int:
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KiB on Linux
+
+def _report_page(path: str, page: int, n_pages: int) -> None:
+    if _PAGE_QUEUE is not None:
+        _PAGE_QUEUE.put((page, n_pages))
+
+def extract_document(path: str, mode: str, max_rows: int,
+                     on_page: Optional[Callable[[str, int, int], None]] = None) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, Any]]:
+    """Extracts one document in the chosen mode; runs in the worker (or in-process when not isolating)."""
+    from test_code.ocr import ocr_stats, ocr_stats_delta
+    from test_code.pipeline import extract_document_streaming, extract_loan_data_to_dfs
+
+    on_page = on_page or _report_page
+    started = time.perf_counter()
+    ocr_before = ocr_stats()
+    try:
+        if mode == 'streaming':
+            df_info, df_trans = extract_document_streaming(path, max_rows, on_page=on_page)
+        else:
+            df_info, df_trans = extract_loan_data_to_dfs([path], on_page=on_page)
+            if len(df_trans) > max_rows:
+                raise BudgetExceeded('rows', len(df_trans), max_rows, os.path.basename(path))
+    except MemoryError:
+        raise BudgetExceeded('memory', _peak_rss_bytes(), 0, os.path.basename(path))
+    peak_rss = _peak_rss_bytes()
+    stats = {'rows': len(df_trans), 'peak_rss_bytes': peak_rss, 'rss_growth_bytes': max(peak_rss - _BASELINE_RSS, 0),
+             'seconds': time.perf_counter() - started, 'ocr': ocr_stats_delta(ocr_before)}
+    return df_info, df_trans, stats
+
+def _extract_document_to_ipc(path: str, mode: str, max_rows: int, spool_dir: str) -> Tuple[Dict[str, Tuple[str, Any]], Dict[str, Any]]:
+    """Worker entry point: the frames go back as Arrow IPC files in `spool_dir`, not through the result pipe."""
+    df_info, df_trans, stats = extract_document(path, mode, max_rows)
+    return export_frames({'info': df_info, 'transactions': df_trans}, spool_dir), stats
+
+# --- Budgeted Extractor ---
+
+class BudgetedExtractor:
+    """
+    Drop-in for extract_loan_data_to_dfs that enforces a ResourceBudget. Each
+    document is planned (size, pages), then extracted in a single long-lived
+    worker process whose address space is capped, so a hostile document can
+    only exhaust the worker. Over-budget documents are skipped with a reason
+    instead of failing the run. Per-document usage accumulates in `usage`.
+    The worker hands its frames back as memory-mapped Arrow files (frame_ipc).
+    """
+
+    def __init__(self, budget: ResourceBudget = DEFAULT_BUDGET, cancel_check: Optional[Callable[[], None]] = None):
+        self.budget = budget
+        self.cancel_check = cancel_check
+        self.usage: List[Dict[str, Any]] = []
+        self._pool = None
+        self._page_queue = None
+        self._spool_dir = None
+
+    def __enter__(self) -> 'BudgetedExtractor':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self, kill: bool = False) -> None:
+        if self._pool is not None:
+            processes = list(getattr(self._pool, '_processes', {}).values()) if kill else []
+            for process in processes:
+                process.kill()
+            self._pool.shutdown(wait=not kill, cancel_futures=True)
+            for process in processes:
+                process.join(timeout=1)
+            self._pool = None
+        if self._spool_dir is not None:
+            shutil.rmtree(self._spool_dir, ignore_errors=True)
+            self._spool_dir = None
+
+    def _worker_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            context = multiprocessing.get_context()
+            self._page_queue = context.Queue()
+            self._spool_dir = tempfile.mkdtemp(prefix='extraction_', dir=SHARED_ROOT)
+            self._pool = ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_init_extraction_worker,
+                                             initargs=(self.budget.max_rss_bytes, self._page_queue))
+        return self._pool
+
+    def _extract_isolated(self, path: str, mode: str, on_page: Optional[Callable]) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, Any]]:
+        pool = self._worker_pool()
+        future = pool.submit(_extract_document_to_ipc, path, mode, self.budget.max_rows, self._spool_dir)
+        try:
+            while True:
+                try:
+                    page, n_pages = self._page_queue.get(timeout=PAGE_POLL_SECONDS)
+                    if on_page is not None:
+                        on_page(path, page, n_pages)
+                    continue
+                except queue.Empty:
+                    pass
+                if self.cancel_check is not None:
+                    self.cancel_check()
+                if future.done():
+                    while not self._page_queue.empty():
+                        self._page_queue.get_nowait()
+                    handle, stats = future.result()
+                    frames = import_frames(handle)
+                    return frames['info'], frames['transactions'], stats
+        except BudgetExceeded:
+            raise
+        except BrokenProcessPool:
+            self.close(kill=True)
+            raise BudgetExceeded('memory', self.budget.max_rss_bytes, self.budget.max_rss_bytes, os.path.basename(path))
+        except BaseException:
+            # Cancelled (or interrupted) mid-document: stop the worker now rather than let it finish
+            self.close(kill=True)
+            raise
+
+    def __call__(self, paths: List[str], on_page: Optional[Callable[[str, int, int], None]] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        info_frames, trans_frames = [], []
+        for path in paths:
+            plan = plan_document(path, self.budget)
+            if plan['mode'] != 'rejected':
+                try:
+                    if self.budget.isolate:
+                        df_info, df_trans, stats = self._extract_isolated(path, plan['mode'], on_page)
+                    else:
+                        df_info, df_trans, stats = extract_document(path, plan['mode'], self.budget.max_rows, on_page)
+                    plan.update(stats)
+                    info_frames.append(df_info)
+                    trans_frames.append(df_trans)
+                except BudgetExceeded as e:
+                    plan.update(mode='rejected', reason=str(e))
+            if plan['mode'] == 'rejected':
+                print(f"  -> [BUDGET] Skipping {plan['file']}: {plan['reason']}")
+            self.usage.append(plan)
+
+        info_frames = [frame for frame in info_frames if not frame.empty]
+        trans_frames = [frame for frame in trans_frames if not frame.empty]
+        return (pd.concat(info_frames, ignore_index=True) if info_frames else pd.DataFrame(),
+                pd.concat(trans_frames, ignore_index=True) if trans_frames else pd.DataFrame())
+
+# --- Metrics ---
+
+def budget_utilization(usage: List[Dict[str, Any]], budget: ResourceBudget) -> Dict[str, Any]:
+    """Peak share of each limit used by any one document in the run (1.0 = at the limit)."""
+    frame = pd.DataFrame(usage, columns=['file', 'bytes', 'pages', 'mode', 'reason', 'rows', 'peak_rss_bytes', 'rss_growth_bytes', 'seconds'])
+    if frame.empty:
+        return {'documents': 0, 'rejected': 0, 'streamed': 0}
+    return {
+        'documents': len(frame),
+        'rejected': int((frame['mode'] == 'rejected').sum()),
+        'streamed': int((frame['mode'] == 'streaming').sum()),
+        'bytes': float(frame['bytes'].max() / budget.max_bytes),
+        'pages': float(frame['pages'].max() / budget.max_pages),
+        'rows': float(frame['rows'].fillna(0).max() / budget.max_rows),
+        'memory': float(frame['rss_growth_bytes'].fillna(0).max() / budget.max_rss_bytes),
+        'peak_rss_bytes': float(frame['peak_rss_bytes'].fillna(0).max()),
+        'rejections': frame.loc[frame['mode'] == 'rejected', 'reason'].tolist(),
+    }
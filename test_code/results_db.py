@@ -0,0 +1,308 @@
+import os
+import json
+import sqlite3
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional
+
+# --- Configuration ---
+
+RESULTS_DB_PATH = os.path.join('output', 'gasp_results.db')
+BUSY_TIMEOUT_MS = 30_000
+
+PROFILE_COLUMNS = [
+    'client_id', 'first_name', 'last_name', 'ssn', 'address', 'annual_income', 'employment_status',
+    'credit_score', 'loan_amount_requested', 'collateral_value', 'alimony_payments_monthly', 'sentiment_score',
+]
+TRANSACTION_COLUMNS = ['client_id', 'date', 'description', 'type', 'amount', 'balance']
+RESULT_COLUMNS = [
+    'client_id', 'first_name', 'last_name', 'credit_score', 'model_score', 'dti_ratio', 'fraud', 'fraud_score',
+    'viability', 'approval', 'annual_salary', 'total_debit', 'sentiment_score', 'prob_negative_balance', 'insights',
+]
+STRESS_COLUMNS = ['client_id', 'prob_negative_balance', 'expected_shortfall', 'median_ending_balance', 'worst_balance']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_at TEXT NOT NULL,
+    source TEXT,
+    file_names TEXT,
+    stage_timings TEXT
+);
+CREATE TABLE IF NOT EXISTS client_profiles (
+    run_id INTEGER, run_at TEXT, client_id TEXT, first_name TEXT, last_name TEXT, ssn TEXT, address TEXT,
+    annual_income REAL, employment_status TEXT, credit_score INTEGER, loan_amount_requested REAL,
+    collateral_value REAL, alimony_payments_monthly REAL, sentiment_score REAL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    run_id INTEGER, run_at TEXT, client_id TEXT, date TEXT, description TEXT, type TEXT, amount REAL, balance REAL
+);
+CREATE TABLE IF NOT EXISTS client_results (
+    run_id INTEGER, run_at TEXT, client_id TEXT, first_name TEXT, last_name TEXT, credit_score INTEGER,
+    model_score REAL, dti_ratio REAL, fraud TEXT, fraud_score REAL, viability TEXT, approval TEXT,
+    annual_salary REAL, total_debit REAL, sentiment_score REAL, prob_negative_balance REAL, insights TEXT
+);
+CREATE TABLE IF NOT EXISTS stress_results (
+    run_id INTEGER, run_at TEXT, client_id TEXT, prob_negative_balance REAL, expected_shortfall REAL,
+    median_ending_balance REAL, worst_balance REAL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_run_at ON runs (run_at);
+CREATE INDEX IF NOT EXISTS idx_profiles_client ON client_profiles (client_id, run_at);
+CREATE INDEX IF NOT EXISTS idx_transactions_client ON transactions (client_id, date);
+CREATE INDEX IF NOT EXISTS idx_transactions_run ON transactions (run_id);
+CREATE INDEX IF NOT EXISTS idx_results_client ON client_results (client_id, run_at);
+CREATE INDEX IF NOT EXISTS idx_results_run_at ON client_results (run_at);
+CREATE INDEX IF NOT EXISTS idx_stress_client ON stress_results (client_id, run_at);
+"""
+
+# --- Portfolio Summary Tables ---
+# Bucket edges are upper bounds (exclusive); the last label catches everything above.
+
+DTI_BUCKETS = [(0.10, '0-10%'), (0.20, '10-20%'), (0.36, '20-36%'), (0.50, '36-50%'), (None, '50%+')]
+RISK_BUCKETS = [(580, 'Poor (<580)'), (670, 'Fair (580-669)'), (740, 'Good (670-739)'), (800, 'Very Good (740-799)'), (None, 'Exceptional (800+)')]
+SENTIMENT_BUCKETS = [(0.0, 'Negative'), (0.33, 'Neutral'), (None, 'Positive')]  # scores run from -1 to 1; missing -> 'Unknown'
+APPROVAL_ORDER = ['Approved', 'Conditional Approval', 'Denied', 'Unknown']
+PORTFOLIO_DIMENSIONS = ['approval', 'dti', 'risk', 'fraud', 'sentiment']
+
+def _bucket_case(expression: str, buckets: List[tuple]) -> str:
+    whens = ' '.join(f"WHEN {expression} < {edge} THEN '{label}'" for edge, label in buckets if edge is not None)
+    return f"CASE WHEN {expression} IS NULL THEN 'Unknown' {whens} ELSE '{buckets[-1][1]}' END"
+
+def _portfolio_row(alias: str) -> str:
+    """Column expressions turning a client_results row into a portfolio_clients row."""
+    return ', '.join([
+        f"{alias}.client_id", f"{alias}.run_at",
+        f"COALESCE({alias}.approval, 'Unknown')", f"COALESCE({alias}.fraud, 'Unknown')",
+        _bucket_case(f"{alias}.dti_ratio", DTI_BUCKETS),
+        _bucket_case(f"{alias}.credit_score", RISK_BUCKETS),
+        _bucket_case(f"{alias}.sentiment_score", SENTIMENT_BUCKETS),
+        f"{alias}.dti_ratio", f"{alias}.sentiment_score",
+        f"CASE WHEN {alias}.approval = 'Approved' THEN 1 ELSE 0 END",
+    ])
+
+_BUCKET_KEYS = [('approval', 'approval'), ('dti', 'dti_bucket'), ('risk', 'risk_bucket'), ('fraud', 'fraud'), ('sentiment', 'sentiment_bucket')]
+
+PORTFOLIO_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS portfolio_clients (
+    client_id TEXT PRIMARY KEY, run_at TEXT, approval TEXT, fraud TEXT, dti_bucket TEXT, risk_bucket TEXT,
+    sentiment_bucket TEXT, dti_ratio REAL, sentiment_score REAL, approved INTEGER
+);
+CREATE TABLE IF NOT EXISTS portfolio_buckets (
+    dimension TEXT, bucket TEXT, clients INTEGER NOT NULL DEFAULT 0, approved INTEGER NOT NULL DEFAULT 0,
+    dti_sum REAL NOT NULL DEFAULT 0, dti_n INTEGER NOT NULL DEFAULT 0,
+    sentiment_sum REAL NOT NULL DEFAULT 0, sentiment_n INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimension, bucket)
+);
+CREATE TRIGGER IF NOT EXISTS trg_results_to_portfolio AFTER INSERT ON client_results
+WHEN NOT EXISTS (SELECT 1 FROM portfolio_clients WHERE client_id = NEW.client_id AND run_at > NEW.run_at)
+BEGIN
+    DELETE FROM portfolio_clients WHERE client_id = NEW.client_id;
+    INSERT INTO portfolio_clients VALUES ({_portfolio_row('NEW')});
+END;
+CREATE TRIGGER IF NOT EXISTS trg_portfolio_add AFTER INSERT ON portfolio_clients
+BEGIN
+    INSERT INTO portfolio_buckets VALUES {', '.join(
+        f"('{dimension}', NEW.{column}, 1, NEW.approved, COALESCE(NEW.dti_ratio, 0), NEW.dti_ratio IS NOT NULL, "
+        f"COALESCE(NEW.sentiment_score, 0), NEW.sentiment_score IS NOT NULL)"
+        for dimension, column in _BUCKET_KEYS)}
+    ON CONFLICT (dimension, bucket) DO UPDATE SET
+        clients = clients + excluded.clients, approved = approved + excluded.approved,
+        dti_sum = dti_sum + excluded.dti_sum, dti_n = dti_n + excluded.dti_n,
+        sentiment_sum = sentiment_sum + excluded.sentiment_sum, sentiment_n = sentiment_n + excluded.sentiment_n;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_portfolio_remove AFTER DELETE ON portfolio_clients
+BEGIN
+    UPDATE portfolio_buckets SET
+        clients = clients - 1, approved = approved - OLD.approved,
+        dti_sum = dti_sum - COALESCE(OLD.dti_ratio, 0), dti_n = dti_n - (OLD.dti_ratio IS NOT NULL),
+        sentiment_sum = sentiment_sum - COALESCE(OLD.sentiment_score, 0), sentiment_n = sentiment_n - (OLD.sentiment_score IS NOT NULL)
+    WHERE {' OR '.join(f"(dimension = '{dimension}' AND bucket = OLD.{column})" for dimension, column in _BUCKET_KEYS)};
+END;
+"""
+
+# --- Connection ---
+
+def connect(path: str = RESULTS_DB_PATH) -> sqlite3.Connection:
+    """Opens the results database in WAL mode so concurrent runs can write without clobbering each other."""
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.executescript(SCHEMA)
+    conn.executescript(PORTFOLIO_SCHEMA)
+    return conn
+
+def _rows(frame: pd.DataFrame, columns: List[str], run_id: int, run_at: str) -> List[tuple]:
+    """Frame -> list of plain-Python tuples prefixed with the run keys, ready for executemany."""
+    subset = frame.reindex(columns=columns)
+    if 'date' in subset and pd.api.types.is_datetime64_any_dtype(subset['date']):
+        subset = subset.assign(date=subset['date'].dt.strftime('%Y-%m-%d'))
+    subset = subset.astype(object).where(subset.notna(), None)
+    return [(run_id, run_at, *row) for row in subset.itertuples(index=False, name=None)]
+
+def client_results_frame(analysis_results: Dict[str, Any]) -> pd.DataFrame:
+    """One client_results row from a step_2_analyze result dict (before its frames are dropped)."""
+    client_data = analysis_results['client_data']
+    row = {column: analysis_results.get(column) for column in RESULT_COLUMNS}
+    for column in ('client_id', 'first_name', 'last_name', 'sentiment_score'):
+        row[column] = client_data.get(column)
+    return pd.DataFrame([row], columns=RESULT_COLUMNS)
+
+# --- Results Database ---
+
+class ResultsDB:
+    """Embedded SQLite persistence for pipeline and batch-job outputs, plus the dashboard query API."""
+
+    def __init__(self, path: str = RESULTS_DB_PATH):
+        self.path = path
+        self.conn = connect(path)
+        # Databases created before the summary tables existed get them backfilled once
+        if self.conn.execute("SELECT NOT EXISTS (SELECT 1 FROM portfolio_clients) AND EXISTS (SELECT 1 FROM client_results)").fetchone()[0]:
+            self.rebuild_portfolio()
+        # Triggers created with other bucket edges are replaced and the summaries recomputed
+        trigger_sql = self.conn.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_results_to_portfolio'").fetchone()[0]
+        if _portfolio_row('NEW') not in trigger_sql:
+            with self.conn:
+                for trigger in ('trg_results_to_portfolio', 'trg_portfolio_add', 'trg_portfolio_remove'):
+                    self.conn.execute(f"DROP TRIGGER {trigger}")
+            self.conn.executescript(PORTFOLIO_SCHEMA)
+            self.rebuild_portfolio()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # --- Writes (one transaction per run) ---
+
+    def record_run(self, source: str, file_names: Iterable[str], df_info: Optional[pd.DataFrame] = None,
+                   df_trans: Optional[pd.DataFrame] = None, client_results: Optional[pd.DataFrame] = None,
+                   stress_results: Optional[pd.DataFrame] = None, stage_timings: Optional[Dict[str, float]] = None) -> int:
+        """Writes everything a run produced in a single transaction with bulk inserts; returns the run_id."""
+        run_at = datetime.now().isoformat(timespec='milliseconds')
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO runs (run_at, source, file_names, stage_timings) VALUES (?, ?, ?, ?)",
+                (run_at, source, json.dumps([os.path.basename(name) for name in file_names]), json.dumps(stage_timings or {}))
+            )
+            run_id = cursor.lastrowid
+            tables = [
+                ('client_profiles', PROFILE_COLUMNS, df_info),
+                ('transactions', TRANSACTION_COLUMNS, df_trans),
+                ('client_results', RESULT_COLUMNS, client_results),
+                ('stress_results', STRESS_COLUMNS, stress_results),
+            ]
+            for table, columns, frame in tables:
+                if frame is not None and not frame.empty:
+                    placeholders = ','.join('?' * (len(columns) + 2))
+                    self.conn.executemany(
+                        f"INSERT INTO {table} (run_id, run_at, {', '.join(columns)}) VALUES ({placeholders})",
+                        _rows(frame, columns, run_id, run_at)
+                    )
+        return run_id
+
+    # --- Query API ---
+
+    def query(self, sql: str, params: tuple = ()) -> pd.DataFrame:
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def latest_client_results(self, limit: int = 500) -> pd.DataFrame:
+        """Most recent assessment per client."""
+        return self.query(
+            """SELECT r.* FROM client_results r
+               JOIN (SELECT client_id, MAX(run_at) AS run_at FROM client_results GROUP BY client_id) latest
+                 ON latest.client_id = r.client_id AND latest.run_at = r.run_at
+               ORDER BY r.run_at DESC LIMIT ?""",
+            (limit,)
+        )
+
+    def client_history(self, client_id: str) -> pd.DataFrame:
+        return self.query("SELECT * FROM client_results WHERE client_id = ? ORDER BY run_at", (str(client_id),))
+
+    def client_transactions(self, client_id: str, start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+        """Transactions from the client's latest run, optionally bounded by ISO dates (inclusive)."""
+        frame = self.query(
+            """SELECT client_id, date, description, type, amount, balance FROM transactions
+               WHERE client_id = ? AND date >= ? AND date <= ?
+                 AND run_id = (SELECT MAX(run_id) FROM transactions WHERE client_id = ?)
+               ORDER BY date""",
+            (str(client_id), start or '0000-00-00', end or '9999-99-99', str(client_id))
+        )
+        frame['date'] = pd.to_datetime(frame['date'], errors='coerce')
+        return frame
+
+    def latest_client_profiles(self) -> pd.DataFrame:
+        """Most recently extracted profile per client."""
+        return self.query(
+            f"""SELECT p.{', p.'.join(PROFILE_COLUMNS)} FROM client_profiles p
+               JOIN (SELECT client_id, MAX(run_id) AS run_id FROM client_profiles GROUP BY client_id) latest
+                 ON latest.client_id = p.client_id AND latest.run_id = p.run_id"""
+        )
+
+    def latest_transactions(self) -> pd.DataFrame:
+        """Every client's transactions from their latest run, in statement order."""
+        frame = self.query(
+            """SELECT t.client_id, t.date, t.description, t.type, t.amount, t.balance FROM transactions t
+               JOIN (SELECT client_id, MAX(run_id) AS run_id FROM transactions GROUP BY client_id) latest
+                 ON latest.client_id = t.client_id AND latest.run_id = t.run_id
+               ORDER BY t.client_id, t.rowid"""
+        )
+        frame['date'] = pd.to_datetime(frame['date'], errors='coerce')
+        return frame
+
+    def recent_runs(self, limit: int = 50) -> pd.DataFrame:
+        return self.query("SELECT * FROM runs ORDER BY run_at DESC LIMIT ?", (limit,))
+
+    # --- Portfolio Summaries ---
+
+    def rebuild_portfolio(self) -> None:
+        """Recomputes the summary tables from scratch (latest result per client); triggers keep them current afterwards."""
+        with self.conn:
+            self.conn.execute("DELETE FROM portfolio_clients")
+            self.conn.execute("DELETE FROM portfolio_buckets")
+            self.conn.execute(
+                f"""INSERT INTO portfolio_clients
+                    SELECT {_portfolio_row('r')} FROM client_results r
+                    WHERE r.rowid = (SELECT latest.rowid FROM client_results latest WHERE latest.client_id = r.client_id
+                                     ORDER BY latest.run_at DESC, latest.rowid DESC LIMIT 1)"""
+            )
+
+    def portfolio_summary(self) -> Dict[str, Any]:
+        """
+        Portfolio-wide aggregates read from the pre-aggregated bucket table only:
+        headline totals plus one small frame per dimension (clients, approval
+        rate, mean DTI and mean sentiment per bucket) in display order.
+        """
+        buckets = self.query("SELECT * FROM portfolio_buckets WHERE clients > 0")
+        bucket_order = {
+            'approval': APPROVAL_ORDER,
+            'dti': [label for _, label in DTI_BUCKETS] + ['Unknown'],
+            'risk': [label for _, label in RISK_BUCKETS] + ['Unknown'],
+            'fraud': ['Low', 'Medium', 'High', 'N/A', 'Unknown'],
+            'sentiment': [label for _, label in SENTIMENT_BUCKETS] + ['Unknown'],
+        }
+
+        summary = {}
+        for dimension in PORTFOLIO_DIMENSIONS:
+            frame = buckets[buckets['dimension'] == dimension].set_index('bucket')
+            order = bucket_order[dimension] + sorted(set(frame.index) - set(bucket_order[dimension]))
+            frame = frame.reindex([bucket for bucket in order if bucket in frame.index])
+            summary[dimension] = pd.DataFrame({
+                'clients': frame['clients'],
+                'approval_rate': frame['approved'] / frame['clients'],
+                'mean_dti': frame['dti_sum'] / frame['dti_n'].where(frame['dti_n'] > 0),
+                'mean_sentiment': frame['sentiment_sum'] / frame['sentiment_n'].where(frame['sentiment_n'] > 0),
+            })
+
+        approval = buckets[buckets['dimension'] == 'approval']
+        clients = int(approval['clients'].sum())
+        dti_n, sentiment_n = approval['dti_n'].sum(), approval['sentiment_n'].sum()
+        summary['totals'] = {
+            'clients': clients,
+            'approved': int(approval['approved'].sum()),
+            'approval_rate': float(approval['approved'].sum() / clients) if clients else 0.0,
+            'mean_dti': float(approval['dti_sum'].sum() / dti_n) if dti_n else float('nan'),
+            'mean_sentiment': float(approval['sentiment_sum'].sum() / sentiment_n) if sentiment_n else float('nan'),
+        }
+        return summary
@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+from test_code.inference import NumpyModel
+from test_code.client_score import MODELS_DIR, CLIENT_SCORE_FEATURES, load_client_score_backend
+from test_code.text_tokenizer import MAX_LEN, load_vocabulary, pack_vocabulary, texts_to_padded
+
+# Every worker process used to load its own copy of the model weights, the
+# scaler arrays and the tokenizer's word_index. The parent now writes them
+# once as plain .npy files (on tmpfs when available) and every worker
+# memory-maps them read-only: the pages are shared between processes through
+# the page cache, and nothing is copied or unpickled on attach.
+
+# --- Configuration ---
+# Benchmark from the repository root:  python -m test_code.shared_models [n_workers]
+
+SENTIMENT_MODEL_PATH = os.path.join(MODELS_DIR, 'sentiment_regressor.npz')
+VOCAB_PATH = os.path.join(MODELS_DIR, 'sentiment_vocab.json')
+MANIFEST_FILE = 'manifest.json'
+SHARED_ROOT = '/dev/shm' if os.path.isdir('/dev/shm') else None  # None -> the system temp dir
+BENCHMARK_REFERENCE_ROWS = 2_000_000  # rows of the synthetic reference table in the RSS benchmark
+
+# --- Publishing (parent) ---
+
+def _model_arrays(path: str) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """(layer spec, weights) of an exported .npz model."""
+    with np.load(path, allow_pickle=False) as archive:
+        spec = json.loads(str(archive['__spec__']))
+        return spec, {name: archive[name] for name in archive.files if name != '__spec__'}
+
+def publish_arrays(arrays: Dict[str, np.ndarray], meta: Dict[str, Any], directory: Optional[str] = None) -> str:
+    """
+    Writes each array to its own .npy file plus a manifest holding `meta`
+    (anything JSON-serializable). Returns the directory workers attach to.
+    """
+    directory = directory or tempfile.mkdtemp(prefix='shared_models_', dir=SHARED_ROOT)
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    for name, array in arrays.items():
+        files[name] = name.replace('/', '__') + '.npy'
+        np.save(os.path.join(directory, files[name]), np.ascontiguousarray(array), allow_pickle=False)
+    with open(os.path.join(directory, MANIFEST_FILE + '.tmp'), 'w') as f:
+        json.dump({'arrays': files, 'meta': meta}, f)
+    os.replace(os.path.join(directory, MANIFEST_FILE + '.tmp'), os.path.join(directory, MANIFEST_FILE))
+    return directory
+
+def attach_arrays(directory: str) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """Read-only memory maps of every published array (zero copies) and the manifest's meta."""
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    arrays = {name: np.load(os.path.join(directory, filename), mmap_mode='r', allow_pickle=False)
+              for name, filename in manifest['arrays'].items()}
+    return arrays, manifest['meta']
+
+class SharedModels:
+    """Owns a published directory; removes it on close (use as a context manager around the pool)."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def close(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self) -> 'SharedModels':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+def publish_models(models_dir: Optional[str] = MODELS_DIR, sentiment_model_path: Optional[str] = SENTIMENT_MODEL_PATH,
+                   vocab_path: Optional[str] = VOCAB_PATH, reference: Optional[Dict[str, np.ndarray]] = None,
+                   directory: Optional[str] = None) -> SharedModels:
+    """
+    Loads the client-score network and scalers, the sentiment network and the
+    tokenizer vocabulary once in the parent and publishes them. `reference`
+    adds lookup tables under 'reference/<name>'. Pass None for `models_dir`,
+    `sentiment_model_path` or `vocab_path` to leave that resource out.
+    """
+    arrays, meta = {}, {}
+
+    if models_dir is not None:
+        model, scaler = load_client_score_backend(models_dir)
+        meta['client_score'] = {'layers': model.layers, 'input_shape': model.input_shape}
+        arrays.update({f'client_score/{name}': weight for name, weight in model.weights.items()})
+        arrays.update({f'client_score_scaler/{name}': values for name, values in scaler.items()})
+
+    if sentiment_model_path is not None:
+        spec, weights = _model_arrays(sentiment_model_path)
+        meta['sentiment'] = {'layers': spec['layers'], 'input_shape': spec['input_shape']}
+        arrays.update({f'sentiment/{name}': weight for name, weight in weights.items()})
+
+    if vocab_path is not None:
+        packed = pack_vocabulary(load_vocabulary(vocab_path))
+        meta['vocabulary'] = {key: value for key, value in packed.items() if key not in ('words', 'word_ids')}
+        arrays['vocabulary/words'], arrays['vocabulary/word_ids'] = packed['words'], packed['word_ids']
+
+    for name, table in (reference or {}).items():
+        arrays[f'reference/{name}'] = table
+    meta['reference'] = sorted(reference or {})
+
+    return SharedModels(publish_arrays(arrays, meta, directory))
+
+# --- Attaching (workers) ---
+
+_ATTACHED: Dict[str, Dict[str, Any]] = {}
+
+def _group(arrays: Dict[str, np.ndarray], prefix: str) -> Dict[str, np.ndarray]:
+    return {name[len(prefix) + 1:]: array for name, array in arrays.items() if name.startswith(prefix + '/')}
+
+def attach_models(directory: str) -> Dict[str, Any]:
+    """
+    The published resources in the form the loaders return them:
+    'client_score' -> (NumpyModel, scaler dict) like load_client_score_backend,
+    'sentiment' -> NumpyModel, 'vocabulary' -> packed vocabulary for
+    texts_to_padded, 'reference' -> {name: array}. All arrays are read-only
+    memory maps. Resources left out at publish time are absent. Attached once
+    per process.
+    """
+    if directory in _ATTACHED:
+        return _ATTACHED[directory]
+    arrays, meta = attach_arrays(directory)
+
+    resources = {'reference': _group(arrays, 'reference')}
+    if 'client_score' in meta:
+        spec = meta['client_score']
+        resources['client_score'] = (NumpyModel(spec['layers'], _group(arrays, 'client_score'), spec['input_shape']),
+                                     _group(arrays, 'client_score_scaler'))
+    if 'sentiment' in meta:
+        spec = meta['sentiment']
+        resources['sentiment'] = NumpyModel(spec['layers'], _group(arrays, 'sentiment'), spec['input_shape'])
+    if 'vocabulary' in meta:
+        resources['vocabulary'] = dict(meta['vocabulary'], words=arrays['vocabulary/words'],
+                                       word_ids=arrays['vocabulary/word_ids'])
+    _ATTACHED[directory] = resources
+    return resources
+
+# --- Memory Accounting ---
+
+def process_memory_mb() -> Dict[str, float]:
+    """
+    This process's resident memory from /proc (Linux): `rss` counts shared
+    pages in full, `pss` splits them between the processes mapping them, and
+    `private` is what the process alone holds. NaN where /proc is unavailable.
+    """
+    fields = {'Rss': 'rss', 'Pss': 'pss', 'Private_Clean': 'private', 'Private_Dirty': 'private'}
+    memory = {'rss': 0.0, 'pss': 0.0, 'private': 0.0}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in fields:
+                    memory[fields[key]] += int(value.split()[0]) / 1024
+    except OSError:
+        return {key: float('nan') for key in memory}
+    return memory
+
+# --- Benchmark ---
+
+_WORKER_RESOURCES: Dict[str, Any] = {}
+
+def _init_private_worker(models_dir: str, reference_path: Optional[str]) -> None:
+    """The unshared baseline: every worker loads its own copies with the regular loaders."""
+    _WORKER_RESOURCES.update(
+        client_score=load_client_score_backend(models_dir),
+        sentiment=NumpyModel.load(SENTIMENT_MODEL_PATH),
+        vocabulary=load_vocabulary(VOCAB_PATH),
+        reference={'applicants': np.load(reference_path)} if reference_path else {},
+    )
+
+def _init_shared_worker(directory: str) -> None:
+    _WORKER_RESOURCES.update(attach_models(directory))
+
+def _measure_worker(texts: List[str], hold_seconds: float) -> Dict[str, Any]:
+    """Uses every resource once (so its pages are resident), then reports this worker's memory."""
+    model, scaler = _WORKER_RESOURCES['client_score']
+    features = np.ones((len(texts), len(CLIENT_SCORE_FEATURES)), dtype=np.float32)
+    model.predict((features - scaler['x_mean']) / scaler['x_scale'])
+    sentiment = _WORKER_RESOURCES['sentiment']
+    sentiment.predict(np.zeros((len(texts), sentiment.input_shape[-1]), dtype=np.float32))
+    texts_to_padded(texts, _WORKER_RESOURCES['vocabulary'], MAX_LEN)
+    checksum = sum(float(table.sum()) for table in _WORKER_RESOURCES['reference'].values())
+    time.sleep(hold_seconds)  # keeps this worker busy so each task lands on a different process
+    return dict(process_memory_mb(), pid=os.getpid(), checksum=checksum)
+
+def benchmark_worker_memory(n_workers: int = 4, reference_rows: int = BENCHMARK_REFERENCE_ROWS) -> Dict[str, Dict[str, float]]:
+    """
+    Mean per-worker and summed rss/pss/private MB for `n_workers` spawned
+    workers holding the models, vocabulary and a (rows x 4) float32 reference
+    table — each loading its own copies vs. attaching to one published set.
+    """
+    import multiprocessing
+
+    texts = ["Payroll deposit from employer", "Casino withdrawal", "Utility bill payment", "great salary bonus"] * 16
+    reference = {'applicants': np.random.default_rng(0).standard_normal((reference_rows, 4)).astype(np.float32)}
+    context = multiprocessing.get_context('spawn')
+    report = {}
+    with publish_models(reference=reference) as shared:
+        reference_path = os.path.join(shared.directory, 'reference__applicants.npy')
+        for mode, initializer, initargs in (('private', _init_private_worker, (MODELS_DIR, reference_path)),
+                                            ('shared', _init_shared_worker, (shared.directory,))):
+            with ProcessPoolExecutor(max_workers=n_workers, mp_context=context,
+                                     initializer=initializer, initargs=initargs) as pool:
+                samples = list(pool.map(_measure_worker, [texts] * n_workers, [1.0] * n_workers))
+            by_pid = {sample['pid']: sample for sample in samples}
+            report[mode] = {'workers': len(by_pid)}
+            for key in ('rss', 'pss', 'private'):
+                values = [sample[key] for sample in by_pid.values()]
+                report[mode][f'{key}_mb'] = float(np.mean(values))
+                report[mode][f'total_{key}_mb'] = float(np.sum(values))
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    print(f"--- Per-Worker Memory, {workers} workers (models + vocabulary + {BENCHMARK_REFERENCE_ROWS:,}x4 reference table) ---")
+    results = benchmark_worker_memory(workers)
+    print(f"{'':10} {'workers':>8} {'RSS MB':>9} {'PSS MB':>9} {'private MB':>11} {'total PSS MB':>13}")
+    for mode, row in results.items():
+        print(f"{mode:10} {row['workers']:>8} {row['rss_mb']:>9.1f} {row['pss_mb']:>9.1f} {row['private_mb']:>11.1f} {row['total_pss_mb']:>13.1f}")
@@ -0,0 +1,352 @@
+import os
+import io
+import json
+import time
+import pickle
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    from sklearn.neighbors import KDTree
+except ImportError:  # sklearn is optional: queries fall back to a blocked brute-force scan of the memmap
+    KDTree = None
+
+# --- Configuration ---
+# Build / update from the repository root:  python -m test_code.similar_applicants --build [--full]
+# Benchmark:                                python -m test_code.similar_applicants --benchmark
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'databases')
+LENDING_CLUB_PATH = os.path.join(DATA_DIR, 'LC_loans_granting_model_dataset.csv')
+SIMILAR_INDEX_DIR = os.path.join('output', 'similar_applicants')
+CHUNK_ROWS = 100_000
+DEFAULT_K = 10
+SCAN_BLOCK_ROWS = 262_144       # rows per block in the brute-force scan
+TREE_LEAF_SIZE = 40
+DELTA_REBUILD_FRACTION = 0.10   # rebuild the tree once appended rows exceed this share of the indexed rows
+
+FEATURES = ['annual_income', 'dti_ratio', 'credit_score', 'loan_amount']
+LOG_FEATURES = {'annual_income', 'loan_amount'}  # right-skewed money columns are compared on a log scale
+# (column, multiplier) per feature, first match wins; LendingClub reports DTI in percent
+FEATURE_ALIASES = {
+    'annual_income': [('annual_income', 1.0), ('annual_inc', 1.0), ('revenue', 1.0)],
+    'dti_ratio': [('dti_ratio', 1.0), ('dti', 0.01), ('dti_n', 0.01)],
+    'credit_score': [('credit_score', 1.0), ('fico_n', 1.0), ('fico_range_low', 1.0)],
+    'loan_amount': [('loan_amount_requested', 1.0), ('loan_amnt', 1.0)],
+}
+OUTCOME_COLUMNS = ['Default', 'loan_status']
+BAD_LOAN_STATUSES = {'Charged Off', 'Default', 'Does not meet the credit policy. Status:Charged Off'}
+OUTCOME_LABELS = {-1: 'Unknown', 0: 'Repaid', 1: 'Defaulted'}
+
+# --- Source Parsing ---
+
+def _source_columns(header: List[str]) -> Tuple[Dict[str, Tuple[str, float]], Optional[str]]:
+    present = set(header)
+    mapping = {}
+    for feature, aliases in FEATURE_ALIASES.items():
+        match = next(((column, factor) for column, factor in aliases if column in present), None)
+        if match is None:
+            raise ValueError(f"No column for '{feature}' (tried {', '.join(c for c, _ in aliases)}) in {sorted(present)}")
+        mapping[feature] = match
+    return mapping, next((c for c in OUTCOME_COLUMNS if c in present), None)
+
+def _chunk_rows(chunk: pd.DataFrame, mapping: Dict[str, Tuple[str, float]], outcome_column: Optional[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Raw feature rows (float32) and outcomes (int8: -1 unknown, 0 repaid, 1 defaulted); incomplete rows are dropped."""
+    raw = np.column_stack([
+        pd.to_numeric(chunk[column], errors='coerce').to_numpy(dtype=np.float64) * factor
+        for column, factor in (mapping[feature] for feature in FEATURES)
+    ]).astype(np.float32)
+    if outcome_column is None:
+        outcome = np.full(len(chunk), -1, dtype=np.int8)
+    elif outcome_column == 'loan_status':
+        status = chunk[outcome_column]
+        outcome = np.where(status.isna(), -1, status.isin(BAD_LOAN_STATUSES)).astype(np.int8)
+    else:
+        values = pd.to_numeric(chunk[outcome_column], errors='coerce')
+        outcome = values.fillna(-1).clip(-1, 1).to_numpy().astype(np.int8)
+    keep = np.isfinite(raw).all(axis=1)
+    return raw[keep], outcome[keep]
+
+def transform(raw: np.ndarray) -> np.ndarray:
+    """Feature space before standardization: log1p on money columns."""
+    values = np.asarray(raw, dtype=np.float64).copy()
+    for j, feature in enumerate(FEATURES):
+        if feature in LOG_FEATURES:
+            values[:, j] = np.log1p(np.clip(values[:, j], 0, None))
+    return values
+
+def _head_digest(path: str, n_bytes: int = 65_536) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read(n_bytes)).hexdigest()
+
+# --- Index Files ---
+# meta.json, raw.f32 (rows x 4), normalized.f32 (rows x 4), outcome.i1 (rows) and tree.pickle
+
+def _paths(index_dir: str) -> Dict[str, str]:
+    return {name: os.path.join(index_dir, name) for name in ('meta.json', 'raw.f32', 'normalized.f32', 'outcome.i1', 'tree.pickle')}
+
+def _read_meta(index_dir: str) -> Optional[Dict[str, Any]]:
+    path = _paths(index_dir)['meta.json']
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def _write_meta(index_dir: str, meta: Dict[str, Any]) -> None:
+    meta['updated_at'] = datetime.now().isoformat(timespec='seconds')
+    path = _paths(index_dir)['meta.json']
+    with open(path + '.tmp', 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(path + '.tmp', path)  # readers see the old or the new meta, never half of one
+
+def index_version(index_dir: str = SIMILAR_INDEX_DIR) -> Optional[str]:
+    """Changes whenever the index is rebuilt or extended (a cache key); None if there is no index."""
+    meta = _read_meta(index_dir)
+    return f"{meta['updated_at']}/{meta['rows']}" if meta else None
+
+def _append_source(source: str, index_dir: str, start_byte: int, header: Optional[List[str]],
+                   chunk_rows: int, stats=None) -> Tuple[int, int]:
+    """Appends the source rows from `start_byte` on to raw.f32 / outcome.i1; returns (rows added, end byte)."""
+    paths = _paths(index_dir)
+    end_byte = os.path.getsize(source)
+    added = 0
+    with open(source, 'rb') as f, open(paths['raw.f32'], 'ab') as raw_out, open(paths['outcome.i1'], 'ab') as outcome_out:
+        f.seek(start_byte)
+        reader = pd.read_csv(io.TextIOWrapper(f, encoding='utf-8', newline=''), chunksize=chunk_rows, low_memory=True,
+                             **({'header': None, 'names': header} if header else {}))
+        for chunk in reader:
+            mapping, outcome_column = _source_columns(list(chunk.columns))
+            raw, outcome = _chunk_rows(chunk, mapping, outcome_column)
+            raw_out.write(raw.tobytes())
+            outcome_out.write(outcome.tobytes())
+            if stats is not None:
+                stats.update(transform(raw))
+            added += len(raw)
+    return added, end_byte
+
+def _normalize_into(index_dir: str, meta: Dict[str, Any], start_row: int) -> None:
+    """Writes normalized.f32 rows [start_row, rows) from raw.f32, block by block."""
+    paths = _paths(index_dir)
+    rows, width = meta['rows'], len(FEATURES)
+    mean, std = np.array(meta['mean']), np.array(meta['std'])
+    raw = np.memmap(paths['raw.f32'], dtype=np.float32, mode='r', shape=(rows, width)) if rows else np.empty((0, width), np.float32)
+    with open(paths['normalized.f32'], 'ab' if start_row else 'wb') as f:
+        f.truncate(start_row * width * 4)
+        for lo in range(start_row, rows, SCAN_BLOCK_ROWS):
+            f.write(((transform(raw[lo:lo + SCAN_BLOCK_ROWS]) - mean) / std).astype(np.float32).tobytes())
+
+def _build_tree(index_dir: str, meta: Dict[str, Any]) -> None:
+    paths = _paths(index_dir)
+    meta['tree_rows'] = 0
+    if KDTree is None or meta['rows'] == 0:
+        if os.path.exists(paths['tree.pickle']):
+            os.remove(paths['tree.pickle'])
+        return
+    normalized = np.memmap(paths['normalized.f32'], dtype=np.float32, mode='r', shape=(meta['rows'], len(FEATURES)))
+    tree = KDTree(np.asarray(normalized, dtype=np.float64), leaf_size=TREE_LEAF_SIZE)
+    with open(paths['tree.pickle'] + '.tmp', 'wb') as f:
+        pickle.dump(tree, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(paths['tree.pickle'] + '.tmp', paths['tree.pickle'])
+    meta['tree_rows'] = meta['rows']
+
+# --- Build / Incremental Update ---
+
+def build_index(source: str = LENDING_CLUB_PATH, index_dir: str = SIMILAR_INDEX_DIR,
+                chunk_rows: int = CHUNK_ROWS) -> Dict[str, Any]:
+    """
+    Full build: streams the CSV once into raw.f32 / outcome.i1 while collecting
+    the standardization statistics, writes normalized.f32, then builds the
+    KD-tree. Only one chunk of the CSV is in memory at a time.
+    """
+    from test_code.models.train_client_score import StreamingStats
+
+    started = time.perf_counter()
+    if not os.path.exists(index_dir):
+        os.makedirs(index_dir)
+    paths = _paths(index_dir)
+    for name in ('raw.f32', 'outcome.i1'):
+        open(paths[name], 'wb').close()
+
+    header = list(pd.read_csv(source, nrows=0).columns)
+    _source_columns(header)  # fail before writing anything if the file lacks a feature
+    stats = StreamingStats(len(FEATURES))
+    rows, end_byte = _append_source(source, index_dir, 0, None, chunk_rows, stats)
+    meta = {
+        'source': os.path.abspath(source), 'source_head': _head_digest(source), 'source_bytes': end_byte,
+        'header': header, 'features': FEATURES, 'rows': rows,
+        'mean': stats.mean.tolist(), 'std': stats.std.tolist(),
+    }
+    _normalize_into(index_dir, meta, 0)
+    _build_tree(index_dir, meta)
+    meta['build_seconds'] = time.perf_counter() - started
+    _write_meta(index_dir, meta)
+    print(f"  -> Indexed {rows:,} applicants from {os.path.basename(source)} in {meta['build_seconds']:.1f}s")
+    return meta
+
+def update_index(source: str = LENDING_CLUB_PATH, index_dir: str = SIMILAR_INDEX_DIR,
+                 chunk_rows: int = CHUNK_ROWS) -> Dict[str, Any]:
+    """
+    Incremental rebuild. Rows appended to the source since the last build are
+    read from the stored byte offset on, normalized with the existing
+    statistics and appended to the memmaps; they are searched by brute force
+    until they exceed DELTA_REBUILD_FRACTION of the index, when the tree is
+    rebuilt. A rewritten or truncated source triggers a full build.
+    """
+    meta = _read_meta(index_dir)
+    if meta is None or meta.get('source') != os.path.abspath(source):
+        return build_index(source, index_dir, chunk_rows)
+    size = os.path.getsize(source)
+    if size < meta['source_bytes'] or _head_digest(source) != meta['source_head']:
+        print("  -> Source changed in place; rebuilding the index from scratch.")
+        return build_index(source, index_dir, chunk_rows)
+    if size == meta['source_bytes']:
+        print("  -> Index is up to date.")
+        return meta
+
+    started = time.perf_counter()
+    previous_rows = meta['rows']
+    added, meta['source_bytes'] = _append_source(source, index_dir, meta['source_bytes'], meta['header'], chunk_rows)
+    meta['rows'] = previous_rows + added
+    _normalize_into(index_dir, meta, previous_rows)
+    if meta['rows'] - meta.get('tree_rows', 0) > DELTA_REBUILD_FRACTION * max(meta.get('tree_rows', 0), 1):
+        _build_tree(index_dir, meta)
+    _write_meta(index_dir, meta)
+    print(f"  -> Appended {added:,} applicants in {time.perf_counter() - started:.2f}s "
+          f"({meta['rows'] - meta['tree_rows']:,} awaiting the next tree rebuild)")
+    return meta
+
+# --- Queries ---
+
+def _scan(matrix: np.ndarray, point: np.ndarray, k: int, offset: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact k-NN by blocked brute force; returns (distances, row ids)."""
+    best_d, best_i = np.empty(0), np.empty(0, dtype=np.int64)
+    for lo in range(0, len(matrix), SCAN_BLOCK_ROWS):
+        block = np.asarray(matrix[lo:lo + SCAN_BLOCK_ROWS], dtype=np.float64)
+        d2 = ((block - point) ** 2).sum(axis=1)
+        keep = np.argpartition(d2, k - 1)[:k] if len(d2) > k else np.arange(len(d2))
+        best_d = np.concatenate([best_d, d2[keep]])
+        best_i = np.concatenate([best_i, keep + lo + offset])
+        if len(best_d) > k:
+            top = np.argpartition(best_d, k - 1)[:k]
+            best_d, best_i = best_d[top], best_i[top]
+    return np.sqrt(best_d), best_i
+
+class SimilarApplicantIndex:
+    """Read-only view of a built index: memory-mapped matrices plus the KD-tree when available."""
+
+    def __init__(self, index_dir: str = SIMILAR_INDEX_DIR):
+        meta = _read_meta(index_dir)
+        if meta is None:
+            raise FileNotFoundError(f"No similar-applicant index in {index_dir}; build it with "
+                                    f"`python -m test_code.similar_applicants --build`.")
+        paths = _paths(index_dir)
+        shape = (meta['rows'], len(FEATURES))
+        self.meta = meta
+        self.mean, self.std = np.array(meta['mean']), np.array(meta['std'])
+        self.raw = np.memmap(paths['raw.f32'], dtype=np.float32, mode='r', shape=shape)
+        self.normalized = np.memmap(paths['normalized.f32'], dtype=np.float32, mode='r', shape=shape)
+        self.outcome = np.memmap(paths['outcome.i1'], dtype=np.int8, mode='r', shape=(meta['rows'],))
+        self.tree = None
+        self.tree_rows = 0
+        if KDTree is not None and os.path.exists(paths['tree.pickle']):
+            with open(paths['tree.pickle'], 'rb') as f:
+                self.tree = pickle.load(f)
+            self.tree_rows = meta.get('tree_rows', 0)
+        self.last_query_ms = None
+
+    def __len__(self) -> int:
+        return self.meta['rows']
+
+    def query(self, annual_income: float, dti_ratio: float, credit_score: float, loan_amount: float,
+              k: int = DEFAULT_K) -> pd.DataFrame:
+        """The k most similar historical applicants, nearest first, with how their loans performed."""
+        started = time.perf_counter()
+        k = min(k, len(self))
+        if k == 0:
+            return pd.DataFrame(columns=['distance', *FEATURES, 'outcome'])
+        point = ((transform(np.array([[annual_income, dti_ratio, credit_score, loan_amount]])) - self.mean) / self.std)[0]
+        if self.tree is not None and self.tree_rows:
+            distances, ids = self.tree.query(point[None, :], k=min(k, self.tree_rows))
+            distances, ids = distances[0], ids[0]
+        else:
+            distances, ids = np.empty(0), np.empty(0, dtype=np.int64)
+        if self.tree_rows < len(self):  # rows appended since the last tree build (all rows when there is no tree)
+            delta_d, delta_i = _scan(self.normalized[self.tree_rows:], point, min(k, len(self) - self.tree_rows), self.tree_rows)
+            distances, ids = np.concatenate([distances, delta_d]), np.concatenate([ids, delta_i])
+        order = np.argsort(distances, kind='stable')[:k]
+        distances, ids = distances[order], ids[order]
+
+        neighbors = pd.DataFrame(np.asarray(self.raw[ids]), columns=FEATURES)
+        neighbors.insert(0, 'distance', distances)
+        neighbors['outcome'] = [OUTCOME_LABELS[int(o)] for o in self.outcome[ids]]
+        self.last_query_ms = (time.perf_counter() - started) * 1000
+        return neighbors
+
+def summarize_neighbors(neighbors: pd.DataFrame) -> Dict[str, Any]:
+    known = neighbors[neighbors['outcome'] != 'Unknown']
+    return {
+        'k': len(neighbors),
+        'default_rate': float((known['outcome'] == 'Defaulted').mean()) if len(known) else float('nan'),
+        'median_income': float(neighbors['annual_income'].median()) if len(neighbors) else float('nan'),
+        'median_loan_amount': float(neighbors['loan_amount'].median()) if len(neighbors) else float('nan'),
+    }
+
+# --- Benchmark ---
+
+def _synthetic_source(path: str, n_rows: int, seed: int = 0) -> None:
+    rng = np.random.default_rng(seed)
+    pd.DataFrame({
+        'revenue': np.exp(rng.normal(11.2, 0.5, n_rows)).round(0),
+        'dti_n': rng.uniform(0, 40, n_rows).round(2),
+        'loan_amnt': np.exp(rng.normal(9.5, 0.6, n_rows)).round(-2),
+        'fico_n': rng.integers(600, 850, n_rows),
+        'Default': (rng.random(n_rows) < 0.2).astype(int),
+    }).to_csv(path, index=False)
+
+def benchmark_queries(n_rows: int = 1_000_000, n_queries: int = 200, k: int = DEFAULT_K) -> Dict[str, float]:
+    """Build time and mean ms/query on a synthetic LendingClub-shaped file: KD-tree vs. brute-force scan."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as workdir:
+        source = os.path.join(workdir, 'lc.csv')
+        _synthetic_source(source, n_rows)
+        meta = build_index(source, workdir)
+        index = SimilarApplicantIndex(workdir)
+        rng = np.random.default_rng(1)
+        queries = np.column_stack([rng.uniform(3e4, 2e5, n_queries), rng.uniform(0.0, 0.45, n_queries),
+                                   rng.integers(600, 850, n_queries), rng.uniform(5e3, 4e4, n_queries)])
+        timings = {'rows': n_rows, 'build_seconds': meta['build_seconds']}
+        for label in ('kd_tree_ms', 'brute_force_ms'):
+            if label == 'brute_force_ms':
+                index.tree, index.tree_rows = None, 0
+            elif index.tree is None:
+                continue
+            started = time.perf_counter()
+            for row in queries:
+                index.query(*row, k=k)
+            timings[label] = (time.perf_counter() - started) * 1000 / n_queries
+        del index
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Similar-applicant index over historical LendingClub outcomes.")
+    parser.add_argument('--build', action='store_true', help="Build the index, or extend it with rows appended to the source.")
+    parser.add_argument('--full', action='store_true', help="With --build: rebuild from scratch (recomputes the normalization).")
+    parser.add_argument('--source', default=LENDING_CLUB_PATH)
+    parser.add_argument('--benchmark', action='store_true', help="Query latency on a synthetic 1M-row index.")
+    args = parser.parse_args()
+
+    if args.build:
+        print("--- Similar-Applicant Index ---")
+        (build_index if args.full else update_index)(args.source)
+    if args.benchmark:
+        print("--- Similar-Applicant Query Latency (1,000,000 rows, k=10) ---")
+        timings = benchmark_queries()
+        print(f"Build: {timings['build_seconds']:.1f}s")
+        if 'kd_tree_ms' in timings:
+            print(f"KD-tree:     {timings['kd_tree_ms']:.3f} ms/query")
+        print(f"Brute force: {timings['brute_force_ms']:.2f} ms/query")
@@ -0,0 +1,176 @@
+import os
+import pickle
+import threading
+import time
+import pandas as pd
+import streamlit as st
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from test_code.feature_store import file_sha256
+from test_code.pipeline import extract_loan_data_to_dfs, render_monthly_chart, step_2_analyze
+from test_code.similar_applicants import SIMILAR_INDEX_DIR, SimilarApplicantIndex, index_version
+
+# Streamlit caching for the pipeline stages. The similar-applicant index lives
+# in st.cache_resource (one shared instance per server process; the
+# client-score model is already loaded once per process by
+# load_client_score_backend). Extracted frames, analysis results and chart
+# bytes live in st.cache_data, keyed on the SHA-256 of the uploaded files
+# rather than on the frames themselves. Arguments with a leading underscore
+# are not hashed by Streamlit: they are fully determined by the file digests
+# passed alongside them.
+
+# --- Configuration ---
+
+CACHE_TTL_SECONDS = 60 * 60
+EXTRACT_MAX_ENTRIES = 64
+ANALYSIS_MAX_ENTRIES = 128
+CHART_MAX_ENTRIES = 64
+
+# --- Hit/Miss Accounting ---
+
+_COMPUTE_SECONDS: Dict[Tuple[str, Any], float] = {}  # cost of the last miss per (stage, key)
+_ENTRY_BYTES: Dict[Tuple[str, Any], int] = {}
+_LAST_MISS = threading.local()
+
+def _record_miss(stage: str, key: Any, started: float, value: Any) -> None:
+    """Called from inside a cached body, i.e. only when Streamlit actually ran it."""
+    elapsed = time.perf_counter() - started
+    _COMPUTE_SECONDS[(stage, key)] = elapsed
+    _ENTRY_BYTES[(stage, key)] = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    _LAST_MISS.stage = stage
+
+def _session_stats() -> Dict[str, Dict[str, float]]:
+    return st.session_state.setdefault('cache_stats', {})
+
+def end_rerun() -> None:
+    """
+    Resets the per-rerun counters. Call it as the last line of the script:
+    widget callbacks run before the next rerun's script body, so resetting at
+    the top would wipe the hits they just made.
+    """
+    for stage_stats in _session_stats().values():
+        stage_stats['rerun_hits'] = 0
+        stage_stats['rerun_saved'] = 0.0
+
+def _tracked(stage: str, key: Any, cached_fn: Callable, *args) -> Any:
+    """Calls a cached function and books the call as a hit or a miss."""
+    _LAST_MISS.stage = None
+    started = time.perf_counter()
+    value = cached_fn(*args)
+    elapsed = time.perf_counter() - started
+
+    stats = _session_stats().setdefault(stage, {'hits': 0, 'misses': 0, 'rerun_hits': 0, 'rerun_saved': 0.0, 'total_saved': 0.0})
+    if _LAST_MISS.stage == stage:
+        stats['misses'] += 1
+    else:
+        saved = max(_COMPUTE_SECONDS.get((stage, key), 0.0) - elapsed, 0.0)
+        stats['hits'] += 1
+        stats['rerun_hits'] += 1
+        stats['rerun_saved'] += saved
+        stats['total_saved'] += saved
+    return value
+
+# --- Resources (one instance per server process) ---
+
+@st.cache_resource(show_spinner=False)
+def _cached_similar_index(version: str) -> SimilarApplicantIndex:
+    return SimilarApplicantIndex(SIMILAR_INDEX_DIR)
+
+def load_similar_index() -> Optional[SimilarApplicantIndex]:
+    """The memory-mapped similar-applicant index, reopened when it is rebuilt; None if it was never built."""
+    version = index_version(SIMILAR_INDEX_DIR)
+    return _cached_similar_index(version) if version else None
+
+# --- Data (keyed on file digests) ---
+
+class _Uncacheable(Exception):
+    """Carries a result out of a cached body without Streamlit storing it."""
+
+    def __init__(self, value: Any):
+        super().__init__()
+        self.value = value
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=EXTRACT_MAX_ENTRIES, show_spinner=False)
+def _cached_extract(digests: Tuple[str, ...], _file_paths: List[str], _on_page: Optional[Callable] = None,
+                    _compute: Optional[Callable] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    started = time.perf_counter()
+    usage = getattr(_compute, 'usage', [])
+    checked = len(usage)
+    frames = (_compute or extract_loan_data_to_dfs)(_file_paths, on_page=_on_page)
+    if any(plan['mode'] == 'rejected' for plan in usage[checked:]):
+        raise _Uncacheable(frames)  # over-budget documents are checked (and reported) again on every run
+    _record_miss('extract', digests, started, frames)
+    return frames
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=ANALYSIS_MAX_ENTRIES, show_spinner=False)
+def _cached_analyze(digests: Tuple[str, ...], interest_rate: float, term_months: int, lookback_months: Optional[int],
+                    monthly_history: Optional[pd.DataFrame], _df_info: pd.DataFrame, _df_trans: pd.DataFrame) -> Dict[str, Any]:
+    started = time.perf_counter()
+    results = step_2_analyze(_df_info, _df_trans, interest_rate, term_months, monthly_history, lookback_months)
+    _record_miss('analyze', (digests, interest_rate, term_months, lookback_months), started, results)
+    return results
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CHART_MAX_ENTRIES, show_spinner=False)
+def _cached_chart(digests: Tuple[str, ...], title: str, _transactions_df: pd.DataFrame) -> bytes:
+    started = time.perf_counter()
+    png = render_monthly_chart(_transactions_df, title)
+    _record_miss('render_chart', (digests, title), started, png)
+    return png
+
+def cached_stages(file_paths: List[str]) -> Dict[str, Callable]:
+    """
+    Drop-in replacements for pipeline.PIPELINE_STAGES for one assessment.
+    The uploaded files are hashed once here and the digests key every stage.
+    """
+    digest_by_path = {path: file_sha256(path) for path in file_paths}
+    all_digests = tuple(digest_by_path[path] for path in file_paths)
+
+    def extract(paths: List[str], on_page: Optional[Callable] = None, compute: Optional[Callable] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        # `compute` runs on a miss: the pipeline passes its BudgetedExtractor when a budget is set
+        digests = tuple(digest_by_path.get(path) or file_sha256(path) for path in paths)
+        try:
+            return _tracked('extract', digests, _cached_extract, digests, paths, on_page, compute)
+        except _Uncacheable as e:
+            return e.value
+
+    def analyze(df_info: pd.DataFrame, df_trans: pd.DataFrame, interest_rate: float, term_months: int,
+                monthly_history: Optional[pd.DataFrame] = None, lookback_months: Optional[int] = None) -> Dict[str, Any]:
+        key = (all_digests, interest_rate, term_months, lookback_months)
+        return _tracked('analyze', key, _cached_analyze, all_digests, interest_rate, term_months, lookback_months,
+                        monthly_history, df_info, df_trans)
+
+    def render_chart(transactions_df: pd.DataFrame, title: str) -> bytes:
+        # The title names the client and the chart window, so it completes the key
+        return _tracked('render_chart', (all_digests, title), _cached_chart, all_digests, title, transactions_df)
+
+    return {'extract': extract, 'analyze': analyze, 'render_chart': render_chart}
+
+# --- Debug Panel ---
+
+def cache_stats_frame() -> pd.DataFrame:
+    """Hits, misses, stored bytes and time saved per stage for this session."""
+    rows = []
+    for stage, stats in _session_stats().items():
+        stored = sum(size for (entry_stage, _), size in _ENTRY_BYTES.items() if entry_stage == stage)
+        rows.append({
+            'stage': stage, 'hits': stats['hits'], 'misses': stats['misses'],
+            'hits_this_rerun': stats['rerun_hits'], 'cached_kb': stored / 1024,
+            'saved_this_rerun_ms': stats['rerun_saved'] * 1000, 'saved_total_ms': stats['total_saved'] * 1000,
+        })
+    return pd.DataFrame(rows, columns=['stage', 'hits', 'misses', 'hits_this_rerun', 'cached_kb', 'saved_this_rerun_ms', 'saved_total_ms'])
+
+def render_cache_debug_panel() -> None:
+    with st.expander("Cache Debug"):
+        stats = cache_stats_frame()
+        if stats.empty:
+            st.caption("No cached stages have been called in this session yet.")
+        else:
+            st.dataframe(stats.set_index('stage').round(1), use_container_width=True)
+        st.caption(f"Data TTL {CACHE_TTL_SECONDS // 60} min; max entries extract/analysis/chart = "
+                   f"{EXTRACT_MAX_ENTRIES}/{ANALYSIS_MAX_ENTRIES}/{CHART_MAX_ENTRIES}. PID {os.getpid()}.")
+        if st.button("Clear caches", key="btn_clear_cache"):
+            st.cache_data.clear()
+            st.cache_resource.clear()
+            _COMPUTE_SECONDS.clear()
+            _ENTRY_BYTES.clear()
+            st.session_state.pop('cache_stats', None)
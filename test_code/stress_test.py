@@ -0,0 +1,153 @@
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional
+from test_code.results_db import ResultsDB
+
+# --- Configuration ---
+# Benchmark from the repository root:  python -m test_code.stress_test
+
+DEFAULT_N_PATHS = 5000
+DEFAULT_HORIZON_MONTHS = 12
+DEFAULT_SEED = 42
+INCOME_SHOCK_PROB = 0.10     # Chance in any month that income drops
+INCOME_SHOCK_SIZE = 0.50     # Fraction of that month's credits lost
+PAYMENT_SHOCK_PROB = 0.05    # Chance in any month of an unexpected expense
+PAYMENT_SHOCK_SIZE = 1.00    # Extra expense as a multiple of the average monthly debit
+SHORTFALL_ALPHA = 0.05       # Tail used for expected shortfall
+
+# --- Monthly History ---
+
+def monthly_cash_flows(df_transactions: pd.DataFrame) -> pd.DataFrame:
+    """Aggregates parsed transactions into monthly credit/debit totals per client."""
+    if df_transactions.empty:
+        return pd.DataFrame(columns=['client_id', 'month', 'CREDIT', 'DEBIT'])
+    month = df_transactions['date'].dt.to_period('M')
+    flows = (
+        df_transactions.groupby(['client_id', month, 'type'])['amount'].sum()
+        .unstack(fill_value=0.0)
+        .reindex(columns=['CREDIT', 'DEBIT'], fill_value=0.0)
+    )
+    flows.index = flows.index.set_names(['client_id', 'month'])
+    return flows.reset_index()
+
+def closing_balances(df_transactions: pd.DataFrame) -> pd.Series:
+    """Last reported running balance per client, used as the simulation start point."""
+    if df_transactions.empty:
+        return pd.Series(dtype=float)
+    ordered = df_transactions.sort_values('date', kind='stable')
+    return ordered.groupby('client_id')['balance'].last()
+
+# --- Simulation ---
+
+def simulate_balance_paths(credits: np.ndarray, debits: np.ndarray, opening_balance: float,
+                           n_paths: int = DEFAULT_N_PATHS, horizon_months: int = DEFAULT_HORIZON_MONTHS,
+                           seed: Any = DEFAULT_SEED) -> np.ndarray:
+    """
+    Bootstraps whole historical months (keeping each month's credit/debit pair
+    together), applies random income and payment shocks, and returns an
+    (n_paths, horizon_months) array of simulated month-end balances.
+    """
+    credits = np.asarray(credits, dtype=float)
+    debits = np.asarray(debits, dtype=float)
+    rng = np.random.default_rng(seed)
+
+    picks = rng.integers(0, len(credits), size=(n_paths, horizon_months))
+    sim_credits = credits[picks]
+    sim_debits = debits[picks]
+
+    income_shock = rng.random((n_paths, horizon_months)) < INCOME_SHOCK_PROB
+    sim_credits *= np.where(income_shock, 1.0 - INCOME_SHOCK_SIZE, 1.0)
+    payment_shock = rng.random((n_paths, horizon_months)) < PAYMENT_SHOCK_PROB
+    sim_debits += payment_shock * (PAYMENT_SHOCK_SIZE * debits.mean())
+
+    return opening_balance + np.cumsum(sim_credits - sim_debits, axis=1)
+
+def summarize_paths(paths: np.ndarray, alpha: float = SHORTFALL_ALPHA) -> Dict[str, float]:
+    """Probability of ever going negative plus expected shortfall of the worst `alpha` tail."""
+    lowest = paths.min(axis=1)
+    cutoff = max(1, int(np.ceil(alpha * len(lowest))))
+    tail = np.partition(lowest, cutoff - 1)[:cutoff]
+    return {
+        'prob_negative_balance': float((lowest < 0).mean()),
+        'expected_shortfall': float(-np.minimum(tail, 0.0).mean()),
+        'median_ending_balance': float(np.median(paths[:, -1])),
+        'worst_balance': float(lowest.min()),
+    }
+
+def stress_test_client(credits: np.ndarray, debits: np.ndarray, opening_balance: float,
+                       n_paths: int = DEFAULT_N_PATHS, horizon_months: int = DEFAULT_HORIZON_MONTHS,
+                       seed: Any = DEFAULT_SEED) -> Dict[str, float]:
+    """Runs the simulation for one client and returns its risk summary."""
+    if len(credits) == 0:
+        return {'prob_negative_balance': float('nan'), 'expected_shortfall': float('nan'),
+                'median_ending_balance': float('nan'), 'worst_balance': float('nan')}
+    paths = simulate_balance_paths(credits, debits, opening_balance, n_paths, horizon_months, seed)
+    return summarize_paths(paths)
+
+def _stress_test_worker(task: tuple) -> Dict[str, Any]:
+    """Process-pool entry point; must stay at module level so it can be pickled."""
+    client_id, credits, debits, opening_balance, n_paths, horizon_months, seed = task
+    summary = stress_test_client(credits, debits, opening_balance, n_paths, horizon_months, seed)
+    summary['client_id'] = client_id
+    return summary
+
+def stress_test_portfolio(df_transactions: pd.DataFrame, n_paths: int = DEFAULT_N_PATHS,
+                          horizon_months: int = DEFAULT_HORIZON_MONTHS, seed: int = DEFAULT_SEED,
+                          n_workers: Optional[int] = None, results_db_path: Optional[str] = None) -> pd.DataFrame:
+    """
+    Stress-tests every client in a transaction frame. Each client gets its own
+    child seed spawned from `seed`, so results are identical whatever the worker
+    count. `n_workers=1` runs in-process; anything else uses a process pool.
+    With `results_db_path` the portfolio results are also written to the results database.
+    """
+    flows = monthly_cash_flows(df_transactions)
+    balances = closing_balances(df_transactions)
+    client_ids = list(balances.index)
+    child_seeds = np.random.SeedSequence(seed).spawn(len(client_ids))
+
+    histories = {client_id: history for client_id, history in flows.groupby('client_id')}
+    no_history = np.empty(0)  # every date missing: the client gets NaN results, as in stress_test_client
+    tasks = []
+    for client_id, child_seed in zip(client_ids, child_seeds):
+        history = histories.get(client_id)
+        credits, debits = (no_history, no_history) if history is None else (history['CREDIT'].values, history['DEBIT'].values)
+        tasks.append((client_id, credits, debits, float(balances[client_id]), n_paths, horizon_months, child_seed))
+
+    if n_workers == 1 or len(tasks) <= 1:
+        results = [_stress_test_worker(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            results = list(pool.map(_stress_test_worker, tasks, chunksize=max(1, len(tasks) // 32)))
+
+    columns = ['client_id', 'prob_negative_balance', 'expected_shortfall', 'median_ending_balance', 'worst_balance']
+    portfolio = pd.DataFrame(results, columns=columns)
+    if results_db_path:
+        results_db = ResultsDB(results_db_path)
+        try:
+            results_db.record_run('stress_test', [], stress_results=portfolio)
+        finally:
+            results_db.close()
+    return portfolio
+
+# --- Benchmark ---
+
+def benchmark_paths_per_sec(n_paths: int = 100_000, horizon_months: int = DEFAULT_HORIZON_MONTHS,
+                            history_months: int = 12, repeats: int = 5) -> float:
+    """Times the vectorized simulator on a synthetic history and returns paths/sec."""
+    rng = np.random.default_rng(0)
+    credits = rng.uniform(3000, 6000, history_months)
+    debits = rng.uniform(2500, 5500, history_months)
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        simulate_balance_paths(credits, debits, 5000.0, n_paths, horizon_months, seed=0)
+        best = min(best, time.perf_counter() - start)
+    return n_paths / best
+
+
+if __name__ == "__main__":
+    print("--- Monte Carlo Stress Test Benchmark ---")
+    for paths in (1_000, 10_000, 100_000):
+        print(f"{paths:>8,} paths x {DEFAULT_HORIZON_MONTHS} months: {benchmark_paths_per_sec(paths):,.0f} paths/sec")
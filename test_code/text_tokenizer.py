@@ -0,0 +1,157 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+from typing import Dict, Any, Iterable, List, Optional
+from test_code.inference import load_tokenizer_state
+
+# --- Configuration ---
+# Benchmark from the repository root:  python -m test_code.text_tokenizer
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+TOKENIZER_PATH = os.path.join(MODELS_DIR, 'sentiment_analysis_tokenizer.pickle')
+MAX_LEN = 40
+
+# --- Vocabulary ---
+
+@lru_cache(maxsize=None)
+def load_vocabulary(path: str = TOKENIZER_PATH) -> Dict[str, Any]:
+    """
+    Loads a tokenizer's settings and word_index once per process, from either
+    the pickled Keras Tokenizer or the JSON export, and precomputes the
+    translation table used to strip filter characters.
+    """
+    state = load_tokenizer_state(path)
+    state['translate_table'] = str.maketrans({char: state['split'] for char in state['filters']})
+    state['oov_index'] = state['word_index'].get(state['oov_token']) if state.get('oov_token') else None
+    return state
+
+def pack_vocabulary(vocab: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The same vocabulary as two flat arrays (sorted words, their indices) plus
+    the scalar settings, so it can live in a file every worker memory-maps
+    instead of a per-process dict. `texts_to_padded` accepts either form.
+    """
+    words = sorted(vocab['word_index'])
+    packed = {key: vocab[key] for key in ('filters', 'lower', 'split', 'num_words', 'oov_token', 'oov_index')}
+    packed['words'] = np.array(words, dtype=str)
+    packed['word_ids'] = np.array([vocab['word_index'][word] for word in words], dtype=np.int32)
+    return packed
+
+# --- Tokenization ---
+
+def tokenize_text(text: str, vocab: Dict[str, Any]) -> List[int]:
+    """Same rules as Keras `texts_to_sequences` for a single word-level string."""
+    if vocab['lower']:
+        text = text.lower()
+    words = text.translate(vocab['translate_table']).split(vocab['split'])
+    word_index, num_words, oov_index = vocab['word_index'], vocab['num_words'], vocab['oov_index']
+
+    sequence = []
+    for word in words:
+        if not word:
+            continue
+        index = word_index.get(word)
+        if index is not None and not (num_words and index >= num_words):
+            sequence.append(index)
+        elif oov_index is not None:
+            sequence.append(oov_index)
+    return sequence
+
+def _packed_rows(texts: Iterable[str], vocab: Dict[str, Any], max_len: int) -> np.ndarray:
+    """tokenize_text for every text at once against a packed vocabulary: one searchsorted over all words."""
+    table = vocab.get('translate_table') or str.maketrans({char: vocab['split'] for char in vocab['filters']})
+    split_texts = [[word for word in (text.lower() if vocab['lower'] else text).translate(table).split(vocab['split']) if word]
+                   for text in texts]
+    lengths = np.fromiter(map(len, split_texts), dtype=np.int64, count=len(split_texts))
+    rows = np.zeros((len(split_texts), max_len), dtype=np.int32)
+    if not lengths.sum():
+        return rows
+
+    flat = np.array([word for words in split_texts for word in words], dtype=str)
+    words, word_ids = vocab['words'], vocab['word_ids']
+    positions = np.minimum(np.searchsorted(words, flat), len(words) - 1)
+    ids = np.where(words[positions] == flat, word_ids[positions], -1)
+    if vocab['num_words']:
+        ids[ids >= vocab['num_words']] = -1
+    if vocab['oov_index'] is not None:
+        ids[ids < 0] = vocab['oov_index']
+
+    row_of = np.repeat(np.arange(len(split_texts)), lengths)
+    keep = ids >= 0
+    ids, row_of = ids[keep], row_of[keep]
+    kept_per_row = np.bincount(row_of, minlength=len(split_texts))
+    column = np.arange(len(ids)) - np.repeat(np.cumsum(kept_per_row) - kept_per_row, kept_per_row)
+    fits = column < max_len
+    rows[row_of[fits], column[fits]] = ids[fits]
+    return rows
+
+def texts_to_padded(texts: Iterable[str], vocab: Optional[Dict[str, Any]] = None, max_len: int = MAX_LEN,
+                    out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Tokenizes a whole column into an (n, max_len) int32 array with post padding
+    and post truncation, matching `pad_sequences(..., padding='post',
+    truncating='post')`. Each distinct string is tokenized once and the rows are
+    then gathered straight into `out` (preallocated here if not supplied).
+    `vocab` may be the dict from load_vocabulary or a pack_vocabulary result.
+    """
+    vocab = vocab or load_vocabulary()
+    codes, uniques = pd.factorize(pd.Series(texts, dtype=object).astype(str), sort=False)
+
+    if 'words' in vocab:
+        unique_rows = _packed_rows(uniques, vocab, max_len)
+    else:
+        unique_rows = np.zeros((len(uniques), max_len), dtype=np.int32)
+        for row, text in enumerate(uniques):
+            sequence = tokenize_text(text, vocab)[:max_len]
+            unique_rows[row, :len(sequence)] = sequence
+
+    if out is None:
+        out = np.empty((len(codes), max_len), dtype=np.int32)
+    np.take(unique_rows, codes, axis=0, out=out)
+    return out
+
+# --- Keras Parity & Benchmark ---
+
+def keras_reference(texts: List[str], path: str = TOKENIZER_PATH, max_len: int = MAX_LEN) -> np.ndarray:
+    """The original Keras path (needs Keras installed), kept for parity checks."""
+    import pickle
+    from keras.utils import pad_sequences
+
+    with open(path, 'rb') as f:
+        tokenizer = pickle.load(f)
+    sequences = tokenizer.texts_to_sequences([str(text) for text in texts])
+    return pad_sequences(sequences, maxlen=max_len, padding='post', truncating='post').astype(np.int32)
+
+def check_keras_parity(texts: List[str]) -> bool:
+    """True when the fast tokenizer reproduces Keras exactly on `texts`."""
+    return bool(np.array_equal(texts_to_padded(texts), keras_reference(texts)))
+
+def benchmark_throughput(texts: List[str], n_rows: int = 1_000_000) -> float:
+    """Descriptions/sec for tokenizing `n_rows` rows sampled from `texts`."""
+    column = pd.Series(texts, dtype=object).sample(n_rows, replace=True, random_state=0).tolist()
+    out = np.empty((n_rows, MAX_LEN), dtype=np.int32)
+    load_vocabulary()
+    start = time.perf_counter()
+    texts_to_padded(column, out=out)
+    return n_rows / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    import glob
+    from test_code.pipeline import extract_loan_data_to_dfs
+
+    _, sample_transactions = extract_loan_data_to_dfs(sorted(glob.glob('test_code/pdfs/Bank_Statement_*.pdf')))
+    sample_texts = sample_transactions['description'].tolist() + [
+        "In the third quarter of 2010 , net sales increased by 5.2 % to EUR 205.5 mn , and operating profit by 34.9 % to EUR 23.5 mn .",
+        "Company profits go down in 2024",
+        "great salary bonus",
+        "",
+    ]
+    print("--- Fast Tokenizer ---")
+    try:
+        print(f"Keras parity on {len(sample_texts)} sample descriptions: {'OK' if check_keras_parity(sample_texts) else 'MISMATCH'}")
+    except ImportError:
+        print("Keras not installed; skipping parity check.")
+    print(f"Throughput: {benchmark_throughput(sample_texts):,.0f} descriptions/sec (1,000,000 rows)")
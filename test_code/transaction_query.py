@@ -0,0 +1,209 @@
+import time
+import numpy as np
+import pandas as pd
+from typing import Iterable, List, Optional, Tuple
+
+# --- Configuration ---
+# Benchmark from the repository root:  python -m test_code.transaction_query
+
+TRANSACTION_COLUMNS = ['client_id', 'date', 'description', 'type', 'amount', 'balance']
+LOOKBACK_OPTIONS = [None, 3, 6, 12]  # months; None = full history
+
+# --- Filter ---
+
+class TransactionFilter:
+    """
+    Client / date-window / type restriction on transactions. Every source
+    (PDF extraction, the feature store, an in-memory TransactionIndex) applies
+    it before materializing rows. `start` and `end` are inclusive dates.
+    """
+
+    def __init__(self, client_ids: Optional[Iterable[str]] = None, start: Optional[pd.Timestamp] = None,
+                 end: Optional[pd.Timestamp] = None, types: Optional[Iterable[str]] = None,
+                 lookback_months: Optional[int] = None):
+        self.client_ids = tuple(sorted({str(c) for c in client_ids})) if client_ids is not None else None
+        self.start = pd.Timestamp(start).normalize() if start is not None else None
+        self.end = pd.Timestamp(end).normalize() if end is not None else None
+        self.types = tuple(sorted(set(types))) if types is not None else None
+        self.lookback_months = lookback_months
+        self._start_iso = self.start.strftime('%Y-%m-%d') if self.start is not None else None
+        self._end_iso = self.end.strftime('%Y-%m-%d') if self.end is not None else None
+
+    def __repr__(self) -> str:
+        return (f"TransactionFilter(client_ids={self.client_ids}, start={self._start_iso}, end={self._end_iso}, "
+                f"types={self.types}, lookback_months={self.lookback_months})")
+
+    def replace(self, **changes) -> 'TransactionFilter':
+        fields = {'client_ids': self.client_ids, 'start': self.start, 'end': self.end,
+                  'types': self.types, 'lookback_months': self.lookback_months}
+        fields.update(changes)
+        return TransactionFilter(**fields)
+
+    def resolve(self, latest_date: Optional[pd.Timestamp]) -> 'TransactionFilter':
+        """
+        Turns a relative lookback into a concrete window ending at `end`, or at
+        `latest_date` (the newest transaction in scope) when no end is set.
+        """
+        if self.lookback_months is None:
+            return self
+        end = self.end if self.end is not None else latest_date
+        if end is None or pd.isna(end):
+            return self.replace(lookback_months=None)
+        start = pd.Timestamp(end).normalize() - pd.DateOffset(months=self.lookback_months) + pd.Timedelta(days=1)
+        if self.start is not None:
+            start = max(start, self.start)
+        return self.replace(start=start, end=end, lookback_months=None)
+
+    def matches(self, client_id: str, date_iso: str, type_str: str) -> bool:
+        """Row check on raw parsed strings, used before any row is materialized."""
+        if self.client_ids is not None and str(client_id) not in self.client_ids:
+            return False
+        if self.types is not None and type_str not in self.types:
+            return False
+        if self._start_iso is not None and date_iso < self._start_iso:
+            return False
+        if self._end_iso is not None and date_iso > self._end_iso:
+            return False
+        return True
+
+    def to_sql(self, date_column: str = 'date') -> Tuple[str, List]:
+        """WHERE clause (without the keyword, '1=1' when unfiltered) and its parameters."""
+        clauses, params = [], []
+        if self.client_ids is not None:
+            clauses.append(f"client_id IN ({','.join('?' * len(self.client_ids))})")
+            params.extend(self.client_ids)
+        if self.types is not None:
+            clauses.append(f"type IN ({','.join('?' * len(self.types))})")
+            params.extend(self.types)
+        if self._start_iso is not None:
+            clauses.append(f"{date_column} >= ?")
+            params.append(self._start_iso)
+        if self._end_iso is not None:
+            clauses.append(f"{date_column} <= ?")
+            params.append(self._end_iso)
+        return (' AND '.join(clauses) or '1=1'), params
+
+# --- In-Memory Index ---
+
+class TransactionIndex:
+    """
+    Transactions sorted once by (client_id, date). A client lookup is one
+    binary search over the client boundaries and a date window is two
+    searchsorted calls inside that client's slice, so a query costs
+    O(log n + k) for k returned rows. Rows come back in their original order
+    (statement order matters to the running-balance checks), at O(k log k).
+    """
+
+    def __init__(self, df_transactions: pd.DataFrame):
+        frame = df_transactions.reindex(columns=df_transactions.columns.union(TRANSACTION_COLUMNS, sort=False))
+        self.frame = frame.reset_index(drop=True)
+        clients = self.frame['client_id'].astype(str).to_numpy()
+        dates = self.frame['date'].to_numpy(dtype='datetime64[ns]')
+        # NaT sorts last in NumPy, so each client's undated rows sit after its dated ones
+        self._order = np.lexsort((dates, clients))
+        self._dates = dates[self._order]
+        self._clients, starts = np.unique(clients[self._order], return_index=True)
+        self._bounds = np.append(starts, len(clients))
+        self._types = self.frame['type'].to_numpy()
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def _client_slices(self, client_ids: Optional[Tuple[str, ...]]) -> List[Tuple[int, int]]:
+        if client_ids is None:
+            positions = range(len(self._clients))
+        else:
+            found = np.searchsorted(self._clients, client_ids)
+            positions = [p for p, c in zip(found, client_ids) if p < len(self._clients) and self._clients[p] == c]
+        return [(int(self._bounds[p]), int(self._bounds[p + 1])) for p in positions]
+
+    def latest_date(self, client_ids: Optional[Tuple[str, ...]] = None) -> Optional[pd.Timestamp]:
+        latest = None
+        for lo, hi in self._client_slices(client_ids):
+            valid_hi = lo + int(np.searchsorted(self._dates[lo:hi], np.datetime64('NaT'), side='left'))
+            if valid_hi > lo and (latest is None or self._dates[valid_hi - 1] > latest):
+                latest = self._dates[valid_hi - 1]
+        return pd.Timestamp(latest) if latest is not None else None
+
+    def scan(self, transaction_filter: TransactionFilter) -> pd.DataFrame:
+        flt = transaction_filter.resolve(self.latest_date(transaction_filter.client_ids))
+        start = flt.start.to_datetime64() if flt.start is not None else None
+        # `end` is a date: include every timestamp on that day
+        end = (flt.end + pd.Timedelta(days=1)).to_datetime64() if flt.end is not None else None
+
+        ranges = []
+        for lo, hi in self._client_slices(flt.client_ids):
+            dates = self._dates[lo:hi]
+            first = lo + int(np.searchsorted(dates, start, side='left')) if start is not None else lo
+            last = lo + int(np.searchsorted(dates, end, side='left')) if end is not None else hi
+            if last > first:
+                ranges.append(np.arange(first, last))
+        rows = np.sort(self._order[np.concatenate(ranges)]) if ranges else np.empty(0, dtype=np.intp)
+        if flt.types is not None and len(rows):
+            rows = rows[np.isin(self._types[rows], flt.types)]
+        return self.frame.iloc[rows].reset_index(drop=True)
+
+# --- Lazy Query ---
+
+class TransactionQuery:
+    """
+    Builder over any source with `scan(filter)` (TransactionIndex, FeatureStore).
+    Each method returns a narrower query; nothing is read until `collect()`.
+    """
+
+    def __init__(self, source, transaction_filter: Optional[TransactionFilter] = None):
+        self.source = source
+        self.filter = transaction_filter or TransactionFilter()
+
+    def for_clients(self, *client_ids: str) -> 'TransactionQuery':
+        return TransactionQuery(self.source, self.filter.replace(client_ids=client_ids))
+
+    def between(self, start: Optional[pd.Timestamp] = None, end: Optional[pd.Timestamp] = None) -> 'TransactionQuery':
+        return TransactionQuery(self.source, self.filter.replace(start=start, end=end))
+
+    def last_months(self, months: Optional[int]) -> 'TransactionQuery':
+        """Window of `months` ending at the newest transaction in scope (or at `between`'s end)."""
+        return TransactionQuery(self.source, self.filter.replace(lookback_months=months))
+
+    def of_type(self, *types: str) -> 'TransactionQuery':
+        return TransactionQuery(self.source, self.filter.replace(types=types))
+
+    def collect(self) -> pd.DataFrame:
+        return self.source.scan(self.filter)
+
+# --- Benchmark ---
+
+def benchmark_window_queries(n_rows: int = 5_000_000, n_clients: int = 10_000, n_queries: int = 200,
+                             seed: int = 0) -> Tuple[float, float]:
+    """Mean ms per client + 3-month window query: full boolean-mask scan vs. the index."""
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        'client_id': rng.integers(0, n_clients, n_rows).astype(str),
+        'date': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 5 * 365, n_rows), unit='D'),
+        'description': 'x',
+        'type': rng.choice(['CREDIT', 'DEBIT'], n_rows),
+        'amount': rng.uniform(1, 500, n_rows),
+        'balance': 0.0,
+    })
+    index = TransactionIndex(frame)
+    clients = rng.integers(0, n_clients, n_queries).astype(str)
+    end = pd.Timestamp('2024-06-30')
+    start = end - pd.DateOffset(months=3) + pd.Timedelta(days=1)
+
+    started = time.perf_counter()
+    for client in clients:
+        frame[(frame['client_id'] == client) & (frame['date'] >= start) & (frame['date'] < end + pd.Timedelta(days=1))]
+    scan_ms = (time.perf_counter() - started) * 1000 / n_queries
+
+    started = time.perf_counter()
+    for client in clients:
+        TransactionQuery(index).for_clients(client).between(start, end).collect()
+    index_ms = (time.perf_counter() - started) * 1000 / n_queries
+    return scan_ms, index_ms
+
+
+if __name__ == "__main__":
+    print("--- Transaction Window Queries (5,000,000 rows, 10,000 clients) ---")
+    scan_ms, index_ms = benchmark_window_queries()
+    print(f"Boolean-mask scan: {scan_ms:.2f} ms/query")
+    print(f"Sorted index:      {index_ms:.3f} ms/query ({scan_ms / index_ms:,.0f}x faster)")